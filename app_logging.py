@@ -0,0 +1,47 @@
+"""
+ログの設定
+ログはキュー経由で別スレッドが書き出すので、リクエスト処理中のスレッドが
+標準出力への書き込みを待つことはない
+
+レベルは環境変数 LOG_LEVEL（DEBUG / INFO / WARNING / ERROR、既定は INFO）で変更できる。
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOGGER_NAME = 'talkfridge'
+
+_listener = None
+
+
+def setup_logging(level=None):
+    """talkfridge.* のロガーにキュー経由のハンドラを設定（何度呼んでも1回だけ）"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+    
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+    
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    # 終了時にキューに残ったログを書き出す
+    atexit.register(_listener.stop)
+    return logger
+
+
+def get_logger(name):
+    """talkfridge.<name> のロガー"""
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
@@ -0,0 +1,138 @@
+"""
+バックアップ中のリクエスト処理時間のベンチマーク
+食材を大量に入れたDBで、読み込み・書き込みのリクエストを送り続けながら、
+バックアップなしの区間とバックアップを繰り返し作っている区間を交互に計測して比較する
+
+作ったバックアップはすべて検証し、途中の書き込みで壊れていないことも確かめる。
+処理時間の中央値の差が 10% を超えたら終了コード 1 を返す。
+
+使い方:
+    python benchmarks/bench_backup.py
+    BENCH_ROWS=200000 python benchmarks/bench_backup.py
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 本物の API を呼ばないように、アプリを読み込む前に環境変数を設定
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_bench_')
+os.environ['BACKUP_INTERVAL_HOURS'] = '0'
+
+import oshaberi_web_app as web_app
+from db_backup import DatabaseBackup
+from scheduled_jobs import lower_thread_priority
+from ingredients_database import UPSERT_INGREDIENT_SQL, upsert_params
+
+ROWS = int(os.environ.get('BENCH_ROWS', 100000))
+ROUNDS = 5
+REQUESTS_PER_ROUND = 300
+TOLERANCE = 0.10
+CATEGORIES = ['野菜', '肉類', '魚介類', '乳製品', '調味料', '果物', '主食', 'その他']
+
+
+def fill(db, rows):
+    today = date.today()
+    with db.connections.transaction() as conn:
+        conn.executemany(UPSERT_INGREDIENT_SQL, [
+            upsert_params(f'食材{i}', 1, '個', CATEGORIES[i % len(CATEGORIES)],
+                          (today + timedelta(days=i % 365)).isoformat(), 'メモ' * 20)
+            for i in range(rows)
+        ])
+
+
+def run_requests(client, count, offset, cursor):
+    """読み込み2回・書き込み1回の順で count 回送り、1回ごとの処理時間を返す"""
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        if i % 3 == 0:
+            client.get('/api/get-statistics')
+        elif i % 3 == 1:
+            client.get(f'/api/changes?since={cursor}&limit=100')
+        else:
+            client.post('/api/add-ingredients', json={'ingredients': [
+                {'name': f'追加{offset + i}', 'quantity': 1, 'unit': '個', 'category': '野菜'}
+            ]})
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class BackupLoop:
+    """止めるまでバックアップを作り続ける"""
+    
+    def __init__(self, backup):
+        self.backup = backup
+        self.created = []
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def __enter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        # アプリのスケジューラと同じく優先度を下げたスレッドで作る
+        lower_thread_priority()
+        while not self._stop.is_set():
+            self.created.append(self.backup.create())
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main():
+    db = web_app.db
+    client = web_app.app.test_client()
+    fill(db, ROWS)
+    backup = DatabaseBackup(db, backup_dir=tempfile.mkdtemp(prefix='talkfridge_backups_'), keep=1000)
+    
+    start = time.perf_counter()
+    path = backup.create()
+    print(f"食材 {ROWS} 件、DB {os.path.getsize(db.db_path) / 1024 / 1024:.1f} MB → "
+          f"バックアップ {os.path.getsize(path) / 1024 / 1024:.1f} MB（{time.perf_counter() - start:.2f} 秒）")
+    
+    # 端末と同じく、最新の位置からの差分を取る
+    cursor = client.get('/api/changes').get_json()['cursor']
+    run_requests(client, 30, -100, cursor)  # ウォームアップ
+    idle, busy = [], []
+    loop = BackupLoop(backup)
+    for round_index in range(ROUNDS):
+        offset = round_index * REQUESTS_PER_ROUND * 2
+        idle.extend(run_requests(client, REQUESTS_PER_ROUND, offset, cursor))
+        with loop:
+            busy.extend(run_requests(client, REQUESTS_PER_ROUND, offset + REQUESTS_PER_ROUND, cursor))
+    
+    idle_p50, busy_p50 = statistics.median(idle) * 1000, statistics.median(busy) * 1000
+    idle_p95, busy_p95 = percentile(idle, 0.95) * 1000, percentile(busy, 0.95) * 1000
+    print(f"バックアップなし: 中央値 {idle_p50:6.2f} ms  p95 {idle_p95:6.2f} ms")
+    print(f"バックアップ中:   中央値 {busy_p50:6.2f} ms  p95 {busy_p95:6.2f} ms"
+          f"（中央値 {busy_p50 / idle_p50 - 1:+.1%}、計測中に {len(loop.created)} 個作成）")
+    
+    broken = [path for path in loop.created if path and not backup.verify(path)['ok']]
+    print(f"検証: {len(loop.created) - len(broken)} / {len(loop.created)} 個が正常")
+    
+    over = busy_p50 > idle_p50 * (1 + TOLERANCE) or broken
+    if over:
+        print("⚠️ バックアップ中の処理時間が許容範囲を超えたか、壊れたバックアップがあります")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
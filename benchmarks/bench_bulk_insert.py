@@ -0,0 +1,73 @@
+"""
+食材の一括登録ベンチマーク
+add_ingredient を1件ずつ呼ぶ場合と add_ingredients_bulk で比較する
+
+使い方:
+    python benchmarks/bench_bulk_insert.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingredients_database import IngredientsDatabase
+
+SIZES = [10, 100, 1000]
+UNITS = ['個', '本', '枚', 'g', 'パック']
+
+
+def make_items(n):
+    """n件の食材（一部は重複）を作る"""
+    return [
+        {
+            'name': f'食材{i % max(1, n * 4 // 5)}',
+            'quantity': 1 + i % 3,
+            'unit': UNITS[i % len(UNITS)],
+            'category': 'その他',
+        }
+        for i in range(n)
+    ]
+
+
+def run_per_item(db, items):
+    for item in items:
+        db.add_ingredient(
+            name=item['name'],
+            quantity=item['quantity'],
+            unit=item['unit'],
+            category=item['category'],
+        )
+
+
+def run_bulk(db, items):
+    db.add_ingredients_bulk(items)
+
+
+def measure(func, items, repeat=3):
+    """新しいDBで repeat 回計測し、最短時間（秒）を返す"""
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = IngredientsDatabase(os.path.join(tmp, 'bench.db'))
+            start = time.perf_counter()
+            func(db, items)
+            elapsed = time.perf_counter() - start
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'件数':>6} {'1件ずつ(ms)':>12} {'一括(ms)':>10} {'速度比':>8}")
+    for n in SIZES:
+        items = make_items(n)
+        per_item = measure(run_per_item, items)
+        bulk = measure(run_bulk, items)
+        print(f"{n:>6} {per_item * 1000:>12.2f} {bulk * 1000:>10.2f} {per_item / bulk:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
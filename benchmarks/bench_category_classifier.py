@@ -0,0 +1,71 @@
+"""
+カテゴリ分類のマイクロベンチマーク
+旧実装（全キーワードを順番に部分一致）と Aho-Corasick 版を比較する
+辞書に架空の商品名を足して、辞書の大きさによる違いを見る
+
+使い方:
+    python benchmarks/bench_category_classifier.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_classifier import CategoryClassifier
+from food_dictionary import CATEGORY_KEYWORDS, COMMON_FOOD_DICT
+
+EXTRA_SIZES = [0, 1000, 5000]
+KANA = 'アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン'
+QUERIES = ['牛乳', '国産鶏むね肉', '低脂肪ヨーグルト', 'トマト缶', 'ほげほげ', 'プチッと鍋キムチ',
+           'サラダ油', '木綿豆腐', 'しめじ', 'ベーコンブロック']
+
+
+def linear_guess_category(category_keywords, name):
+    """旧実装: カテゴリとキーワードを順番に調べて最初に含まれていたもの"""
+    for category, keywords in category_keywords.items():
+        for keyword in keywords:
+            if keyword in name:
+                return category
+    return 'その他'
+
+
+def make_keywords(extra):
+    """辞書に extra 件の架空の商品名を足す"""
+    rng = random.Random(42)
+    keywords = {category: list(words) for category, words in CATEGORY_KEYWORDS.items()}
+    categories = [category for category in keywords if category != 'その他']
+    for _ in range(extra):
+        product = ''.join(rng.choice(KANA) for _ in range(rng.randint(4, 8)))
+        keywords[rng.choice(categories)].append(product)
+    return keywords
+
+
+def measure(func, repeat=2000):
+    """1件あたりの平均時間（マイクロ秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+def main():
+    print(f"{'辞書の語数':>10} {'旧実装(µs)':>12} {'新実装(µs)':>12} {'構築(ms)':>10}")
+    for extra in EXTRA_SIZES:
+        keywords = make_keywords(extra)
+        size = sum(len(words) for words in keywords.values()) + len(COMMON_FOOD_DICT)
+        
+        start = time.perf_counter()
+        classifier = CategoryClassifier(keywords, COMMON_FOOD_DICT)
+        build = (time.perf_counter() - start) * 1000
+        
+        old = measure(lambda name: linear_guess_category(keywords, name))
+        new = measure(classifier.classify)
+        print(f"{size:>10} {old:>12.2f} {new:>12.2f} {build:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+/api/events（在庫の変更の SSE 配信）のベンチマーク
+実際の HTTP サーバーに購読者をつないで、待機中の CPU 使用量と、
+食材を追加してから全購読者に届くまでの時間を計測する
+
+使い方:
+    python benchmarks/bench_events.py [購読者数]
+"""
+
+import http.client
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 本物の API を呼ばないように、アプリを読み込む前に環境変数を設定
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_bench_')
+
+from werkzeug.serving import make_server
+import oshaberi_web_app as web_app
+
+IDLE_SECONDS = 3
+CHANGES = 20
+
+
+def subscribe(port, received, ready):
+    """1つの購読者：change イベントが届いた時刻を記録し続ける"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/api/events')
+    response = conn.getresponse()
+    ready.release()
+    while True:
+        line = response.fp.readline()
+        if not line:
+            return
+        if line.startswith(b'event: change'):
+            received.append(time.perf_counter())
+
+
+def main():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    web_app.inventory_events.max_subscribers = subscribers
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    received = [[] for _ in range(subscribers)]
+    ready = threading.Semaphore(0)
+    for i in range(subscribers):
+        threading.Thread(target=subscribe, args=(server.server_port, received[i], ready), daemon=True).start()
+    for _ in range(subscribers):
+        ready.acquire()
+    while web_app.inventory_events.stats()['subscribers'] < subscribers:
+        time.sleep(0.01)
+    
+    # 待機中の CPU 使用量（プロセス全体、購読者側のスレッドも含む）
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(IDLE_SECONDS)
+    idle_cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+    
+    # 1件追加してから全購読者に届くまでの時間
+    latencies = []
+    for i in range(CHANGES):
+        start = time.perf_counter()
+        web_app.db.add_ingredient(f'ベンチ食材{i}', 1, '個')
+        while min(len(times) for times in received) <= i:
+            time.sleep(0.0005)
+        latencies.append(max(times[i] for times in received) - start)
+    
+    latencies.sort()
+    print(f"購読者数: {subscribers}")
+    print(f"待機中のCPU使用率: {idle_cpu * 100:.2f}%")
+    print(f"全員に届くまで(ms): 中央値 {latencies[len(latencies) // 2] * 1000:.2f} / "
+          f"最大 {latencies[-1] * 1000:.2f}")
+    print(f"配信統計: {web_app.inventory_events.stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
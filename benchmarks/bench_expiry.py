@@ -0,0 +1,97 @@
+"""
+賞味期限の区分（expiry_buckets.py、/api/get-expiring-soon）のベンチマーク
+期限が近い食材（7日以内と期限切れ）は NEAR 件のまま、期限の遠い食材だけを増やして、
+次の時間が在庫の件数によらないことを確認する
+
+- 全件から分類: 全食材を読んで Python で期限の区分に分ける（区分を持たない場合）
+- 範囲検索: get_expiring_soon(3)（idx_ingredients_expiry の範囲検索）
+- 区分: 変更がないときの get_expiring(db, 3)（持っている区分から取り出すだけ）
+- 作り直し: 1件書き込んだあとの get_expiring(db, 3)（範囲検索1回で区分を作り直す）
+
+使い方:
+    python benchmarks/bench_expiry.py
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from expiry_buckets import get_expiring
+from ingredients_database import IngredientsDatabase, UPSERT_INGREDIENT_SQL, upsert_params
+
+SIZES = [1000, 10000, 100000]
+NEAR = 100
+RUNS = 20
+
+
+def fill(db, start, end, today):
+    """start〜end-1 番の食材を登録（最初の NEAR 件は期限切れ〜7日後、残りは8〜365日後）"""
+    with db.connections.transaction() as conn:
+        conn.executemany(UPSERT_INGREDIENT_SQL, [
+            upsert_params(f'食材{i}', 1, '個', '野菜',
+                          (today + timedelta(days=(i % 12) - 4 if i < NEAR else 8 + i % 358)).isoformat())
+            for i in range(start, end)
+        ])
+
+
+def full_scan(db, today):
+    """比較用: 全件を読んで Python で分類する"""
+    soon, expired = [], []
+    for row in db.get_ingredients():
+        if not row['expiry_date']:
+            continue
+        days_left = (datetime.fromisoformat(row['expiry_date']).date() - today).days
+        if days_left < 0:
+            expired.append(row)
+        elif days_left <= 3:
+            soon.append(row)
+    return soon, expired
+
+
+def median_ms(function):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    db = IngredientsDatabase(os.path.join(tempfile.mkdtemp(prefix='talkfridge_expiry_'), 'bench.db'))
+    today = datetime.now(timezone.utc).date()
+    print(f"期限が近い食材 {NEAR} 件、中央値（{RUNS} 回）")
+    print(f"{'件数':>7} | {'全件から分類':>10} {'範囲検索':>8} {'区分':>8} {'作り直し':>8}  (ms)")
+    filled = 0
+    for size in SIZES:
+        fill(db, filled, size, today)
+        filled = size
+        
+        expected = get_expiring(db, 3)
+        soon, expired = full_scan(db, today)
+        assert [row['id'] for row in expected['ingredients']] == [row['id'] for row in db.get_expiring_soon(3)]
+        assert len(expected['ingredients']) == len(soon) and len(expected['expired']) == len(expired)
+        
+        scan = median_ms(lambda: full_scan(db, today))
+        indexed = median_ms(lambda: db.get_expiring_soon(3))
+        cached = median_ms(lambda: get_expiring(db, 3))
+        
+        def write_then_read():
+            db.update_ingredient(1, notes=str(time.perf_counter()))
+            start = time.perf_counter()
+            get_expiring(db, 3)
+            return time.perf_counter() - start
+        
+        rebuild = statistics.median(write_then_read() for _ in range(RUNS)) * 1000
+        print(f"{size:>7} | {scan:>10.2f} {indexed:>8.3f} {cached:>8.3f} {rebuild:>8.3f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
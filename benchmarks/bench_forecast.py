@@ -0,0 +1,110 @@
+"""
+消費ペースの予測（forecast.py、/api/forecast）のベンチマーク
+INGREDIENTS 種類の食材に、直近 FORECAST_WINDOW_DAYS 日に散らした「使用」の履歴を
+EVENTS 件入れ（半分は日別集計済み）、次の時間を計測する
+
+- 初回: 履歴を全部読んで配列にし、全食材を計算する
+- 変更なし: 前回の結果を返す
+- 差分: NEW_EVENTS 件使った後、その分だけを読み足して計算し直す
+
+比較のため、同じ行を Python のループで食材ごとに合計する場合の時間も表示する。
+
+使い方:
+    python benchmarks/bench_forecast.py
+    EVENTS=100000,1000000 python benchmarks/bench_forecast.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecast import ConsumptionForecaster, DEFAULT_WINDOW_DAYS
+from ingredients_database import IngredientsDatabase
+
+EVENTS = [int(value) for value in os.environ.get('EVENTS', '100000,300000').split(',')]
+INGREDIENTS = int(os.environ.get('INGREDIENTS', 200))
+NEW_EVENTS = 100
+RUNS = 5
+
+
+def build_database(events):
+    """食材と使用履歴を入れたDBを作る（履歴は直接 INSERT する）"""
+    db = IngredientsDatabase(os.path.join(tempfile.mkdtemp(prefix='talkfridge_forecast_'), 'bench.db'))
+    db.add_ingredients_bulk([
+        {'name': f'食材{i}', 'quantity': 1000, 'unit': '個', 'category': '野菜'}
+        for i in range(INGREDIENTS)
+    ])
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    rows = sorted(
+        (now - timedelta(seconds=rng.randrange(DEFAULT_WINDOW_DAYS * 86400 - 3600)),
+         1 + rng.randrange(INGREDIENTS), rng.choice((0.5, 1, 2)))
+        for _ in range(events)
+    )
+    with db.connections.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO usage_history (ingredient_id, action, quantity, timestamp) VALUES (?, 'use', ?, ?)",
+            [(ingredient_id, quantity, timestamp.strftime('%Y-%m-%d %H:%M:%S'))
+             for timestamp, ingredient_id, quantity in rows])
+    # 古いほうの半分は日別集計にまとめておく（集計と未集計の両方を読む）
+    rolled = 0
+    while rolled < events // 2:
+        rolled += db.rollup_usage_history(min(10000, events // 2 - rolled))
+    return db
+
+
+def python_loop(rows):
+    """比較用: 行ごとに Python で食材ごとの合計を取る"""
+    used = {}
+    for ingredient_id, day, quantity in rows:
+        used[ingredient_id] = used.get(ingredient_id, 0.0) + quantity
+    return used
+
+
+def timed(function, runs=RUNS):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    print(f"食材 {INGREDIENTS} 種類、期間 {DEFAULT_WINDOW_DAYS} 日、中央値（{RUNS} 回）")
+    print(f"{'履歴':>9} | {'初回 ms':>8} {'うちSQL':>8} | {'変更なし':>8} | {'差分 ms':>8} | {'Pythonループ':>12}")
+    for events in EVENTS:
+        db = build_database(events)
+        since = (datetime.now(timezone.utc).date() - timedelta(days=DEFAULT_WINDOW_DAYS - 1)).isoformat()
+        rows, _ = db.get_consumption(since)
+        assert len(rows) >= events // 2
+        
+        first = timed(lambda: ConsumptionForecaster().forecast(db))
+        sql = timed(lambda: db.get_consumption(since))
+        
+        forecaster = ConsumptionForecaster()
+        forecaster.forecast(db)
+        unchanged = timed(lambda: forecaster.forecast(db))
+        
+        def incremental():
+            for i in range(NEW_EVENTS):
+                db.use_ingredient(1 + i % INGREDIENTS, 0.001)
+            start = time.perf_counter()
+            forecaster.forecast(db)
+            return time.perf_counter() - start
+        
+        update = statistics.median(incremental() for _ in range(RUNS)) * 1000
+        loop = timed(lambda: python_loop(rows))
+        print(f"{events:>9} | {first:>8.1f} {sql:>8.1f} | {unchanged:>8.3f} | {update:>8.2f} | {loop:>12.1f}")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
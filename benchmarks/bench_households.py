@@ -0,0 +1,202 @@
+"""
+複数世帯モード（households.py）のベンチマーク
+HOUSEHOLDS 世帯がそれぞれ食材の追加・使用を書き込む負荷を、同時実行数を変えながら
+
+- 共有: 全世帯が1つのDBファイル（従来の構成）に書き込む
+- 世帯別: HouseholdRouter で世帯ごとのファイルに書き込む
+
+で比べ、1秒あたりの書き込み数と p50/p99 レイテンシを表示する。
+どの世帯に書き込むかは偏らせてあり（よく使う世帯ほど LRU に残る）、1世帯が続けて
+SESSION_WRITES 回書き込む（買ってきた食材をまとめて登録するときのように）。
+
+- スレッド: 1プロセス内のスレッド数を変える。LRU の大きさ（開いておく世帯数）は
+  MAX_OPEN 個と LARGE_OPEN 個の2通り
+- プロセス: gunicorn のワーカーのように別々のプロセスから書き込む（各プロセスが全世帯を
+  開いておける LRU を持つ。共有のファイルでは書き込みロックを待つ）
+最初に全世帯のDBを作る時間（初回のスキーマ作成）と、開き直す時間も表示する。
+
+使い方:
+    python benchmarks/bench_households.py
+    HOUSEHOLDS=200 WRITES=4000 python benchmarks/bench_households.py
+"""
+
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from households import DEFAULT_IDLE_SECONDS, HouseholdRouter
+from ingredients_database import IngredientsDatabase
+
+HOUSEHOLDS = int(os.environ.get('HOUSEHOLDS', 1000))
+WRITES = int(os.environ.get('WRITES', 8000))
+MAX_OPEN = int(os.environ.get('MAX_OPEN', 64))
+LARGE_OPEN = int(os.environ.get('LARGE_OPEN', 256))
+CONCURRENCY = (1, 4, 16)
+PROCESSES = (1, 2, 4)
+SESSION_WRITES = int(os.environ.get('SESSION_WRITES', 5))
+
+
+def pick_household(rng):
+    """よく使う世帯ほど選ばれやすくする（上位2割で約半分）"""
+    return f'home{int(HOUSEHOLDS * rng.random() ** 2):04d}'
+
+
+def write(db, household, rng):
+    """1世帯分の書き込み（食材を1つ追加してすぐ使う）"""
+    name = f'{household}の食材{rng.randrange(20)}'
+    ingredient_id = db.add_ingredients_bulk([{'name': name, 'quantity': 2, 'unit': '個', 'category': '野菜'}])[0]
+    db.use_ingredient(ingredient_id, 1)
+
+
+def run(threads, get_db, release):
+    """threads 本のスレッドで合わせて WRITES 回書き込み、(書き込み/秒, 各回の秒数) を返す"""
+    latencies = []
+    lock = threading.Lock()
+    per_thread = WRITES // threads
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        for i in range(per_thread):
+            if i % SESSION_WRITES == 0:
+                household = pick_household(rng)
+            start = time.perf_counter()
+            db = get_db(household)
+            try:
+                write(db, household, rng)
+            finally:
+                release(household)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def process_worker(shared_path, households_dir, seed, writes, barrier, results):
+    """1プロセス分の書き込み（shared_path が None なら世帯別）"""
+    if shared_path is None:
+        router = HouseholdRouter(None, households_dir, max_open=HOUSEHOLDS)
+        get_db, release = router.acquire, router.release
+    else:
+        shared = IngredientsDatabase(shared_path)
+        get_db, release = (lambda household: shared), (lambda household: None)
+    # DBを開く時間や SQL の準備（接続ごとに1回）は計測に入れない（長く動いているワーカーの状態で比べる）
+    rng = random.Random(seed)
+    for i in range(HOUSEHOLDS):
+        household = f'home{i:04d}'
+        write(get_db(household), household, rng)
+        release(household)
+    # 全プロセスの準備が終わってから一斉に書き込む
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(writes):
+        if i % SESSION_WRITES == 0:
+            household = pick_household(rng)
+        db = get_db(household)
+        try:
+            write(db, household, rng)
+        finally:
+            release(household)
+    results.put((start, time.perf_counter()))
+
+
+def run_processes(processes, shared_path, households_dir):
+    """processes 個のプロセスで合わせて WRITES 回書き込み、1秒あたりの書き込み数を返す"""
+    results = multiprocessing.Queue()
+    barrier = multiprocessing.Barrier(processes)
+    workers = [multiprocessing.Process(target=process_worker,
+                                       args=(shared_path, households_dir, i, WRITES // processes, barrier, results))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    spans = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return (WRITES // processes * processes) / (max(end for _, end in spans) - min(start for start, _ in spans))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='talkfridge_households_')
+    shared = IngredientsDatabase(os.path.join(work_dir, 'shared.db'))
+    router = HouseholdRouter(None, os.path.join(work_dir, 'households'), max_open=HOUSEHOLDS)
+    
+    # 全世帯のDBを作る（初回のスキーマ作成）
+    start = time.perf_counter()
+    for i in range(HOUSEHOLDS):
+        with router.use(f'home{i:04d}'):
+            pass
+    created = time.perf_counter() - start
+    print(f"{HOUSEHOLDS} 世帯のDBを作成: {created / HOUSEHOLDS * 1000:.2f} ms/世帯（合計 {created:.1f} 秒）")
+    
+    # LRU に残っているDBを取る時間と、閉じたDBを開き直す時間
+    keys = [f'home{i:04d}' for i in range(min(HOUSEHOLDS, 200))]
+    for label in ('LRU から', '開き直し'):
+        if label == '開き直し':
+            router.idle_seconds = 0
+            router.close_idle()
+            router.idle_seconds = DEFAULT_IDLE_SECONDS
+        times = []
+        for key in keys:
+            start = time.perf_counter()
+            router.acquire(key)
+            times.append(time.perf_counter() - start)
+            router.release(key)
+        print(f"  {label}: 中央値 {statistics.median(times) * 1000:.3f} ms")
+    print()
+    
+    print(f"{HOUSEHOLDS} 世帯に合わせて {WRITES} 回書き込み")
+    print(f"{'構成':<16} {'同時実行':>8} {'回/秒':>8} {'p50 ms':>8} {'p99 ms':>8} {'ヒット率':>8}")
+    for threads in CONCURRENCY:
+        run(threads, lambda household: shared, lambda household: None)
+        rate, latencies = run(threads, lambda household: shared, lambda household: None)
+        print(f"{'共有':<16} {threads:>8} {rate:>8.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f}")
+        for max_open in (MAX_OPEN, LARGE_OPEN):
+            # 前の計測で開いたDB（終わったスレッドの接続を含む）を閉じてから始める
+            router.idle_seconds = 0
+            router.close_idle()
+            router.idle_seconds = DEFAULT_IDLE_SECONDS
+            router.max_open = max_open
+            # 1回目は LRU を温めるだけ（計測しない）
+            run(threads, router.acquire, router.release)
+            before = router.stats()
+            rate, latencies = run(threads, router.acquire, router.release)
+            after = router.stats()
+            hits, misses = after['hits'] - before['hits'], after['misses'] - before['misses']
+            print(f"{'世帯別 LRU ' + str(max_open):<16} {threads:>8} {rate:>8.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f} {hits / max(hits + misses, 1):>8.1%}")
+    router.idle_seconds = 0
+    router.close_idle()
+    shared.close()
+    print()
+    
+    print(f"プロセスごとに書き込み（合わせて {WRITES} 回、世帯別の LRU は各プロセス {HOUSEHOLDS} 世帯）")
+    print(f"{'プロセス数':>8} {'共有: 回/秒':>12} {'世帯別: 回/秒':>13} {'倍率':>6}")
+    for processes in PROCESSES:
+        shared_rate = run_processes(processes, shared.db_path, None)
+        router_rate = run_processes(processes, None, router.households_dir)
+        print(f"{processes:>8} {shared_rate:>12.0f} {router_rate:>13.0f} {router_rate / shared_rate:>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
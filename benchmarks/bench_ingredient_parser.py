@@ -0,0 +1,150 @@
+"""
+食材解析のスループット計測
+旧 /api/parse-ingredients（1件ずつ・print あり）と、新しい解析モジュール・
+バッチエンドポイントの「1秒あたりの発話数」を比較する
+
+目標の10倍はバッチ（/api/parse-ingredients/batch）と parse_many だけが対象。
+1件ずつのルートは処理時間の大半が Flask のリクエスト処理なので、旧ルートとほぼ同じ
+（速度比は毎回表示し、旧ルートより遅ければ警告する）。
+
+使い方:
+    python benchmarks/bench_ingredient_parser.py
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_bench_')
+
+from flask import Flask, request, jsonify
+
+import oshaberi_web_app as web_app
+from ingredient_parser import parse_many
+
+UTTERANCES = [
+    '鶏肉2枚、トマト3個、ニンジン2本',
+    '牛乳1リットルとヨーグルト2個',
+    '豚肉300g、キャベツ1個、玉ねぎ3個',
+    'しめじ1パックとえのき2パック',
+    '卵10個',
+]
+BATCH_SIZE = 100
+TARGET_SPEEDUP = 10
+
+# 旧実装のカテゴリ推測とルートハンドラ（比較用にそのまま残す）
+LEGACY_CATEGORY_KEYWORDS = {
+    '肉': ['鶏', '肉', '豚', '牛', '魚', 'ハム', 'ベーコン', 'ソーセージ'],
+    '野菜': ['トマト', 'ニンジン', 'キャベツ', '玉ねぎ', 'きゅうり', 'ピーマン', '白菜', '大根'],
+    '乳製品': ['牛乳', 'チーズ', 'ヨーグルト', 'バター', '生クリーム'],
+    '穀物': ['米', 'パン', '麺', 'うどん', 'そば', 'スパゲッティ'],
+    '調味料': ['醤油', '味噌', '塩', '砂糖', '胡椒', '油'],
+    'その他': []
+}
+
+legacy_app = Flask('legacy')
+
+
+def legacy_guess_category(name):
+    for category, keywords in LEGACY_CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in name:
+                return category
+    return 'その他'
+
+
+@legacy_app.route('/api/parse-ingredients', methods=['POST'])
+def legacy_parse_ingredients():
+    data = request.get_json()
+    text = data.get('text', '')
+    print(f"📝 受信したテキスト: {text}")
+    ingredients = []
+    items = re.split(r'[、，と]', text)
+    print(f"📦 分割したアイテム: {items}")
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        match = re.match(r'(.+?)(\d+\.?\d*)(枚|個|本|ml|g|kg|l|リットル|片|パック|入り|つ|ヶ)', item)
+        if match:
+            name = match.group(1).strip()
+            quantity = float(match.group(2))
+            unit = match.group(3)
+            print(f"✅ 抽出成功: {name} {quantity}{unit}")
+            ingredients.append({
+                'name': name, 'quantity': quantity, 'unit': unit,
+                'category': legacy_guess_category(name)
+            })
+        else:
+            print(f"❌ 抽出失敗: {item}")
+    print(f"🍽️ 抽出された食材数: {len(ingredients)}")
+    return jsonify({
+        'success': True,
+        'ingredients': ingredients,
+        'debug': {'original_text': text, 'parsed_items': items, 'success_count': len(ingredients)}
+    })
+
+
+def rate(func, utterances, repeat=3):
+    """func() が utterances 件を処理する前提で、1秒あたりの発話数を返す（repeat 回のうち最も速い値）"""
+    func()  # ウォームアップ
+    best = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rounds = 0
+        while time.perf_counter() - start < 0.5:
+            func()
+            rounds += 1
+        best = max(best, rounds * utterances / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    batch = [UTTERANCES[i % len(UTTERANCES)] for i in range(BATCH_SIZE)]
+    legacy_client = legacy_app.test_client()
+    client = web_app.app.test_client()
+    
+    def legacy_route():
+        # 旧実装は標準出力に書き込むので、出力先を捨てて計測する
+        with contextlib.redirect_stdout(io.StringIO()):
+            for text in batch:
+                legacy_client.post('/api/parse-ingredients', json={'text': text})
+    
+    def new_route():
+        for text in batch:
+            client.post('/api/parse-ingredients', json={'text': text})
+    
+    def batch_route():
+        client.post('/api/parse-ingredients/batch', json={'texts': batch})
+    
+    results = [
+        ('旧ルート（1件ずつ）', rate(legacy_route, len(batch))),
+        ('新ルート（1件ずつ）', rate(new_route, len(batch))),
+        (f'バッチ（{BATCH_SIZE}件/リクエスト）', rate(batch_route, len(batch))),
+        ('parse_many（直接）', rate(lambda: parse_many(batch), len(batch))),
+    ]
+    
+    baseline = results[0][1]
+    for label, per_second in results:
+        print(f"{label:<24} {per_second:>12,.0f} 発話/秒 {per_second / baseline:>7.1f}x")
+    
+    single = results[1][1] / baseline
+    print(f"ℹ️ 1件ずつのルートは {single:.1f}x（目標の{TARGET_SPEEDUP}x はバッチと parse_many だけが対象）")
+    if single < 1:
+        print(f"⚠️ 1件ずつのルートが旧ルートより遅くなっています（{single:.1f}x）")
+    
+    speedup = results[2][1] / baseline
+    if speedup < TARGET_SPEEDUP:
+        print(f"⚠️ バッチの速度比 {speedup:.1f}x が目標 {TARGET_SPEEDUP}x を下回っています")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+計測（/metrics 用のリクエスト・SQL の計測）のオーバーヘッドを確認するベンチマーク
+同じプロセスで計測あり・なしを交互に繰り返し、同じリクエストの組を
+test_client で送って1リクエストあたりの時間を比べる（5% 未満であること）
+
+SQLite の接続はスレッドごとに作られ、計測用の接続にするかは作成時に決まるので、
+計測あり・なしでそれぞれ専用のスレッドを使う。
+
+使い方:
+    python benchmarks/bench_metrics_overhead.py
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from load_app import create_app
+import metrics
+
+ROUNDS = 21
+ITERATIONS = 30
+LIMIT_PERCENT = 5.0
+
+
+def main():
+    app = create_app(rows=200, gemini_latency=0.0)
+    client = app.test_client()
+    ingredient_id = client.get('/api/get-ingredients').get_json()['ingredients'][0]['id']
+    
+    requests = [
+        ('GET', '/api/get-ingredients', None),
+        ('GET', '/api/get-statistics', None),
+        ('GET', '/api/changes?since=1', None),
+        ('POST', '/api/parse-ingredients', {'text': 'にんじん2本とたまご3個'}),
+        ('POST', '/api/use-ingredient', {'ingredient_id': ingredient_id, 'quantity': 0}),
+        ('POST', '/api/add-ingredients', {'ingredients': [{'name': 'にんじん', 'quantity': 1, 'unit': '本'}]}),
+        ('POST', '/api/suggest-recipe', {'ingredients': [{'name': '鶏肉', 'quantity': 1, 'unit': '枚'}]}),
+    ]
+    
+    def run_round():
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            for method, path, body in requests:
+                client.open(path, method=method, json=body).close()
+        return (time.perf_counter() - start) / (ITERATIONS * len(requests))
+    
+    threads = {enabled: ThreadPoolExecutor(max_workers=1) for enabled in (False, True)}
+    results = {False: [], True: []}
+    for _ in range(ROUNDS):
+        for enabled in (False, True):
+            metrics.ENABLED = enabled
+            results[enabled].append(threads[enabled].submit(run_round).result())
+    metrics.ENABLED = True
+    
+    # 同じ回の計測あり・なしの比を取り、外れ値（他のプロセスの影響）を避けるため中央値で比べる
+    ratios = sorted(on / off for off, on in zip(results[False], results[True]))
+    overhead = (ratios[ROUNDS // 2] - 1) * 100
+    disabled = sorted(results[False])[ROUNDS // 2]
+    enabled = sorted(results[True])[ROUNDS // 2]
+    
+    print(f"計測なし: {disabled * 1e6:.1f} µs/リクエスト")
+    print(f"計測あり: {enabled * 1e6:.1f} µs/リクエスト")
+    print(f"オーバーヘッド: {overhead:+.2f}%（上限 {LIMIT_PERCENT}%）")
+    return 0 if overhead < LIMIT_PERCENT else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Gemini の使用回数制限（gemini_quota.py）のベンチマーク
+1. 上限に達したあとに断るまでの時間（Gemini もDBも待たずにすぐ返るか）
+2. 複数のプロセスが同じDBで数えたとき、許可した回数の合計が1日の上限を超えないか
+
+使い方:
+    python benchmarks/bench_quota.py
+    QUOTA_PROCESSES=8 QUOTA_PER_DAY=200 python benchmarks/bench_quota.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gemini_quota import GeminiQuota, QuotaExceededError
+from ingredients_database import IngredientsDatabase
+
+PROCESSES = int(os.environ.get('QUOTA_PROCESSES', 4))
+THREADS = 4
+PER_DAY = int(os.environ.get('QUOTA_PER_DAY', 60))
+REJECT_ITERATIONS = 20000
+
+# 1つのワーカープロセス（スレッドで上限まで取り合い、許可された回数を出力）
+WORKER = '''
+import json, sys, threading
+sys.path.insert(0, {root!r})
+from gemini_quota import GeminiQuota, QuotaExceededError
+from ingredients_database import IngredientsDatabase
+
+quota = GeminiQuota(IngredientsDatabase({db_path!r}), per_minute=10**9, per_day={per_day},
+                    per_month=10**9, batch_size=5, reserve_margin=10)
+granted = []
+
+def worker():
+    count = 0
+    while True:
+        try:
+            quota.acquire()
+        except QuotaExceededError:
+            break
+        count += 1
+    granted.append(count)
+
+threads = [threading.Thread(target=worker) for _ in range({threads})]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+quota.flush()
+print(json.dumps({{'granted': sum(granted)}}))
+'''
+
+
+def bench_rejection():
+    """上限に達したあとの acquire / check が断るまでの時間"""
+    db = IngredientsDatabase(os.path.join(tempfile.mkdtemp(prefix='talkfridge_quota_'), 'quota.db'))
+    quota = GeminiQuota(db, per_minute=10**9, per_day=5, per_month=10**9)
+    for _ in range(5):
+        quota.acquire()
+    
+    for name, func in (('acquire', quota.acquire), ('check', quota.check)):
+        start = time.perf_counter()
+        for _ in range(REJECT_ITERATIONS):
+            try:
+                func()
+            except QuotaExceededError:
+                pass
+        elapsed = (time.perf_counter() - start) / REJECT_ITERATIONS
+        print(f"上限到達後の {name:8s}: {elapsed * 1e6:6.1f} µs/回")
+
+
+def bench_processes():
+    """PROCESSES 個のプロセスで同時に使い切り、合計が PER_DAY と一致するか"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='talkfridge_quota_'), 'quota.db')
+    IngredientsDatabase(db_path)  # 先にテーブルを作っておく
+    code = WORKER.format(root=ROOT, db_path=db_path, per_day=PER_DAY, threads=THREADS)
+    
+    start = time.perf_counter()
+    workers = [subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True,
+                                env=dict(os.environ, LOG_LEVEL='WARNING'))
+               for _ in range(PROCESSES)]
+    granted = [json.loads(worker.communicate()[0].strip().splitlines()[-1])['granted'] for worker in workers]
+    elapsed = time.perf_counter() - start
+    
+    total = sum(granted)
+    recorded = max(IngredientsDatabase(db_path).get_api_usage([f'day:{time.strftime("%Y-%m-%d")}']).values())
+    print(f"{PROCESSES} プロセス × {THREADS} スレッド: 許可 {granted} = 合計 {total}"
+          f"（上限 {PER_DAY}、DBの記録 {recorded}、{elapsed:.2f} 秒）")
+    return total == PER_DAY and recorded == PER_DAY
+
+
+def main():
+    bench_rejection()
+    ok = bench_processes()
+    if not ok:
+        print("⚠️ 許可した回数の合計が上限と一致しません")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+レシピ提案のプロンプト（recipe_prompt.py）のベンチマーク
+冷蔵庫の食材の数を増やしながら、以前の全件を並べるプロンプトと、予算内に
+収める現在のプロンプトのトークン数（estimate_tokens の見積もり）と作成時間を比較する
+
+Gemini の処理時間はプロンプトの長さにほぼ比例するので、トークン数の差が
+そのまま上流の時間と料金の差になる（本番では /metrics の
+talkfridge_gemini_prompt_tokens と talkfridge_gemini_duration_seconds で確認できる）。
+
+使い方:
+    python benchmarks/bench_recipe_prompt.py
+    RECIPE_PROMPT_TOKEN_BUDGET=500 python benchmarks/bench_recipe_prompt.py
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recipe_prompt import DEFAULT_TOKEN_BUDGET, PROMPT_TEMPLATE, build_prompt, estimate_tokens
+
+SIZES = [5, 20, 50, 200, 1000]
+REPEAT = 200
+NAMES = ['鶏肉', 'トマト', 'キャベツ', '牛乳', 'にんじん', '豆腐', 'しめじ', '醤油', '味噌', '豚バラ肉']
+UNITS = ['枚', '個', '玉', '本', '本', '丁', 'パック', '本', 'パック', 'g']
+CATEGORIES = ['肉', '野菜', '野菜', '乳製品', '野菜', '加工食品', 'きのこ', '調味料', '調味料', '肉']
+
+
+def make_fridge(size, today):
+    return [
+        {
+            'name': f'{NAMES[i % len(NAMES)]}{i // len(NAMES) or ""}',
+            'quantity': 1 + i % 4,
+            'unit': UNITS[i % len(UNITS)],
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'expiry_date': (today + timedelta(days=(i * 7) % 30 - 2)).isoformat(),
+        }
+        for i in range(size)
+    ]
+
+
+def full_prompt(ingredients):
+    """以前のプロンプト（全件をそのまま並べる）"""
+    ingredient_text = ", ".join(
+        f"{item.get('name', '')} {item.get('quantity', 0)}{item.get('unit', '')}" for item in ingredients
+    )
+    return PROMPT_TEMPLATE.format(notes='', ingredients=ingredient_text)
+
+
+def main():
+    today = date(2025, 1, 1)
+    print(f"トークンの予算: {DEFAULT_TOKEN_BUDGET}")
+    print(f"{'食材数':>6} {'以前':>8} {'現在':>8} {'入れた':>6} {'省略':>6} {'常備品':>6} {'作成時間':>10}")
+    for size in SIZES:
+        fridge = make_fridge(size, today)
+        
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            prompt = build_prompt(fridge, today=today)
+        elapsed = (time.perf_counter() - start) / REPEAT
+        
+        # 同じ入力なら同じプロンプトになること（オフラインで確認できる）
+        assert build_prompt(fridge, today=today).text == prompt.text
+        assert prompt.tokens <= DEFAULT_TOKEN_BUDGET or len(prompt.included) == 1
+        
+        print(f"{size:6d} {estimate_tokens(full_prompt(fridge)):8d} {prompt.tokens:8d} "
+              f"{len(prompt.included):6d} {len(prompt.omitted):6d} {len(prompt.staples):6d} "
+              f"{elapsed * 1e6:8.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+レシピ提案の最初の文字が届くまでの時間を比較するベンチマーク
+/api/suggest-recipe（一括）と /api/suggest-recipe/stream（SSE）を
+スタブモデルで計測する（Gemini API は呼ばない）
+
+使い方:
+    python benchmarks/bench_recipe_stream.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 本物の API を呼ばないように、アプリを読み込む前に環境変数を設定
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_bench_')
+
+import oshaberi_web_app as web_app
+from stub_gemini import StubGeminiModel
+
+INGREDIENTS = [
+    {'name': '鶏肉', 'quantity': 2, 'unit': '枚'},
+    {'name': 'トマト', 'quantity': 3, 'unit': '個'},
+]
+
+
+def measure(client, path):
+    """最初のデータが届くまでの時間と、全体の時間（秒）を返す"""
+    start = time.perf_counter()
+    response = client.post(path, json={'ingredients': INGREDIENTS, 'refresh': True}, buffered=False)
+    first = None
+    body = b''
+    for chunk in response.response:
+        if first is None and chunk:
+            first = time.perf_counter() - start
+        body += chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+    total = time.perf_counter() - start
+    response.close()
+    return first, total, body
+
+
+def main():
+    web_app.gemini_model = StubGeminiModel(first_delay=0.2, interval=0.1)
+    client = web_app.app.test_client()
+    
+    print(f"{'エンドポイント':<30} {'最初の応答(ms)':>14} {'全体(ms)':>10}")
+    for path in ['/api/suggest-recipe', '/api/suggest-recipe/stream']:
+        first, total, body = measure(client, path)
+        print(f"{path:<30} {first * 1000:>14.1f} {total * 1000:>10.1f}")
+    
+    assert b'event: done' in body, body
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+起動時間のベンチマーク
+新しいプロセスで oshaberi_web_app を import する時間と、最初のリクエストに
+応答するまでの時間を計測し、予算を超えたら終了コード 1 を返す
+
+GEMINI_API_KEY にはダミーの値を入れる（Gemini の初期化は最初のレシピ提案まで
+行われないので、API は呼ばれない）。比較のため google.generativeai 単体の
+import 時間も表示する。
+
+使い方:
+    python benchmarks/bench_startup.py
+    STARTUP_BUDGET_IMPORT_MS=400 STARTUP_BUDGET_FIRST_RESPONSE_MS=50 python benchmarks/bench_startup.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 5
+BUDGET_IMPORT_MS = float(os.environ.get('STARTUP_BUDGET_IMPORT_MS', 500))
+BUDGET_FIRST_RESPONSE_MS = float(os.environ.get('STARTUP_BUDGET_FIRST_RESPONSE_MS', 100))
+
+MEASURE_APP = '''
+import json, time
+start = time.perf_counter()
+import oshaberi_web_app
+imported = time.perf_counter()
+client = oshaberi_web_app.app.test_client()
+status = client.get('/api/get-ingredients').status_code
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'status': status,
+    'gemini_loaded': 'google.generativeai' in __import__('sys').modules,
+}))
+'''
+
+MEASURE_GENAI = '''
+import json, time
+start = time.perf_counter()
+import google.generativeai
+print(json.dumps({'import_ms': (time.perf_counter() - start) * 1000}))
+'''
+
+
+def run(code):
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY='dummy-key-for-startup-benchmark',
+        DATA_DIR=tempfile.mkdtemp(prefix='talkfridge_startup_'),
+        LOG_LEVEL='WARNING',
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    results = [run(MEASURE_APP) for _ in range(RUNS)]
+    import_ms = median([result['import_ms'] for result in results])
+    first_response_ms = median([result['first_response_ms'] for result in results])
+    genai_ms = median([run(MEASURE_GENAI)['import_ms'] for _ in range(RUNS)])
+    
+    assert all(result['status'] == 200 for result in results), results
+    assert not any(result['gemini_loaded'] for result in results), 'google.generativeai が起動時に読み込まれています'
+    
+    print(f"アプリの import:          {import_ms:8.1f} ms（予算 {BUDGET_IMPORT_MS:.0f} ms）")
+    print(f"最初の応答:               {first_response_ms:8.1f} ms（予算 {BUDGET_FIRST_RESPONSE_MS:.0f} ms）")
+    print(f"参考: google.generativeai の import: {genai_ms:8.1f} ms（最初のレシピ提案まで遅延）")
+    
+    over = import_ms > BUDGET_IMPORT_MS or first_response_ms > BUDGET_FIRST_RESPONSE_MS
+    if over:
+        print("⚠️ 起動時間が予算を超えています")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+/api/get-statistics のベンチマーク
+食材の件数を増やしながら、以前の全件集計（COUNT・GROUP BY・期限の範囲）と
+集計テーブルを使う現在の get_statistics、エンドポイント全体の時間を比較する
+
+使い方:
+    python benchmarks/bench_statistics.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 本物の API を呼ばないように、アプリを読み込む前に環境変数を設定
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_bench_')
+
+import oshaberi_web_app as web_app
+from ingredients_database import UPSERT_INGREDIENT_SQL, upsert_params
+
+SIZES = [1000, 10000, 100000]
+CATEGORIES = ['野菜', '肉類', '魚介類', '乳製品', '調味料', '果物', '主食', 'その他']
+REPEAT = 50
+
+
+def full_scan_statistics(db):
+    """以前の get_statistics（呼ぶたびに全件を集計する）"""
+    cursor = db._conn().cursor()
+    total_count = cursor.execute('SELECT COUNT(*) FROM ingredients').fetchone()[0]
+    category_stats = dict(cursor.execute(
+        'SELECT category, COUNT(*) FROM ingredients GROUP BY category'
+    ).fetchall())
+    expiring_soon = cursor.execute('''
+        SELECT COUNT(*) FROM ingredients
+        WHERE expiry_date <= DATE('now', '+3 days') AND expiry_date >= DATE('now')
+    ''').fetchone()[0]
+    return {'total_count': total_count, 'category_stats': category_stats, 'expiring_soon': expiring_soon}
+
+
+def fill(db, start, end):
+    """start〜end-1 番の食材を登録（期限は今日から0〜364日後に散らす）"""
+    today = date.today()
+    with db.connections.transaction() as conn:
+        conn.executemany(UPSERT_INGREDIENT_SQL, [
+            upsert_params(f'食材{i}', 1, '個', CATEGORIES[i % len(CATEGORIES)],
+                          (today + timedelta(days=i % 365)).isoformat(), None)
+            for i in range(start, end)
+        ])
+
+
+def median_ms(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    db = web_app.db
+    client = web_app.app.test_client()
+    
+    print(f"{'件数':>7} {'全件集計(ms)':>13} {'集計テーブル(ms)':>17} {'エンドポイント(ms)':>19}")
+    filled = 0
+    for n in SIZES:
+        fill(db, filled, n)
+        filled = n
+        assert full_scan_statistics(db) == db.get_statistics()
+        
+        old = median_ms(lambda: full_scan_statistics(db))
+        new = median_ms(db.get_statistics)
+        endpoint = median_ms(lambda: client.get('/api/get-statistics'))
+        print(f"{n:>7} {old:>13.3f} {new:>17.3f} {endpoint:>19.3f}")
+    
+    # 集計テーブルをわざと壊して、確認処理で作り直されることを確かめる
+    with db.connections.transaction() as conn:
+        conn.execute('UPDATE category_counts SET count = count + 1')
+    assert not db.check_statistics()
+    assert db.check_statistics()
+
+
+if __name__ == '__main__':
+    main()
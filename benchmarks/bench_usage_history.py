@@ -0,0 +1,115 @@
+"""
+使用履歴の集約・削除（maintenance.py）のベンチマーク
+1年分の使用履歴（1日 EVENTS_PER_DAY 件）を日付を進めながら書き込み、
+メンテナンスなしのDBと、1週間ごとにメンテナンスするDBで
+DBの大きさ・履歴の件数・書き込みの処理時間を比べる
+
+メンテナンスの各バッチ（1トランザクション）にかかった最長の時間も表示する。
+
+使い方:
+    python benchmarks/bench_usage_history.py
+    EVENTS_PER_DAY=2000 python benchmarks/bench_usage_history.py
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ingredients_database import IngredientsDatabase
+from maintenance import run_maintenance
+
+EVENTS_PER_DAY = int(os.environ.get('EVENTS_PER_DAY', 500))
+DAYS = 365
+INGREDIENTS = 60
+RETENTION_DAYS = 90
+WRITE_SAMPLES = 200
+START = date(2025, 1, 1)
+
+
+class TimedBatches:
+    """メンテナンスの各バッチの時間を記録する（db のメソッドを包む）"""
+    
+    def __init__(self, db):
+        self.longest = 0.0
+        for name in ('rollup_usage_history', 'delete_old_usage_history', 'incremental_vacuum'):
+            setattr(db, name, self._wrap(getattr(db, name)))
+    
+    def _wrap(self, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.longest = max(self.longest, time.perf_counter() - start)
+        return timed
+
+
+def make_db():
+    db = IngredientsDatabase(os.path.join(tempfile.mkdtemp(prefix='talkfridge_usage_'), 'usage.db'))
+    db.add_ingredients_bulk([
+        {'name': f'食材{i}', 'quantity': 10, 'unit': '個', 'category': '野菜'} for i in range(INGREDIENTS)
+    ])
+    return db
+
+
+def insert_day(db, day):
+    """day の1日分の履歴（追加と使用）を書き込む"""
+    with db.connections.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO usage_history (ingredient_id, action, quantity, timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            (1 + i % INGREDIENTS, 'use' if i % 3 else 'add', 1 + i % 4,
+             f'{day.isoformat()} {i * 86399 // EVENTS_PER_DAY // 3600:02d}:'
+             f'{i * 86399 // EVENTS_PER_DAY // 60 % 60:02d}:{i * 86399 // EVENTS_PER_DAY % 60:02d}')
+            for i in range(EVENTS_PER_DAY)
+        ])
+
+
+def write_latency_ms(db):
+    """使用の記録（履歴の追加を含む書き込み）の処理時間の中央値"""
+    times = []
+    for i in range(WRITE_SAMPLES):
+        start = time.perf_counter()
+        db.use_ingredient(1 + i % INGREDIENTS, 0.01)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    plain, maintained = make_db(), make_db()
+    batches = TimedBatches(maintained)
+    maintenance_seconds = 0.0
+    
+    print(f"1日 {EVENTS_PER_DAY} 件 × {DAYS} 日、保持 {RETENTION_DAYS} 日、1週間ごとにメンテナンス")
+    print(f"{'日数':>5} | {'なし: MB':>9} {'履歴':>8} {'書込ms':>7} | {'あり: MB':>9} {'履歴':>8} {'集計':>7} {'書込ms':>7}")
+    for offset in range(DAYS):
+        day = START + timedelta(days=offset)
+        insert_day(plain, day)
+        insert_day(maintained, day)
+        if offset % 7 == 6:
+            start = time.perf_counter()
+            run_maintenance(maintained, retention_days=RETENTION_DAYS, pause=0,
+                            now=(day + timedelta(days=1)).isoformat())
+            maintenance_seconds += time.perf_counter() - start
+        if offset % 60 == 59 or offset == DAYS - 1:
+            rows = []
+            for db in (plain, maintained):
+                stats = db.get_storage_stats()
+                rows.append((stats['size_bytes'] / 1024 / 1024, stats['usage_history_rows'],
+                             stats['usage_daily_rows'], write_latency_ms(db)))
+            (plain_mb, plain_rows, _, plain_ms), (kept_mb, kept_rows, daily_rows, kept_ms) = rows
+            print(f"{offset + 1:>5} | {plain_mb:>9.1f} {plain_rows:>8} {plain_ms:>7.3f} | "
+                  f"{kept_mb:>9.1f} {kept_rows:>8} {daily_rows:>7} {kept_ms:>7.3f}")
+    
+    print(f"メンテナンスの合計 {maintenance_seconds:.2f} 秒、1バッチの最長 {batches.longest * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
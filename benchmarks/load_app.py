@@ -0,0 +1,61 @@
+"""
+負荷テスト用のアプリ（load_suite.py から使う）
+一時ディレクトリのDBに食材を入れ、Gemini を遅延付きのスタブに差し替えた
+oshaberi_web_app.app を返す
+
+gunicorn からは次のように起動する（設定は環境変数で渡す）:
+    BENCH_ROWS=1000 BENCH_GEMINI_LATENCY=0.05 \
+        gunicorn --chdir benchmarks 'load_app:create_app()'
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = ['野菜', '肉類', '魚介類', '乳製品', '調味料', '果物', '主食', 'その他']
+UNITS = ['個', '本', '枚', 'g', 'パック']
+
+
+def seed(db, rows):
+    """rows 件の食材を登録（期限は今日から0〜59日後に散らす）"""
+    today = date.today()
+    db.add_ingredients_bulk([
+        {
+            'name': f'食材{i}',
+            'quantity': 1 + i % 5,
+            'unit': UNITS[i % len(UNITS)],
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'expiry_date': (today + timedelta(days=i % 60)).isoformat(),
+        }
+        for i in range(rows)
+    ])
+
+
+def create_app(rows=None, gemini_latency=None):
+    """計測用に準備したアプリを返す（同じプロセスで1回だけ呼ぶこと）"""
+    rows = int(os.environ.get('BENCH_ROWS', 1000)) if rows is None else rows
+    if gemini_latency is None:
+        gemini_latency = float(os.environ.get('BENCH_GEMINI_LATENCY', 0.05))
+    
+    # 本物の API を呼ばないように、アプリを読み込む前に環境変数を設定
+    os.environ['GEMINI_API_KEY'] = ''
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='talkfridge_load_')
+    # スタブなので使用回数の上限で断られないようにする
+    for name in ('GEMINI_RATE_PER_MINUTE', 'GEMINI_QUOTA_PER_DAY', 'GEMINI_QUOTA_PER_MONTH'):
+        os.environ.setdefault(name, '1000000000')
+    # 切断した /api/events のストリームは次のハートビートを書くときに終わるので、間隔を短くして
+    # スレッドを早く返す（既定の15秒のままだと gunicorn のスレッドが埋まる）
+    os.environ.setdefault('EVENTS_HEARTBEAT_SECONDS', '0.05')
+    
+    import oshaberi_web_app as web_app
+    from stub_gemini import StubGeminiModel
+    
+    # 最初のチャンクまで gemini_latency 秒、残り3チャンクは合わせて同じくらい
+    web_app.gemini_model = StubGeminiModel(first_delay=gemini_latency, interval=gemini_latency / 3)
+    seed(web_app.db, rows)
+    return web_app.app
@@ -0,0 +1,434 @@
+"""
+全エンドポイントの負荷テスト（オフラインで実行できる）
+食材を rows 件入れたDBと遅延付きの Gemini スタブで、各ルートを決まった
+同時実行数で叩き、スループットと p50/p95/p99 レイテンシを JSON で出力する
+
+- client   : Flask の test_client（アプリ本体の処理時間）
+- gunicorn : 実際の gunicorn プロセスに HTTP で接続（サーバー込みの時間）
+
+保存しておいたベースラインと比べて、遅くなったルートがあれば終了コード 1 を返す。
+
+使い方:
+    python benchmarks/load_suite.py                      # 計測して JSON を表示
+    python benchmarks/load_suite.py --output result.json
+    python benchmarks/load_suite.py --save-baseline      # benchmarks/baseline.json を更新
+    python benchmarks/load_suite.py --baseline benchmarks/baseline.json
+    python benchmarks/load_suite.py --mode client --rows 1000,100000 --concurrency 1,4,16
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# 世帯ごとのDBのルートで使う世帯キー
+HOUSEHOLD = 'load-bench'
+
+# each=True のルートに渡す通し番号
+REQUEST_NUMBERS = itertools.count()
+
+RECIPE_INGREDIENTS = [
+    {'name': '鶏肉', 'quantity': 2, 'unit': '枚'},
+    {'name': 'トマト', 'quantity': 3, 'unit': '個'},
+]
+
+
+class Route:
+    """計測する1つのリクエスト
+
+    path・body・headers は値か ctx を受け取る関数。
+    slow=True のルートは Gemini スタブを待つので、リクエスト数を減らす。
+    stream=True のルートは最初の行だけ読んで切断する（SSE の接続と切断）。
+    each=True のルートは1リクエストごとに作り直す（ctx['n'] に計測全体で重複しない通し番号が入る）。
+    """
+    
+    def __init__(self, name, method, path, body=None, headers=None, slow=False, stream=False, each=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.slow = slow
+        self.stream = stream
+        self.each = each
+    
+    def build(self, ctx):
+        resolve = lambda value: value(ctx) if callable(value) else value
+        return self.method, resolve(self.path), resolve(self.body), resolve(self.headers) or {}
+
+
+ROUTES = [
+    Route('index', 'GET', '/'),
+    Route('dictionary', 'GET', '/api/dictionary'),
+    Route('dictionary_bundle', 'GET', lambda ctx: f"/api/dictionary/{ctx['version']}.json"),
+    Route('parse_ingredients', 'POST', '/api/parse-ingredients',
+          {'text': 'にんじん2本とたまご3個、牛乳1本'}),
+    Route('parse_ingredients_batch', 'POST', '/api/parse-ingredients/batch',
+          {'texts': ['にんじん2本とたまご3個', '豚肉300g', 'キャベツ半分と玉ねぎ二つ'] * 10}),
+    Route('add_ingredients', 'POST', '/api/add-ingredients',
+          {'ingredients': [{'name': 'にんじん', 'quantity': 1, 'unit': '本', 'category': '野菜'}]}),
+    Route('get_ingredients', 'GET', '/api/get-ingredients'),
+    Route('get_ingredients_not_modified', 'GET', '/api/get-ingredients',
+          headers=lambda ctx: {'If-None-Match': ctx['etag']}),
+    Route('get_statistics', 'GET', '/api/get-statistics'),
+    Route('get_quota', 'GET', '/api/get-quota'),
+    Route('forecast', 'GET', '/api/forecast'),
+    Route('get_expiring_soon', 'GET', '/api/get-expiring-soon'),
+    Route('get_expiring_soon_long', 'GET', '/api/get-expiring-soon?days=30'),
+    Route('use_ingredient', 'POST', '/api/use-ingredient',
+          lambda ctx: {'ingredient_id': ctx['ingredient_id'], 'quantity': 0}),
+    Route('get_changes', 'GET', lambda ctx: f"/api/changes?since={ctx['cursor']}"),
+    Route('push_changes', 'POST', '/api/changes',
+          lambda ctx: {'mutations': [{'op': 'update', 'ingredient_id': ctx['ingredient_id'], 'notes': 'bench'}]}),
+    Route('suggest_recipe_cached', 'POST', '/api/suggest-recipe', {'ingredients': RECIPE_INGREDIENTS}),
+    Route('suggest_recipe', 'POST', '/api/suggest-recipe',
+          {'ingredients': RECIPE_INGREDIENTS, 'refresh': True}, slow=True),
+    Route('suggest_recipe_stream', 'POST', '/api/suggest-recipe/stream',
+          {'ingredients': RECIPE_INGREDIENTS, 'refresh': True}, slow=True),
+    Route('recipe_jobs_submit', 'POST', '/api/recipe-jobs',
+          {'ingredients': RECIPE_INGREDIENTS, 'refresh': True}),
+    Route('recipe_jobs_get', 'GET', lambda ctx: f"/api/recipe-jobs/{ctx['job_id']}"),
+    Route('recipe_jobs_cancel', 'DELETE', lambda ctx: f"/api/recipe-jobs/{ctx['job_id']}"),
+    Route('events', 'GET', '/api/events', slow=True, stream=True),
+    # 世帯ごとのDB（households.py）。同じ世帯は LRU に当たり、毎回違う世帯は開いて追い出す
+    Route('household_get_ingredients', 'GET', '/api/get-ingredients',
+          headers={'X-Household': HOUSEHOLD}),
+    Route('household_add_ingredients', 'POST', '/api/add-ingredients',
+          {'ingredients': [{'name': 'にんじん', 'quantity': 1, 'unit': '本', 'category': '野菜'}]},
+          headers={'X-Household': HOUSEHOLD}),
+    Route('household_cold', 'GET', '/api/get-statistics',
+          headers=lambda ctx: {'X-Household': f"load-cold-{ctx['n']}"}, slow=True, each=True),
+    Route('metrics', 'GET', '/metrics'),
+]
+
+
+# ---- リクエストの送り方 ----
+
+class ClientDriver:
+    """Flask の test_client で送る（スレッドごとにクライアントを持つ）"""
+    
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+    
+    def send(self, method, path, body=None, headers=None, stream=False):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers or {}, buffered=not stream)
+        if stream:
+            # 最初のチャンクだけ読んで閉じる（アプリ側のジェネレータも閉じられる）
+            data = next(iter(response.response), b'')
+        else:
+            data = response.get_data()
+        response.close()
+        return response.status_code, response.headers, data
+
+
+class HttpDriver:
+    """HTTP で送る（スレッドごとに keep-alive の接続を持つ）"""
+    
+    def __init__(self, port):
+        self.port = port
+        self._local = threading.local()
+    
+    def send(self, method, path, body=None, headers=None, stream=False):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if stream:
+            # ストリームは使い回さない接続で開き、最初の行を読んだら切断する
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.headers, response.readline()
+            finally:
+                conn.close()
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                return response.status, response.headers, data
+            except (http.client.HTTPException, OSError):
+                # サーバーに切られた接続は張り直して1回だけやり直す
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+
+# ---- 計測 ----
+
+def percentile(sorted_values, p):
+    """最近接順位法のパーセンタイル"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def prepare_context(driver):
+    """ルートが使う ID や ETag を、計測の直前に取得する"""
+    ctx = {}
+    _, _, body = driver.send('GET', '/api/dictionary')
+    ctx['version'] = json.loads(body)['version']
+    
+    _, headers, body = driver.send('GET', '/api/get-ingredients')
+    ctx['etag'] = headers.get('ETag')
+    ingredients = json.loads(body)['ingredients']
+    ctx['ingredient_id'] = ingredients[0]['id'] if ingredients else 0
+    
+    _, _, body = driver.send('GET', '/api/changes')
+    ctx['cursor'] = json.loads(body)['cursor']
+    
+    # キャッシュ済みのレシピと、問い合わせ用のジョブを用意
+    driver.send('POST', '/api/suggest-recipe', {'ingredients': RECIPE_INGREDIENTS})
+    _, _, body = driver.send('POST', '/api/recipe-jobs', {'ingredients': RECIPE_INGREDIENTS, 'refresh': True})
+    ctx['job_id'] = json.loads(body).get('job_id', 'missing')
+    return ctx
+
+
+def run_route(driver, route, concurrency, total):
+    """total 件のリクエストを concurrency 本のスレッドで送って集計する"""
+    ctx = prepare_context(driver)
+    method, path, body, headers = route.build(dict(ctx, n=next(REQUEST_NUMBERS)))
+    
+    # 接続やキャッシュを温めるため、最初の数件は集計しない
+    for _ in range(0 if route.slow else 5):
+        driver.send(method, path, body, headers, route.stream)
+    
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    remaining = [total]
+    
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            request = route.build(dict(ctx, n=next(REQUEST_NUMBERS))) if route.each else (method, path, body, headers)
+            start = time.perf_counter()
+            try:
+                status = driver.send(*request, route.stream)[0]
+            except Exception:
+                status = 'exception'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+    
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items()
+                 if status == 'exception' or status >= 400)
+    return {
+        'route': route.name,
+        'method': method,
+        'path': path,
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'throughput_rps': round(total / wall, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_routes(driver, args):
+    results = []
+    for route in ROUTES:
+        if args.routes and not any(name in route.name for name in args.routes):
+            continue
+        total = max(1, args.requests // 5) if route.slow else args.requests
+        for concurrency in args.concurrency:
+            results.append(run_route(driver, route, concurrency, max(total, concurrency)))
+    return results
+
+
+def run_client(args, rows):
+    """test_client での計測（アプリを読み込むので別プロセスで実行する）"""
+    command = [sys.executable, os.path.abspath(__file__), '--client-worker',
+               '--rows', str(rows), '--gemini-latency', str(args.gemini_latency),
+               '--requests', str(args.requests),
+               '--concurrency', ','.join(map(str, args.concurrency))]
+    if args.routes:
+        command += ['--routes', ','.join(args.routes)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    # 裏で動くレシピ生成のログが結果の後に出ることがあるので、結果の行を探す
+    return json.loads([line for line in output.splitlines() if line.startswith('[')][-1])
+
+
+def client_worker(args):
+    """--client-worker: このプロセスでアプリを準備して計測し、最後の行に JSON を出す"""
+    sys.path.insert(0, BENCH_DIR)
+    from load_app import create_app
+    app = create_app(rows=args.rows[0], gemini_latency=args.gemini_latency)
+    print(json.dumps(run_routes(ClientDriver(app), args), ensure_ascii=False))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_gunicorn(args, rows):
+    """gunicorn を起動して HTTP で計測"""
+    port = free_port()
+    env = dict(os.environ, BENCH_ROWS=str(rows), BENCH_GEMINI_LATENCY=str(args.gemini_latency))
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'load_app:create_app()',
+        '--chdir', BENCH_DIR, '--bind', f'127.0.0.1:{port}',
+        '--workers', '1', '--threads', str(max(args.concurrency) + 2), '--timeout', '120',
+    ], env=env, stdout=log, stderr=log)
+    try:
+        driver = HttpDriver(port)
+        deadline = time.time() + 60
+        while True:
+            try:
+                driver.send('GET', '/api/dictionary')
+                break
+            except OSError:
+                if process.poll() is not None or time.time() > deadline:
+                    log.seek(0)
+                    raise RuntimeError('gunicorn が起動しませんでした:\n' + log.read().decode('utf-8', 'replace'))
+                time.sleep(0.2)
+        return run_routes(driver, args)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+
+
+# ---- ベースラインとの比較 ----
+
+def result_key(result):
+    return (result['mode'], result['rows'], result['route'], result['concurrency'])
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """ベースラインより遅くなった（または失敗が増えた）項目を返す
+
+    p50・p95 が tolerance の割合以上かつ min_delta_ms 以上悪化したか、
+    スループットが tolerance の割合以上落ちた場合に遅くなったとみなす。
+    1ms 未満のルートはスレッドの切り替えだけで数倍ぶれるので、min_delta_ms で吸収する。
+    """
+    base = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = base.get(result_key(result))
+        if before is None:
+            continue
+        reasons = []
+        for metric in ('p50_ms', 'p95_ms'):
+            if (result[metric] > before[metric] * (1 + tolerance)
+                    and result[metric] - before[metric] > min_delta_ms):
+                reasons.append(f"{metric[:3]} {before[metric]}ms → {result[metric]}ms")
+        if result['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            reasons.append(f"throughput {before['throughput_rps']} → {result['throughput_rps']} req/s")
+        if result['errors'] > before['errors']:
+            reasons.append(f"errors {before['errors']} → {result['errors']}")
+        if reasons:
+            regressions.append({'key': list(result_key(result)), 'reasons': reasons})
+    return regressions
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def str_list(value):
+    return [item for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全エンドポイントの負荷テスト')
+    parser.add_argument('--mode', type=str_list, default=['client', 'gunicorn'],
+                        help='client,gunicorn のどちらか、または両方')
+    parser.add_argument('--rows', type=int_list, default=[1000], help='DBに入れる食材の件数（カンマ区切り）')
+    parser.add_argument('--concurrency', type=int_list, default=[1, 8], help='同時実行数（カンマ区切り）')
+    parser.add_argument('--requests', type=int, default=200, help='ルート・同時実行数ごとのリクエスト数')
+    parser.add_argument('--routes', type=str_list, default=[], help='名前に含む文字列でルートを絞り込む')
+    parser.add_argument('--gemini-latency', type=float, default=0.05, help='スタブが最初のチャンクを返すまでの秒数')
+    parser.add_argument('--output', help='結果の JSON を保存するファイル')
+    parser.add_argument('--baseline', help='比較するベースラインの JSON')
+    parser.add_argument('--save-baseline', action='store_true', help=f'結果を {DEFAULT_BASELINE} に保存')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='遅くなったとみなす割合')
+    parser.add_argument('--min-delta-ms', type=float, default=25.0, help='これ未満のレイテンシの悪化は無視する')
+    parser.add_argument('--client-worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.client_worker:
+        client_worker(args)
+        return 0
+    
+    results = []
+    for mode in args.mode:
+        for rows in args.rows:
+            print(f"⏱️ {mode} / {rows}件 を計測中...", file=sys.stderr)
+            runs = run_client(args, rows) if mode == 'client' else run_gunicorn(args, rows)
+            results += [{'mode': mode, 'rows': rows, **result} for result in runs]
+    
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'requests': args.requests,
+            'gemini_latency': args.gemini_latency,
+        },
+        'results': results,
+    }
+    
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"⚠️ 遅くなりました: {' / '.join(map(str, regression['key']))}: "
+                  f"{', '.join(regression['reasons'])}", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+    
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    for path in filter(None, [args.output, DEFAULT_BASELINE if args.save_baseline else None]):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
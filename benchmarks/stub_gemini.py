@@ -0,0 +1,60 @@
+"""
+オフライン計測・動作確認用の Gemini スタブ
+google.generativeai.GenerativeModel の generate_content と同じ呼び方ができる
+"""
+
+import time
+
+
+class StubChunk:
+    """generate_content の戻り値（.text を持つ）"""
+    
+    def __init__(self, text):
+        self.text = text
+
+
+class StubStreamResponse:
+    """stream=True のときの戻り値（チャンクを順に返す）"""
+    
+    def __init__(self, chunks, first_delay, interval):
+        self._chunks = chunks
+        self._first_delay = first_delay
+        self._interval = interval
+    
+    def __iter__(self):
+        for i, text in enumerate(self._chunks):
+            time.sleep(self._first_delay if i == 0 else self._interval)
+            yield StubChunk(text)
+    
+    @property
+    def text(self):
+        return ''.join(self._chunks)
+
+
+class StubGeminiModel:
+    """決まったスケジュールでチャンクを返すスタブモデル
+
+    first_delay 秒後に最初のチャンク、その後 interval 秒ごとに次のチャンクを返す。
+    stream=False のときは全チャンク分の時間を待ってからまとめて返す。
+    """
+    
+    def __init__(self, chunks=None, first_delay=0.2, interval=0.1):
+        self.chunks = chunks or [
+            "1. 【野菜炒め】\n",
+            "   - 必要な追加材料: 醤油\n",
+            "   - 作り方の概要: 切って炒める\n",
+            "   - 難易度: ★☆☆☆☆\n",
+        ]
+        self.first_delay = first_delay
+        self.interval = interval
+        self.calls = 0
+        self.prompts = []
+    
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        self.prompts.append(prompt)
+        response = StubStreamResponse(self.chunks, self.first_delay, self.interval)
+        if stream:
+            return response
+        time.sleep(self.first_delay + self.interval * (len(self.chunks) - 1))
+        return StubChunk(response.text)
@@ -0,0 +1,116 @@
+"""
+食材名のカテゴリ分類
+辞書のキーワードから Aho-Corasick オートマトンを起動時に1回だけ作り、
+食材名の長さに比例した時間でカテゴリを判定する（辞書の大きさには依存しない）
+
+判定ルール:
+1. 食材名が COMMON_FOOD_DICT に完全一致すればそのカテゴリ
+2. 食材名に含まれるキーワードのうち、最も長いものを優先
+   （「牛乳」は「牛」より長いので乳製品になる）
+3. 同じ長さなら COMMON_FOOD_DICT のキーワードを優先し、それでも同じなら先に出てきたもの
+"""
+
+from collections import deque
+
+from dictionary_bundle import DICTIONARY_BUNDLE
+
+# キーワードの出どころごとの優先度（大きいほど優先）
+PRIORITY_KEYWORD = 0
+PRIORITY_COMMON_FOOD = 1
+
+
+class CategoryClassifier:
+    """Aho-Corasick オートマトンによる最長一致のカテゴリ分類器"""
+    
+    def __init__(self, category_keywords=None, common_foods=None, default=None):
+        category_keywords = DICTIONARY_BUNDLE['category_keywords'] if category_keywords is None else category_keywords
+        common_foods = DICTIONARY_BUNDLE['common_foods'] if common_foods is None else common_foods
+        self.default = DICTIONARY_BUNDLE['default_category'] if default is None else default
+        
+        # 完全一致用（大文字小文字は区別しない）
+        self._exact = {name.lower(): category for name, category in common_foods.items()}
+        
+        # 各ノード: 遷移先 / 失敗時の遷移先 / このノードで終わる最良のキーワード
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]  # (長さ, 優先度, カテゴリ)
+        
+        for category, keywords in category_keywords.items():
+            for keyword in keywords:
+                self._add(keyword, (len(keyword), PRIORITY_KEYWORD, category))
+        for name, category in common_foods.items():
+            self._add(name, (len(name), PRIORITY_COMMON_FOOD, category))
+        
+        self._build_fail_links()
+    
+    def _add(self, keyword, output):
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._goto[node][char] = next_node
+            node = next_node
+        current = self._output[node]
+        if current is None or output[:2] > current[:2]:
+            self._output[node] = output
+    
+    def _build_fail_links(self):
+        """幅優先で失敗リンクを張り、各ノードの出力を失敗先の出力と合わせておく"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                child_fail = self._goto[fail].get(char, 0)
+                self._fail[child] = child_fail if child_fail != child else 0
+                
+                # 失敗先で終わるキーワード（接尾辞）の方が良ければそちらを持っておく
+                inherited = self._output[self._fail[child]]
+                own = self._output[child]
+                if inherited is not None and (own is None or inherited[:2] > own[:2]):
+                    self._output[child] = inherited
+                
+                queue.append(child)
+    
+    def classify(self, name):
+        """食材名からカテゴリを判定"""
+        if not name:
+            return self.default
+        lowered = name.lower()
+        
+        category = self._exact.get(lowered)
+        if category is not None:
+            return category
+        
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        best = None
+        node = 0
+        for char in lowered:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = output[node]
+            if found is not None and (best is None or found[:2] > best[:2]):
+                best = found
+        
+        return best[2] if best else self.default
+
+
+# 起動時に辞書ファイルから1回だけ作成
+default_classifier = CategoryClassifier()
+
+
+def guess_category(name):
+    """食材名からカテゴリを推測"""
+    return default_classifier.classify(name)
@@ -0,0 +1,127 @@
+"""
+食材解析の共通テストコーパスの確認
+parser_corpus.json の各発話を、サーバー（ingredient_parser.py）と
+ブラウザ（static/ingredient-parser.js）、PWA版（public/parse-utils.js）のすべてで解析し
+（JS は Node.js で実行）、期待値と一致するかを調べる。
+PWA版が読み込む public/ の辞書と解析器が書き出し直されているかも確認する。
+辞書や解析規則を変更したら実行すること。
+
+使い方:
+    python check_parser_corpus.py
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from dictionary_bundle import DICTIONARY_JSON, static_files
+from ingredient_parser import parse_text
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(ROOT, 'parser_corpus.json')
+JS_PARSER_PATH = os.path.join(ROOT, 'static', 'ingredient-parser.js')
+PUBLIC_DIR = os.path.join(ROOT, 'public')
+PWA_PARSER_PATH = os.path.join(PUBLIC_DIR, 'parse-utils.js')
+
+# Node.js で JS 版の解析器を動かすスクリプト（標準入力: 辞書と発話のリスト）
+NODE_SCRIPT = '''
+const IngredientParser = require(process.argv[1]);
+let input = '';
+process.stdin.on('data', (chunk) => { input += chunk; });
+process.stdin.on('end', () => {
+    const {bundle, texts} = JSON.parse(input);
+    const parser = new IngredientParser(bundle);
+    process.stdout.write(JSON.stringify(parser.parseMany(texts).map((r) => r.ingredients)));
+});
+'''
+
+# PWA版（public/parse-utils.js）を動かすスクリプト（標準入力: 発話のリスト）
+PWA_NODE_SCRIPT = '''
+console.log = () => {};
+const {parseIngredients} = require(process.argv[1]);
+let input = '';
+process.stdin.on('data', (chunk) => { input += chunk; });
+process.stdin.on('end', () => {
+    const texts = JSON.parse(input);
+    process.stdout.write(JSON.stringify(texts.map((text) => parseIngredients(text).ingredients)));
+});
+'''
+
+
+def run_node(script, path, payload):
+    """Node.js で script を実行して標準出力の JSON を返す（Node.js がなければ None）"""
+    node = shutil.which('node') or shutil.which('nodejs')
+    if node is None:
+        return None
+    completed = subprocess.run(
+        [node, '-e', script, path],
+        input=json.dumps(payload, ensure_ascii=False).encode('utf-8'), capture_output=True, check=True
+    )
+    return json.loads(completed.stdout)
+
+
+def run_js_parser(texts):
+    """JS 版で解析した結果（Node.js がなければ None）"""
+    return run_node(NODE_SCRIPT, JS_PARSER_PATH, {'bundle': json.loads(DICTIONARY_JSON), 'texts': texts})
+
+
+def run_pwa_parser(texts):
+    """PWA版で解析した結果（Node.js がなければ None）"""
+    return run_node(PWA_NODE_SCRIPT, PWA_PARSER_PATH, texts)
+
+
+def stale_public_files():
+    """public/ にある辞書・解析器のうち、書き出し直しが必要なもの"""
+    stale = []
+    for name, content in static_files().items():
+        path = os.path.join(PUBLIC_DIR, name)
+        try:
+            with open(path, 'rb') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != content:
+            stale.append(name)
+    return stale
+
+
+def normalize(ingredients):
+    """数量は 2 と 2.0 を同じとみなす"""
+    return [dict(item, quantity=float(item['quantity'])) for item in ingredients]
+
+
+def main():
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+    texts = [case['text'] for case in corpus]
+    
+    failures = 0
+    for name in stale_public_files():
+        failures += 1
+        print(f"❌ public/{name} が古いままです（python dictionary_bundle.py public/ で書き出してください）")
+    
+    results = {'python': [parse_text(text)['ingredients'] for text in texts]}
+    js_results = run_js_parser(texts)
+    if js_results is None:
+        print("⚠️ Node.js が見つからないため JS 版・PWA版の確認をスキップします")
+    else:
+        results['javascript'] = js_results
+        results['pwa'] = run_pwa_parser(texts)
+    
+    for side, outputs in results.items():
+        for case, actual in zip(corpus, outputs):
+            if normalize(actual) != normalize(case['expected']):
+                failures += 1
+                print(f"❌ [{side}] {case['text']!r}: {actual} != {case['expected']}")
+    
+    checked = ', '.join(results)
+    if failures:
+        print(f"❌ {failures}件が一致しませんでした（{checked}）")
+        sys.exit(1)
+    print(f"✅ {len(corpus)}件すべて一致しました（{checked}）")
+
+
+if __name__ == '__main__':
+    main()
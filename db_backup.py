@@ -0,0 +1,287 @@
+"""
+データベースのバックアップ（作成・圧縮・世代管理・検証・復元）
+IngredientsDatabase.backup_database（SQLite のバックアップ API）で動作中のDBを
+少しずつコピーし、検証してから gzip で圧縮して保存する。古いものは keep 個を残して削除する。
+
+アプリからは start_backup_scheduler() で BACKUP_INTERVAL_HOURS 時間ごとに裏のスレッド
+（scheduled_jobs.py）で作る。
+コピーは BACKUP_PAGES_PER_STEP ページずつ、圧縮は1MBずつ、間に BACKUP_STEP_SLEEP 秒休み、
+裏のスレッドは優先度も下げてあるので、リクエストの処理はほとんど遅くならない。
+
+使い方:
+    python db_backup.py create
+    python db_backup.py list
+    python db_backup.py verify [バックアップファイル]    （省略すると最新のもの）
+    python db_backup.py restore <バックアップファイル>   （アプリを止めてから実行）
+"""
+
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from app_logging import get_logger
+from scheduled_jobs import every_hours
+
+try:
+    import fcntl
+except ImportError:  # Windows では複数プロセス間の排他をしない
+    fcntl = None
+
+logger = get_logger('backup')
+
+DEFAULT_INTERVAL_HOURS = float(os.environ.get('BACKUP_INTERVAL_HOURS', 24))
+DEFAULT_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+DEFAULT_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 64))
+DEFAULT_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', 0.005))
+
+FILE_PREFIX = 'oshaberi_reizoko_'
+FILE_SUFFIX = '.db.gz'
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    """バックアップの作成・検証・復元に失敗した"""
+
+
+class DatabaseBackup:
+    """1つのDBのバックアップを backup_dir に作って管理する"""
+    
+    def __init__(self, db, backup_dir=None, keep=None, pages_per_step=None, step_sleep=None):
+        self.db = db
+        if backup_dir is None:
+            backup_dir = os.environ.get('BACKUP_DIR') or os.path.join(os.path.dirname(os.path.abspath(db.db_path)), 'backups')
+        self.backup_dir = backup_dir
+        self.keep = DEFAULT_KEEP if keep is None else keep
+        self.pages_per_step = DEFAULT_PAGES_PER_STEP if pages_per_step is None else pages_per_step
+        self.step_sleep = DEFAULT_STEP_SLEEP if step_sleep is None else step_sleep
+        self._lock = threading.Lock()
+    
+    # ---- 作成 ----
+    
+    def create(self):
+        """バックアップを1つ作って保存先のパスを返す（他のプロセスが作成中なら None）"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        with self._lock, _ProcessLock(os.path.join(self.backup_dir, '.lock')) as locked:
+            if not locked:
+                logger.info("ℹ️ 他のプロセスがバックアップ中のためスキップしました")
+                return None
+            
+            start = time.perf_counter()
+            name = f"{FILE_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            final_path = os.path.join(self.backup_dir, name + FILE_SUFFIX)
+            # 同じ秒に作ったもの（復元の直前など）を上書きしない
+            suffix = 1
+            while os.path.exists(final_path):
+                final_path = os.path.join(self.backup_dir, f'{name}_{suffix}{FILE_SUFFIX}')
+                suffix += 1
+            snapshot_path = final_path[:-len(FILE_SUFFIX)] + '.tmp.db'
+            partial_path = final_path + '.partial'
+            try:
+                self.db.backup_database(snapshot_path, pages=self.pages_per_step, step_sleep=self.step_sleep)
+                result = check_database(snapshot_path, full=False)
+                if not result['ok']:
+                    raise BackupError(f"コピーの検証に失敗しました: {result['integrity']}")
+                self._compress(snapshot_path, partial_path)
+                os.replace(partial_path, final_path)
+            finally:
+                for path in (snapshot_path, partial_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            
+            removed = self.rotate()
+            logger.info(f"💾 バックアップを作成しました: {final_path}（{os.path.getsize(final_path) / 1024:.0f} KB、"
+                        f"{time.perf_counter() - start:.2f} 秒、古いもの {len(removed)} 個を削除）")
+            return final_path
+    
+    def _compress(self, source_path, target_path):
+        with open(source_path, 'rb') as source, gzip.open(target_path, 'wb', compresslevel=6) as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                if self.step_sleep:
+                    time.sleep(self.step_sleep)
+    
+    # ---- 世代管理 ----
+    
+    def list_backups(self):
+        """バックアップのパス（古い順）"""
+        return sorted(glob.glob(os.path.join(self.backup_dir, FILE_PREFIX + '*' + FILE_SUFFIX)))
+    
+    def rotate(self):
+        """新しい keep 個を残して削除し、削除したパスを返す"""
+        backups = self.list_backups()
+        removed = backups[:-self.keep] if self.keep > 0 else []
+        for path in removed:
+            os.remove(path)
+        return removed
+    
+    # ---- 検証・復元 ----
+    
+    def verify(self, backup_path=None):
+        """バックアップを展開して整合性を確認する（backup_path を省略すると最新のもの）"""
+        backup_path = backup_path or self._latest()
+        with _Extracted(backup_path) as extracted_path:
+            result = check_database(extracted_path, full=True)
+        result['path'] = backup_path
+        return result
+    
+    def restore(self, backup_path):
+        """バックアップの内容でDBを置き換える（置き換える前の内容もバックアップしておく）
+
+        アプリを止めてから実行すること（動作中のプロセスのキャッシュは更新されない）。
+        """
+        with _Extracted(backup_path) as extracted_path:
+            result = check_database(extracted_path, full=True)
+            if not result['ok']:
+                raise BackupError(f"バックアップが壊れているため復元しません: {result['integrity']}")
+            previous = self.create()
+            source = sqlite3.connect(extracted_path)
+            target = sqlite3.connect(self.db.db_path, timeout=self.db.connections.busy_timeout_ms / 1000)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        logger.info(f"♻️ {backup_path} から復元しました（復元前の内容: {previous}）")
+        return previous
+    
+    def _latest(self):
+        backups = self.list_backups()
+        if not backups:
+            raise BackupError(f"バックアップがありません: {self.backup_dir}")
+        return backups[-1]
+
+
+def check_database(path, full=True):
+    """DBファイルの整合性（full=False なら quick_check）とスキーマのバージョン・食材の件数"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        pragma = 'integrity_check' if full else 'quick_check'
+        integrity = [row[0] for row in conn.execute(f'PRAGMA {pragma}').fetchall()]
+        user_version = conn.execute('PRAGMA user_version').fetchone()[0]
+        ingredients = conn.execute('SELECT COUNT(*) FROM ingredients').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return {'ok': False, 'integrity': str(e), 'user_version': None, 'ingredients': None}
+    finally:
+        conn.close()
+    return {
+        'ok': integrity == ['ok'],
+        'integrity': '; '.join(integrity),
+        'user_version': user_version,
+        'ingredients': ingredients,
+    }
+
+
+class _Extracted:
+    """gzip のバックアップを一時ファイルに展開する（with を抜けると削除）"""
+    
+    def __init__(self, backup_path):
+        self.backup_path = backup_path
+        self.path = None
+    
+    def __enter__(self):
+        if not os.path.exists(self.backup_path):
+            raise BackupError(f"バックアップが見つかりません: {self.backup_path}")
+        self.path = os.path.join(os.path.dirname(os.path.abspath(self.backup_path)),
+                                 f'.restore_{os.getpid()}_{threading.get_ident()}.db')
+        try:
+            with gzip.open(self.backup_path, 'rb') as source, open(self.path, 'wb') as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+        except (OSError, EOFError) as e:
+            self.__exit__(None, None, None)
+            raise BackupError(f"バックアップを展開できません: {e}") from e
+        return self.path
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.path:
+            for path in (self.path, self.path + '-journal'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class _ProcessLock:
+    """ファイルロックで複数プロセス（gunicorn のワーカー）が同時に作らないようにする"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        if fcntl is None:
+            return True
+        self._file = open(self.path, 'w')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+
+
+def start_backup_scheduler(backup, interval_hours=None, households=None):
+    """interval_hours 時間ごとに裏のスレッドでバックアップを作る（0 以下なら何もしない）
+
+    households（HouseholdRouter）を渡すと、世帯ごとのDBも backup_dir/households/<世帯キー>/ に作る。
+    """
+    interval_hours = DEFAULT_INTERVAL_HOURS if interval_hours is None else interval_hours
+    
+    def backup_household(key, household_db):
+        DatabaseBackup(household_db, os.path.join(backup.backup_dir, 'households', key), keep=backup.keep,
+                       pages_per_step=backup.pages_per_step, step_sleep=backup.step_sleep).create()
+    
+    def job():
+        backup.create()
+        if households is not None:
+            households.for_each(backup_household)
+    
+    return every_hours(interval_hours, job, 'バックアップ')
+
+
+def main(argv):
+    from ingredients_database import IngredientsDatabase
+    
+    if not argv or argv[0] not in ('create', 'list', 'verify', 'restore'):
+        print(__doc__.split('使い方:')[1])
+        return 2
+    command, args = argv[0], argv[1:]
+    backup = DatabaseBackup(IngredientsDatabase())
+    
+    try:
+        if command == 'create':
+            print(backup.create())
+        elif command == 'list':
+            for path in backup.list_backups():
+                print(f"{path}  {os.path.getsize(path) / 1024:.0f} KB")
+        elif command == 'verify':
+            result = backup.verify(args[0] if args else None)
+            print(f"{'✅' if result['ok'] else '❌'} {result['path']}: {result['integrity']}"
+                  f"（スキーマ {result['user_version']}、食材 {result['ingredients']} 件）")
+            return 0 if result['ok'] else 1
+        elif command == 'restore':
+            if not args:
+                print("復元するバックアップファイルを指定してください")
+                return 2
+            backup.restore(args[0])
+            print(f"✅ 復元しました: {args[0]}")
+    except BackupError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
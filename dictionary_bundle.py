@@ -0,0 +1,108 @@
+"""
+辞書ファイル（バージョン付き）の作成
+food_dictionary.py の内容を1つの JSON にまとめ、内容のハッシュをバージョンにする
+
+サーバーの解析（ingredient_parser.py / category_classifier.py）と
+ブラウザの解析（static/ingredient-parser.js）は同じ辞書ファイルを読み込むので、
+どちらで解析しても結果が一致する。
+
+PWA版（public/、サーバーなし）は、辞書をスクリプトにした public/food-dictionary.js と
+public/ingredient-parser.js（static/ からのコピー）を読み込む。
+辞書や static/ingredient-parser.js を変更したら、書き出し直してコミットすること
+（check_parser_corpus.py が古いままになっていないかを確認する）。
+
+使い方（静的ファイルとして書き出す場合）:
+    python dictionary_bundle.py public/
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import food_dictionary
+
+BUNDLE_FORMAT = 1
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+JS_PARSER_PATH = os.path.join(ROOT, 'static', 'ingredient-parser.js')
+
+
+def build_bundle():
+    """辞書をまとめた dict を作成（'version' は内容のハッシュ）"""
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'units': food_dictionary.UNITS,
+        'number_words': food_dictionary.NUMBER_WORDS,
+        'kanji_digits': food_dictionary.KANJI_DIGITS,
+        'kanji_units': food_dictionary.KANJI_UNITS,
+        'number_word_units': food_dictionary.NUMBER_WORD_UNITS,
+        'default_unit': food_dictionary.DEFAULT_UNIT,
+        'default_category': food_dictionary.DEFAULT_CATEGORY,
+        'split_pattern': food_dictionary.SPLIT_PATTERN,
+        'category_keywords': food_dictionary.CATEGORY_KEYWORDS,
+        'common_foods': food_dictionary.COMMON_FOOD_DICT,
+    }
+    body = json.dumps(bundle, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    bundle['version'] = hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+    return bundle
+
+
+def bundle_json(bundle):
+    """配信用の JSON（バイト列）"""
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# 起動時に1回だけ作成
+DICTIONARY_BUNDLE = build_bundle()
+DICTIONARY_VERSION = DICTIONARY_BUNDLE['version']
+DICTIONARY_JSON = bundle_json(DICTIONARY_BUNDLE)
+
+
+def write_bundle(directory):
+    """静的配信用に food-dictionary.<version>.json を書き出してパスを返す"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'food-dictionary.{DICTIONARY_VERSION}.json')
+    with open(path, 'wb') as f:
+        f.write(DICTIONARY_JSON)
+    return path
+
+
+def bundle_script():
+    """PWA版で <script> として読み込む辞書（window.FOOD_DICTIONARY に入れる）"""
+    return (
+        '// 自動生成（python dictionary_bundle.py public/）。直接編集しないこと\n'
+        '(function (root) {\n'
+        '    root.FOOD_DICTIONARY = ' + DICTIONARY_JSON.decode('utf-8') + ';\n'
+        "    if (typeof module !== 'undefined' && module.exports) {\n"
+        '        module.exports = root.FOOD_DICTIONARY;\n'
+        '    }\n'
+        "})(typeof window !== 'undefined' ? window : globalThis);\n"
+    ).encode('utf-8')
+
+
+def static_files():
+    """静的配信用に書き出すファイル（ファイル名: 内容）"""
+    with open(JS_PARSER_PATH, 'rb') as f:
+        parser_source = f.read()
+    return {
+        'food-dictionary.js': bundle_script(),
+        'ingredient-parser.js': parser_source,
+    }
+
+
+def write_static_files(directory):
+    """PWA版用の辞書と解析器を書き出してパスのリストを返す"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, content in static_files().items():
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    for path in write_static_files(sys.argv[1] if len(sys.argv) > 1 else '.'):
+        print(path)
@@ -0,0 +1,142 @@
+"""
+在庫の変更をリアルタイムに配信する（Server-Sent Events 用）
+ほかのタブや端末が /api/get-ingredients をポーリングしなくても、
+変更があったことを知れるようにする
+
+- 購読者ごとに上限付きのキューを持ち、publish はブロックしない
+- キューがあふれた（読み出しが遅い）購読者は切断する
+- 変更がない間は heartbeat_seconds ごとにコメント行だけを送る
+- イベントは topic（世帯キー）が同じ購読者にだけ配る
+
+購読者はプロセス内に保存されるので、gunicorn は --workers 1 で動かすこと。
+"""
+
+import os
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 64))
+DEFAULT_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 50))
+DEFAULT_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+
+# 読み出しが遅くて切断されたことを購読者に知らせる印
+_DROPPED = object()
+
+
+class TooManySubscribersError(Exception):
+    """購読者が上限に達している"""
+
+
+class Subscription:
+    """1つの接続（タブ・端末）分の購読"""
+    
+    def __init__(self, broker, queue_size, topic=None):
+        self._broker = broker
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+    
+    def offer(self, event):
+        """イベントを積む（あふれたら False）"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+    
+    def drop(self):
+        """切断の印を積む（キューが一杯でも必ず届くよう、1件捨ててから入れる）"""
+        self.dropped = True
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(_DROPPED)
+        except queue.Full:
+            pass
+    
+    def get(self, timeout):
+        """次のイベントを待つ（timeout 秒なければ None、切断されたら StopIteration）"""
+        try:
+            event = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if event is _DROPPED:
+            raise StopIteration
+        return event
+    
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class EventBroker:
+    """変更イベントを全購読者に配る"""
+    
+    def __init__(self, queue_size=None, max_subscribers=None, heartbeat_seconds=None):
+        self.queue_size = DEFAULT_QUEUE_SIZE if queue_size is None else queue_size
+        self.max_subscribers = DEFAULT_MAX_SUBSCRIBERS if max_subscribers is None else max_subscribers
+        self.heartbeat_seconds = DEFAULT_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+        self._subscribers = {}  # topic -> 購読者の set
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+    
+    def subscribe(self, topic=None):
+        """topic（世帯キーなど）のイベントだけを受け取る購読者を作る"""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribersError(f'接続数が上限（{self.max_subscribers}）に達しています')
+            subscription = Subscription(self, self.queue_size, topic)
+            self._subscribers.setdefault(topic, set()).add(subscription)
+            self._count += 1
+            return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._discard(subscription)
+    
+    def _discard(self, subscription):
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.remove(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.topic]
+    
+    def publish(self, event, topic=None):
+        """topic の全購読者にイベントを積む（呼び出し元を待たせない）"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+            self.published += 1
+        
+        slow = [subscription for subscription in subscribers if not subscription.offer(event)]
+        if slow:
+            with self._lock:
+                for subscription in slow:
+                    self._discard(subscription)
+                self.dropped += len(slow)
+            for subscription in slow:
+                subscription.drop()
+    
+    def stream(self, subscription):
+        """購読者へのイベントを順に返す（None はハートビート）"""
+        try:
+            while True:
+                try:
+                    yield subscription.get(self.heartbeat_seconds)
+                except StopIteration:
+                    return
+        finally:
+            subscription.close()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'max_subscribers': self.max_subscribers,
+                'published': self.published,
+                'dropped': self.dropped,
+            }
@@ -0,0 +1,142 @@
+"""
+賞味期限の区分（/api/get-expiring-soon）
+賞味期限が SWEEP_DAYS 日後までの食材と期限切れの食材を、期限の早い順に1回の範囲検索で読み、
+「期限切れ」「今日」「3日以内」「7日以内」に分けて持っておく。
+
+- 在庫（変更カウンタ）と日付が前回と同じなら、読み直さずに持っている区分を使う
+- 裏のスレッドで毎分、書き込みがあったか日付が変わったDBだけ区分を作り直す（start_expiry_sweeper）。
+  リクエストのときも同じ確認をするので、裏の処理がまだでも古い区分は返さない
+- days が SWEEP_DAYS 以下なら区分から二分探索で取り出すだけで、在庫の件数には関係しない。
+  それより先は idx_ingredients_expiry の範囲検索で読む
+
+日付は SQLite の DATE('now') と同じく UTC。
+"""
+
+import bisect
+import threading
+import weakref
+from datetime import date, datetime, timedelta, timezone
+
+from app_logging import get_logger
+from scheduled_jobs import every_hours
+
+logger = get_logger('expiry')
+
+# 区分として持っておく日数（これより先を聞かれたら DB を読む）
+SWEEP_DAYS = 7
+
+# 区分の名前と、今日から何日後までか
+BUCKETS = (('today', 0), ('within_3_days', 3), ('within_7_days', 7))
+
+
+def _days_left(expiry_date, today):
+    """期限まであと何日か（日付として読めなければ None）"""
+    try:
+        return (date.fromisoformat(str(expiry_date)[:10]) - today).days
+    except ValueError:
+        return None
+
+
+class _Sweep:
+    """ある時点の区分（作ったあとは変更しないので、ロックなしで読める）"""
+    
+    def __init__(self, key, today, rows):
+        self.key = key
+        self.today = today
+        self.rows = []
+        self.days_left = []
+        for row in rows:
+            days_left = _days_left(row['expiry_date'], today)
+            if days_left is None:
+                continue  # 日付として読めない期限は区分に入れない
+            self.rows.append(dict(row, days_left=days_left))
+            self.days_left.append(days_left)
+        # 期限切れは先頭から days_left < 0 の範囲
+        self.expired_end = bisect.bisect_left(self.days_left, 0)
+    
+    def within(self, days):
+        """今日から days 日後までに期限が来る食材"""
+        return self.rows[self.expired_end:bisect.bisect_right(self.days_left, days)]
+    
+    def expired(self):
+        return self.rows[:self.expired_end]
+    
+    def counts(self):
+        counts = {'expired': self.expired_end}
+        for name, days in BUCKETS:
+            counts[name] = bisect.bisect_right(self.days_left, days) - self.expired_end
+        return counts
+
+
+class ExpiryBuckets:
+    """1つのDBの賞味期限の区分"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sweep = None
+    
+    def get(self, db, today=None):
+        """最新の区分（在庫か日付が変わっていれば作り直す）"""
+        today = today or datetime.now(timezone.utc).date()
+        sweep = self._sweep
+        if sweep is not None and sweep.key == (db.get_change_version(), today):
+            return sweep
+        with self._lock:
+            # 待っている間に他のスレッドが作り直していればそれを使う
+            sweep = self._sweep
+            if sweep is None or sweep.key != (db.get_change_version(), today):
+                version, rows = db.get_expiry_window((today + timedelta(days=SWEEP_DAYS)).isoformat())
+                sweep = self._sweep = _Sweep((version, today), today, rows)
+            return sweep
+
+
+# DBごとの区分（DBが閉じられて参照がなくなれば一緒に消える）
+_buckets = weakref.WeakKeyDictionary()
+_buckets_lock = threading.Lock()
+
+
+def expiry_buckets(db):
+    """db の ExpiryBuckets（なければ作って、裏の更新の対象にする）"""
+    with _buckets_lock:
+        buckets = _buckets.get(db)
+        if buckets is None:
+            buckets = _buckets[db] = ExpiryBuckets()
+        return buckets
+
+
+def get_expiring(db, days=3, today=None):
+    """今日から days 日後までに期限が来る食材（'ingredients'）、期限切れの食材（'expired'）、区分ごとの件数（'counts'）"""
+    sweep = expiry_buckets(db).get(db, today)
+    if days <= SWEEP_DAYS:
+        ingredients = sweep.within(days)
+    else:
+        ingredients = [dict(row, days_left=_days_left(row['expiry_date'], sweep.today))
+                       for row in db.get_expiring_soon(days)]
+    return {'ingredients': ingredients, 'expired': sweep.expired(), 'counts': sweep.counts()}
+
+
+def sweep_all():
+    """区分を持っているすべてのDBで、書き込みがあったか日付が変わっていれば作り直す
+
+    世帯のDBは LRU から外れると閉じられるので、閉じたDBは対象から外す
+    （更新の途中で閉じられた場合は、そのDBの更新が失敗するだけで接続は作り直さない）。
+    """
+    with _buckets_lock:
+        items = list(_buckets.items())
+    for db, buckets in items:
+        if db.closed:
+            with _buckets_lock:
+                _buckets.pop(db, None)
+            continue
+        try:
+            buckets.get(db)
+        except Exception as e:
+            if not db.closed:
+                logger.warning(f"⚠️ 賞味期限の区分を更新できませんでした（{db.db_path}）: {e}")
+
+
+def start_expiry_sweeper(db=None):
+    """毎分、裏のスレッドで区分を更新する（db を渡すと最初から対象にする）"""
+    if db is not None:
+        expiry_buckets(db)
+    return every_hours(1 / 60, sweep_all, '賞味期限の区分の更新')
@@ -0,0 +1,140 @@
+"""
+食材辞書
+カテゴリ推測と音声入力の解析、同じ食材をまとめるときの正規化で使う辞書をまとめたもの
+（public/parse-utils.js の辞書とサーバー側のキーワードを統合）
+
+ここを変更すると dictionary_bundle.py が作る辞書ファイルのバージョンが変わり、
+サーバー（Python）とブラウザ（static/ingredient-parser.js）の両方に反映される。
+PWA版（public/）には python dictionary_bundle.py public/ で書き出し直して反映する。
+FOOD_ALIASES と UNIT_CONVERSIONS はサーバーの正規化（ingredient_normalizer.py）だけで使う。
+"""
+
+# カテゴリ推測のキーワード（食材名に含まれていればそのカテゴリ）
+CATEGORY_KEYWORDS = {
+    '肉': ['鶏', '肉', '豚', '牛', '魚', 'ハム', 'ベーコン', 'ソーセージ',
+          '鶏肉', '牛肉', '豚肉', 'ウインナー', 'チキン', 'もも', 'むね', 'ささみ',
+          'ひき肉', 'ミンチ', 'ステーキ', 'ロース', 'バラ', 'サーロイン'],
+    '野菜': ['トマト', 'ニンジン', 'キャベツ', '玉ねぎ', 'きゅうり', 'ピーマン', '白菜', '大根',
+            'にんじん', '人参', 'たまねぎ', 'レタス', 'ほうれん草', 'ほうれんそう', 'かぼちゃ',
+            'なす', 'ナス', 'ブロッコリー', 'もやし', 'じゃがいも', 'ジャガイモ', 'ゴボウ',
+            'ごぼう', 'レンコン', 'れんこん', 'さつまいも', 'サツマイモ'],
+    '乳製品': ['牛乳', 'チーズ', 'ヨーグルト', 'バター', '生クリーム',
+             'ぎゅうにゅう', 'ミルク', 'クリーム', 'マーガリン', 'アイス', 'アイスクリーム'],
+    'きのこ': ['しいたけ', 'まいたけ', 'えのき', 'しめじ', 'きのこ', 'マッシュルーム'],
+    '穀物': ['米', 'パン', '麺', 'うどん', 'そば', 'スパゲッティ',
+            'ご飯', 'パスタ', 'ラーメン', '小麦粉', 'お好み焼き粉', 'トースト', '食パン'],
+    '調味料': ['醤油', '味噌', '塩', '砂糖', '胡椒', '油',
+             'こしょう', 'サラダ油', 'オリーブオイル', '酢', 'みりん'],
+    '加工食品': ['豆腐', '納豆', 'こんにゃく', 'しらたき', 'わかめ', 'のり', '海苔', 'かつお節',
+              'だし', 'インスタント', 'カップ麺', 'レトルト'],
+    'その他': []
+}
+
+# よくある食材名・商品名とカテゴリ（キーワードより優先）
+COMMON_FOOD_DICT = {
+    # 野菜
+    '玉ねぎ': '野菜', 'たまねぎ': '野菜', 'ねぎ': '野菜', 'にんじん': '野菜', '人参': '野菜',
+    'じゃがいも': '野菜', 'ジャガイモ': '野菜', 'キャベツ': '野菜', 'トマト': '野菜',
+    'きゅうり': '野菜', 'ピーマン': '野菜', 'なす': '野菜', 'ナス': '野菜', '白菜': '野菜',
+    '大根': '野菜', 'かぼちゃ': '野菜', 'ブロッコリー': '野菜', 'ほうれん草': '野菜',
+    'ほうれんそう': '野菜', 'レタス': '野菜', 'もやし': '野菜', 'ゴボウ': '野菜',
+    'ごぼう': '野菜', 'レンコン': '野菜', 'れんこん': '野菜', 'さつまいも': '野菜',
+    'サツマイモ': '野菜', '里芋': '野菜', 'さといも': '野菜', '長ねぎ': '野菜',
+    '長ネギ': '野菜', 'わけぎ': '野菜',
+    
+    # きのこ
+    'しいたけ': 'きのこ', 'まいたけ': 'きのこ', 'えのき': 'きのこ', 'しめじ': 'きのこ',
+    'エリンギ': 'きのこ', 'マッシュルーム': 'きのこ',
+    
+    # 商品名・加工食品
+    'プチッと鍋': '加工食品', 'プチっと鍋': '加工食品', 'プチッと': '加工食品',
+    'プチっと': '加工食品', 'Puchitto Nabe': '加工食品', 'チキンラーメン': '加工食品',
+    'カップヌードル': '加工食品', 'インスタントラーメン': '加工食品',
+    
+    # 肉
+    '鶏肉': '肉', '牛肉': '肉', '豚肉': '肉', 'ハム': '肉', 'ベーコン': '肉',
+    'ソーセージ': '肉', 'ウインナー': '肉', 'チキン': '肉',
+    
+    # 魚介類・卵
+    '車海老': 'その他', 'えび': 'その他', 'エビ': 'その他', 'イカ': 'その他',
+    'いか': 'その他', 'マグロ': 'その他', 'まぐろ': 'その他', 'サーモン': 'その他',
+    'さけ': 'その他', '鮭': 'その他', 'さば': 'その他', '鯖': 'その他', 'あじ': 'その他',
+    '鯵': 'その他', '刺身': 'その他', 'お刺身': 'その他', 'さしみ': 'その他',
+    'サシミ': 'その他', '卵': 'その他', 'たまご': 'その他', 'タマゴ': 'その他',
+    
+    # 乳製品
+    '牛乳': '乳製品', 'ぎゅうにゅう': '乳製品', 'ミルク': '乳製品', 'バター': '乳製品',
+    'チーズ': '乳製品', 'ヨーグルト': '乳製品', '生クリーム': '乳製品', 'クリーム': '乳製品',
+    
+    # パン・穀物類
+    'トースト': '穀物', '食パン': '穀物', 'パン': '穀物',
+    
+    # その他
+    '豆腐': '加工食品', '納豆': '加工食品', 'こんにゃく': '加工食品', 'わかめ': '加工食品',
+    'のり': '加工食品', '海苔': '加工食品'
+}
+
+DEFAULT_CATEGORY = 'その他'
+
+# 単位（長いものを先に並べる）
+UNITS = ['リットル', 'パック', '入り', 'ml', 'kg', '枚', '個', '本', '片', 'つ', 'ヶ', 'g', 'l']
+
+# 日本語の数量（ひらがなの数え方）
+NUMBER_WORDS = {
+    'ひとつ': 1, 'ふたつ': 2, 'みっつ': 3, 'よっつ': 4, 'いつつ': 5,
+    'むっつ': 6, 'ななつ': 7, 'やっつ': 8, 'ここのつ': 9, 'とお': 10,
+}
+
+# 漢数字
+KANJI_DIGITS = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+KANJI_UNITS = {'十': 10, '百': 100}
+
+# 日本語の数量のあとに付けられる単位（省略時は DEFAULT_UNIT）
+NUMBER_WORD_UNITS = ['つ', '個', '枚', '本', '片', 'パック']
+DEFAULT_UNIT = '個'
+
+# 発話を食材ごとに分ける区切り（Python と JavaScript の両方で使える正規表現）
+# 「と」でも区切るが、NUMBER_WORDS の「ひとつ」と、食材の最後に付いた「とお」（単位付きを含む）の中の「と」では区切らない
+# （「とお刺身」「とお米」のように「お」で始まる食材の前では区切る）
+_TOO_END = 'お(?:' + '|'.join(NUMBER_WORD_UNITS) + ')?(?:[、，,と]|$)'
+SPLIT_PATTERN = f'とか|[、，,]|(?<!ひ)と(?!{_TOO_END})|(?<=ひ)と(?!つ|{_TOO_END})'
+
+# 同じ食材の別の書き方（代表の名前: 別名）。COMMON_FOOD_DICT にある漢字・ひらがなの組をもとにしたもの
+# カタカナとひらがなの違い・全角半角・空白は正規化でそろうので、ここには漢字との組だけ書けばよい
+FOOD_ALIASES = {
+    '玉ねぎ': ['たまねぎ', '玉葱'],
+    '長ねぎ': ['長葱', 'ながねぎ'],
+    '人参': ['にんじん'],
+    'じゃがいも': ['じゃが芋', '馬鈴薯'],
+    'なす': ['茄子'],
+    'きゅうり': ['胡瓜'],
+    'ほうれん草': ['ほうれんそう'],
+    'ごぼう': ['牛蒡'],
+    'れんこん': ['蓮根'],
+    'さつまいも': ['さつま芋', '薩摩芋'],
+    '里芋': ['さといも'],
+    'かぼちゃ': ['南瓜'],
+    'しいたけ': ['椎茸'],
+    'まいたけ': ['舞茸'],
+    'えび': ['海老'],
+    'いか': ['烏賊'],
+    'まぐろ': ['鮪'],
+    '鮭': ['さけ', 'しゃけ'],
+    'さば': ['鯖'],
+    'あじ': ['鯵'],
+    '刺身': ['お刺身', 'さしみ'],
+    '卵': ['たまご', '玉子'],
+    '牛乳': ['ぎゅうにゅう'],
+    '海苔': ['のり'],
+    'プチッと鍋': ['プチっと鍋'],
+}
+
+# 単位の換算（正規化した単位: (基準の単位, 倍率)）。ここにない単位はそのまま倍率1
+# 正規化で全角は半角・英字は小文字になり、「㎏」「㍑」のような文字も kg・リットル になる
+UNIT_CONVERSIONS = {
+    'g': ('g', 1), 'グラム': ('g', 1),
+    'kg': ('g', 1000), 'キロ': ('g', 1000), 'キログラム': ('g', 1000),
+    'ml': ('ml', 1), 'cc': ('ml', 1), 'ミリリットル': ('ml', 1),
+    'l': ('ml', 1000), 'リットル': ('ml', 1000),
+    'つ': ('個', 1), 'ヶ': ('個', 1), 'ケ': ('個', 1), 'コ': ('個', 1),
+}
@@ -0,0 +1,135 @@
+"""
+食材の消費ペースと、なくなる日の予測（/api/forecast）
+使用履歴（usage_history と日別集計の usage_daily）のうち直近 FORECAST_WINDOW_DAYS 日分の
+「使用」を (食材ID, 日, 数量) の列（NumPy の配列）として持ち、全食材をまとめて計算する。
+
+- 1日あたりの消費量 = 期間内に使った量 ÷ 日数（期間の始めと食材を登録した日の遅いほうから今日まで）
+- なくなるまでの日数 = 今の在庫 ÷ 1日あたりの消費量（期間内に使っていなければ予測しない）
+
+履歴は最初に1回読んだら保持し、次からは前回より後の使用履歴だけを読み足す。
+在庫（変更カウンタ）と日付が変わっていなければ、前回の結果をそのまま返す。
+日付は使用履歴と同じく UTC。
+"""
+
+import os
+import threading
+import weakref
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+DEFAULT_WINDOW_DAYS = int(os.environ.get('FORECAST_WINDOW_DAYS', 28))
+
+# これより先になる予測は日付を出さない（ほとんど使っていない食材）
+MAX_FORECAST_DAYS = 365 * 10
+
+_EPOCH = date(1970, 1, 1)
+_ROW_DTYPE = np.dtype([('ingredient_id', np.int64), ('day', np.int64), ('quantity', np.float64)])
+
+
+def _epoch_day(value):
+    """date か 'YYYY-MM-DD...' の文字列を、1970-01-01 からの日数にする"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return (value - _EPOCH).days
+
+
+def _columns(rows):
+    """(食材ID, 日, 数量) のリストを列ごとの配列にする"""
+    data = np.fromiter(rows, dtype=_ROW_DTYPE, count=len(rows))
+    return data['ingredient_id'], data['day'], data['quantity']
+
+
+class ConsumptionForecaster:
+    """1つのDBの予測（読んだ履歴の配列と前回の結果を保持する）"""
+    
+    def __init__(self, window_days=None):
+        self.window_days = DEFAULT_WINDOW_DAYS if window_days is None else window_days
+        self._lock = threading.Lock()
+        self._ingredient_ids, self._days, self._quantities = _columns([])
+        self._last_id = None        # 読んだ使用履歴の最後の id（None ならまだ読んでいない）
+        self._window_start = None   # 保持している期間の最初の日
+        self._cached_key = None
+        self._cached = None
+    
+    def forecast(self, db, today=None):
+        """在庫のある食材ごとの予測（なくなるのが早い順。予測できないものは最後）"""
+        today = today or datetime.now(timezone.utc).date()
+        with self._lock:
+            key = (db.get_change_version(), today)
+            if key != self._cached_key:
+                self._load(db, today)
+                self._cached = self._compute(db.get_ingredients(), today)
+                self._cached_key = key
+            return self._cached
+    
+    def _load(self, db, today):
+        """期間内の履歴を読む（2回目からは前回の続きだけ）"""
+        window_start = _epoch_day(today) - self.window_days + 1
+        since = (today - timedelta(days=self.window_days - 1)).isoformat()
+        if self._last_id is None:
+            rows, self._last_id = db.get_consumption(since)
+            self._ingredient_ids, self._days, self._quantities = _columns(rows)
+        else:
+            rows, self._last_id = db.get_consumption(since, self._last_id)
+            if rows:
+                ingredient_ids, days, quantities = _columns(rows)
+                self._ingredient_ids = np.concatenate([self._ingredient_ids, ingredient_ids])
+                self._days = np.concatenate([self._days, days])
+                self._quantities = np.concatenate([self._quantities, quantities])
+        
+        if window_start != self._window_start:
+            # 日付が変わったら、期間から外れた分を捨てる
+            keep = self._days >= window_start
+            self._ingredient_ids, self._days, self._quantities = (
+                self._ingredient_ids[keep], self._days[keep], self._quantities[keep])
+            self._window_start = window_start
+    
+    def _compute(self, ingredients, today):
+        ingredients = sorted((item for item in ingredients if item.get('quantity', 0) > 0), key=lambda item: item['id'])
+        if not ingredients:
+            return []
+        
+        ids = np.array([item['id'] for item in ingredients], dtype=np.int64)
+        quantity = np.array([float(item['quantity']) for item in ingredients])
+        created = np.array([_epoch_day(item.get('created_at') or today) for item in ingredients], dtype=np.int64)
+        
+        # 履歴の各行を在庫の食材の位置に対応させ、食材ごとに合計する（使い切って消えた食材の行は除く）
+        positions = np.minimum(np.searchsorted(ids, self._ingredient_ids), len(ids) - 1)
+        current = ids[positions] == self._ingredient_ids
+        used = np.bincount(positions[current], weights=self._quantities[current], minlength=len(ids))
+        
+        span = np.maximum(_epoch_day(today) - np.maximum(created, self._window_start) + 1, 1)
+        rate = used / span
+        days_left = np.divide(quantity, rate, out=np.full(len(ids), np.inf), where=rate > 0)
+        
+        results = []
+        for i in np.argsort(days_left, kind='stable'):
+            item = ingredients[i]
+            dated = bool(days_left[i] <= MAX_FORECAST_DAYS)
+            results.append({
+                'id': item['id'],
+                'name': item['name'],
+                'unit': item['unit'],
+                'category': item.get('category'),
+                'quantity': item['quantity'],
+                'used': round(float(used[i]), 3),
+                'daily_rate': round(float(rate[i]), 3),
+                'days_left': round(float(days_left[i]), 1) if np.isfinite(days_left[i]) else None,
+                'run_out_date': (today + timedelta(days=int(days_left[i]))).isoformat() if dated else None,
+            })
+        return results
+
+
+# DBごとの予測（DBが閉じられて参照がなくなれば一緒に消える）
+_forecasters = weakref.WeakKeyDictionary()
+_forecasters_lock = threading.Lock()
+
+
+def forecast_inventory(db, today=None):
+    """db の在庫の予測（ConsumptionForecaster.forecast）"""
+    with _forecasters_lock:
+        forecaster = _forecasters.get(db)
+        if forecaster is None:
+            forecaster = _forecasters[db] = ConsumptionForecaster()
+    return forecaster.forecast(db, today)
@@ -0,0 +1,199 @@
+"""
+Gemini API の使用回数の制限（レート制限とクォータ）
+上限に達していたら Gemini を呼ばずにすぐ QuotaExceededError を返す
+
+- 1分あたり: プロセス内のトークンバケット（連続したリクエストをならす）
+- 1日・1か月あたり: SQLite の api_usage テーブルに期間ごとの合計だけを保存
+
+複数のプロセス（gunicorn のワーカー）でも同じDBを数えるので上限は共有される。
+1回ごとにDBへ書き込まず、batch_size 回分をまとめて確保（リース）してから
+プロセス内で配る。確保は確認と加算を1つのトランザクションで行うので、全プロセスの
+合計が上限を超えることはない。残りが reserve_margin 回以下になったら1回ずつ確保し、
+使わなかった分は flush()（終了時）でDBに戻す。
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 無料枠の目安（料金について.md）: 1分15回、1日60回、1か月1,500回
+DEFAULT_PER_MINUTE = int(os.environ.get('GEMINI_RATE_PER_MINUTE', 15))
+DEFAULT_PER_DAY = int(os.environ.get('GEMINI_QUOTA_PER_DAY', 60))
+DEFAULT_PER_MONTH = int(os.environ.get('GEMINI_QUOTA_PER_MONTH', 1500))
+DEFAULT_BATCH_SIZE = int(os.environ.get('GEMINI_QUOTA_BATCH_SIZE', 5))
+DEFAULT_REFRESH_INTERVAL = float(os.environ.get('GEMINI_QUOTA_REFRESH_SECONDS', 10))
+DEFAULT_RESERVE_MARGIN = int(os.environ.get('GEMINI_QUOTA_RESERVE_MARGIN', 10))
+
+
+class QuotaExceededError(Exception):
+    """上限に達している（retry_after 秒後に再試行できる）"""
+    
+    def __init__(self, scope, retry_after, message):
+        super().__init__(message)
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """capacity 回まで連続で使え、1秒に rate 回分ずつ回復する"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self):
+        """1回分を取れたら 0、取れなければ回復までの秒数を返す"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+    
+    def refund(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+    
+    def available(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return int(self._tokens)
+
+
+class GeminiQuota:
+    """1分・1日・1か月の上限をまとめて管理する"""
+    
+    def __init__(self, db, per_minute=None, per_day=None, per_month=None,
+                 batch_size=None, reserve_margin=None, refresh_interval=None):
+        self.db = db
+        self.per_minute = DEFAULT_PER_MINUTE if per_minute is None else per_minute
+        self.per_day = DEFAULT_PER_DAY if per_day is None else per_day
+        self.per_month = DEFAULT_PER_MONTH if per_month is None else per_month
+        self.batch_size = DEFAULT_BATCH_SIZE if batch_size is None else batch_size
+        self.reserve_margin = DEFAULT_RESERVE_MARGIN if reserve_margin is None else reserve_margin
+        self.refresh_interval = DEFAULT_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.bucket = TokenBucket(self.per_minute / 60, self.per_minute)
+        
+        self._lock = threading.Lock()
+        self._periods = None     # (日の期間, 月の期間)
+        self._counts = {}        # 期間 -> DBの使用回数（確保済みの分を含む、最後に読んだ時点）
+        self._leased = 0         # 確保したがまだ使っていない回数
+        self._refreshed_at = 0.0
+    
+    # ---- 公開メソッド ----
+    
+    def acquire(self):
+        """1回分を使う（上限なら QuotaExceededError）"""
+        retry_after = self.bucket.try_acquire()
+        if retry_after:
+            raise QuotaExceededError('minute', retry_after, '1分あたりの Gemini API の上限に達しました。少し待ってから試してください')
+        try:
+            with self._lock:
+                self._roll_periods()
+                if not self._leased:
+                    # 使い切っているのが分かっていればDBを見ずに断る
+                    self._refresh()
+                    self._raise_if_exhausted()
+                    self._lease()
+                    if not self._leased:
+                        # 確保できなかったのは他のプロセスの分で上限に達したとき
+                        self._raise_if_exhausted()
+                self._leased -= 1
+        except QuotaExceededError:
+            self.bucket.refund()
+            raise
+    
+    def check(self):
+        """使わずに、今使えるかだけを確認（上限なら QuotaExceededError）"""
+        if self.bucket.available() < 1:
+            raise QuotaExceededError('minute', 60 / max(self.per_minute, 1),
+                                     '1分あたりの Gemini API の上限に達しました。少し待ってから試してください')
+        with self._lock:
+            self._roll_periods()
+            if not self._leased:
+                self._refresh()
+                self._raise_if_exhausted()
+    
+    def status(self):
+        """/api/get-quota 用の残り回数（確保済みでまだ使っていない分も使用済みとして数える）"""
+        with self._lock:
+            self._roll_periods()
+            self._refresh()
+            day, month = self._periods
+            daily_used, monthly_used = self._counts[day], self._counts[month]
+        return {
+            'daily_limit': self.per_day,
+            'daily_used': daily_used,
+            'daily_remaining': max(0, self.per_day - daily_used),
+            'monthly_limit': self.per_month,
+            'monthly_used': monthly_used,
+            'monthly_remaining': max(0, self.per_month - monthly_used),
+            'minute_limit': self.per_minute,
+            'minute_remaining': self.bucket.available(),
+        }
+    
+    def flush(self):
+        """確保したまま使わなかった回数をDBに戻す（終了時などに呼ぶ）"""
+        with self._lock:
+            self._release()
+    
+    # ---- 内部処理（self._lock を持った状態で呼ぶ） ----
+    
+    def _lease(self):
+        """DBから次の分を確保する（上限が近いときは1回分だけ）"""
+        day, month = self._periods
+        if self.db is None:
+            self._counts[day] = self._counts.get(day, 0)
+            self._counts[month] = self._counts.get(month, 0)
+            if self._counts[day] < self.per_day and self._counts[month] < self.per_month:
+                self._counts[day] += 1
+                self._counts[month] += 1
+                self._leased = 1
+            return
+        remaining = min(self.per_day - self._counts.get(day, 0), self.per_month - self._counts.get(month, 0))
+        amount = self.batch_size if remaining > self.reserve_margin + self.batch_size else 1
+        self._leased, self._counts = self.db.reserve_api_usage({day: self.per_day, month: self.per_month}, amount)
+        self._refreshed_at = time.monotonic()
+    
+    def _release(self):
+        if self._leased and self.db is not None and self._periods is not None:
+            day, month = self._periods
+            self._counts = self.db.add_api_usage({day: -self._leased, month: -self._leased})
+        self._leased = 0
+    
+    def _refresh(self):
+        """他のプロセスの分を反映するため、refresh_interval 秒ごとにDBを読み直す"""
+        if self.db is not None and time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._counts = self.db.get_api_usage(list(self._periods))
+            self._refreshed_at = time.monotonic()
+    
+    def _raise_if_exhausted(self):
+        day, month = self._periods
+        now = datetime.now()
+        if self._counts.get(month, 0) >= self.per_month:
+            next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            raise QuotaExceededError('month', (next_month - now).total_seconds(),
+                                     '今月の Gemini API の上限に達しました')
+        if self._counts.get(day, 0) >= self.per_day:
+            tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            raise QuotaExceededError('day', (tomorrow - now).total_seconds(),
+                                     '今日の Gemini API の上限に達しました。明日また試してください')
+    
+    def _roll_periods(self):
+        """日付・月が変わっていたら、前の期間の確保分を戻して数え直す"""
+        now = datetime.now()
+        periods = (f'day:{now:%Y-%m-%d}', f'month:{now:%Y-%m}')
+        if periods == self._periods:
+            return
+        self._release()
+        self._periods = periods
+        self._counts = self.db.get_api_usage(list(periods)) if self.db is not None else {}
+        self._refreshed_at = time.monotonic()
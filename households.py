@@ -0,0 +1,208 @@
+"""
+世帯ごとのデータベース（複数世帯モード）
+1つのデプロイで複数の世帯（家庭）の冷蔵庫を扱う。世帯ごとに別の SQLite ファイル
+（HOUSEHOLDS_DIR/<世帯キー>.db）を使うので、世帯どうしで書き込みロックを取り合わない。
+
+- 世帯キーはリクエストの X-Household ヘッダー（または ?household=）で渡す。
+  キーがなければ従来どおり oshaberi_reizoko.db を使う
+- 初めての世帯は、最初に使われたときにファイルとスキーマを作る
+- 開いたDBは LRU で最大 HOUSEHOLD_MAX_OPEN 個まで保持し、HOUSEHOLD_IDLE_SECONDS 秒
+  使われなかったものは閉じる。使用中（リクエストの処理中）のDBは閉じない
+
+世帯キーを知っていればその世帯の在庫を読み書きできるので、推測されにくい値
+（例: secrets.token_urlsafe(16)）を使うこと。
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app_logging import get_logger
+from ingredients_database import IngredientsDatabase
+
+logger = get_logger('households')
+
+DEFAULT_MAX_OPEN = int(os.environ.get('HOUSEHOLD_MAX_OPEN', 64))
+DEFAULT_IDLE_SECONDS = float(os.environ.get('HOUSEHOLD_IDLE_SECONDS', 300))
+
+# ファイル名に使うので英数字と - _ だけ
+KEY_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+FILE_SUFFIX = '.db'
+
+
+class InvalidHouseholdError(ValueError):
+    """世帯キーの形式が正しくない"""
+
+
+def check_key(key):
+    """世帯キーの形式を確認して返す（None は既定の世帯）"""
+    if key is None or KEY_PATTERN.fullmatch(key):
+        return key
+    raise InvalidHouseholdError('世帯キーは英数字と - _ の64文字以内で指定してください')
+
+
+class _Entry:
+    """LRU の1世帯分（db は開き終わるまで None）"""
+    
+    def __init__(self):
+        self.db = None
+        self.error = None
+        self.ready = threading.Event()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class HouseholdRouter:
+    """世帯キーから、その世帯の IngredientsDatabase を返す"""
+    
+    def __init__(self, default_db, households_dir=None, max_open=None, idle_seconds=None, on_open=None):
+        self.default_db = default_db
+        if households_dir is None:
+            households_dir = os.environ.get('HOUSEHOLDS_DIR') or os.path.join(
+                os.environ.get('DATA_DIR', os.getcwd()), 'households')
+        self.households_dir = households_dir
+        self.max_open = DEFAULT_MAX_OPEN if max_open is None else max_open
+        self.idle_seconds = DEFAULT_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.on_open = on_open      # on_open(key, db): DBを開いたときに呼ぶ（リスナーの登録など）
+        self._entries = OrderedDict()  # key -> _Entry（使われた順）
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def path_for(self, key):
+        return os.path.join(self.households_dir, check_key(key) + FILE_SUFFIX)
+    
+    # ---- 取得・返却 ----
+    
+    def acquire(self, key):
+        """key の世帯のDBを返す（使い終わったら release(key) を呼ぶ。None なら既定のDB）"""
+        if check_key(key) is None:
+            return self.default_db
+        with self._lock:
+            entry = self._entries.get(key)
+            opening = entry is None
+            if opening:
+                entry = self._entries[key] = _Entry()
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            entry.in_use += 1
+        
+        if opening:
+            self._open(key, entry)
+        else:
+            # 他のスレッドが開いている途中なら待つ
+            entry.ready.wait()
+        if entry.error is not None:
+            with self._lock:
+                entry.in_use -= 1
+            raise entry.error
+        return entry.db
+    
+    def release(self, key):
+        """acquire(key) で取得したDBを返す（使われていないDBが多すぎれば閉じる）"""
+        if key is None:
+            return
+        with self._lock:
+            entry = self._entries[key]
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            evicted = self._evict()
+        self._close(evicted)
+    
+    @contextmanager
+    def use(self, key):
+        """with router.use(key) as db: の形で acquire と release をまとめる"""
+        db = self.acquire(key)
+        try:
+            yield db
+        finally:
+            self.release(key)
+    
+    def close_idle(self):
+        """idle_seconds 秒使われていないDBを閉じる（定期的に呼ぶ）"""
+        with self._lock:
+            evicted = self._evict()
+        self._close(evicted)
+        return len(evicted)
+    
+    # ---- 全世帯 ----
+    
+    def keys(self):
+        """DBファイルのある世帯キー（名前順）"""
+        if not os.path.isdir(self.households_dir):
+            return []
+        keys = (name[:-len(FILE_SUFFIX)] for name in os.listdir(self.households_dir) if name.endswith(FILE_SUFFIX))
+        return sorted(key for key in keys if KEY_PATTERN.fullmatch(key))
+    
+    def for_each(self, job):
+        """全世帯のDBで順に job(key, db) を実行する（メンテナンス・バックアップ用）"""
+        for key in self.keys():
+            try:
+                with self.use(key) as db:
+                    job(key, db)
+            except Exception as e:
+                logger.warning(f"⚠️ 世帯 {key} の処理に失敗しました: {e}")
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._entries),
+                'in_use': sum(entry.in_use for entry in self._entries.values()),
+                'max_open': self.max_open,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+    
+    # ---- 内部処理 ----
+    
+    def _open(self, key, entry):
+        """世帯のDBを開く（ファイルがなければスキーマごと作る）"""
+        start = time.perf_counter()
+        try:
+            os.makedirs(self.households_dir, exist_ok=True)
+            db = IngredientsDatabase(self.path_for(key))
+            if self.on_open is not None:
+                self.on_open(key, db)
+        except Exception as e:
+            logger.warning(f"⚠️ 世帯 {key} のDBを開けませんでした: {e}")
+            entry.error = e
+            with self._lock:
+                # 次の acquire では開き直す
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+        else:
+            entry.db = db
+            logger.debug(f"🏠 世帯 {key} のDBを開きました（{time.perf_counter() - start:.3f} 秒）")
+        finally:
+            entry.ready.set()
+        
+        with self._lock:
+            evicted = self._evict()
+        self._close(evicted)
+    
+    def _evict(self):
+        """閉じる世帯を LRU から外して返す（self._lock を持った状態で呼ぶ）"""
+        now = time.monotonic()
+        excess = len(self._entries) - self.max_open
+        victims = []
+        # 古い順に見て、上限以内かつ最近使われた世帯まで来たら止める（毎回全体を見ない）
+        for key, entry in self._entries.items():
+            if excess <= 0 and now - entry.last_used < self.idle_seconds:
+                break
+            if entry.in_use or not entry.ready.is_set():
+                continue
+            victims.append(key)
+            excess -= 1
+        self.evictions += len(victims)
+        return [self._entries.pop(key).db for key in victims]
+    
+    def _close(self, databases):
+        for db in databases:
+            db.close()
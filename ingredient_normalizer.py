@@ -0,0 +1,69 @@
+"""
+食材名と単位の正規化
+同じ食材を1つの行にまとめるためのキーと、単位の換算（kg → g など）
+
+- 食材名のキー: NFKC（全角英数・半角カナをそろえる）→ 空白を除く → 英字は小文字 →
+  カタカナはひらがな にしてから、別名の表（FOOD_ALIASES）で代表の名前にそろえる
+  （「玉ねぎ」「たまねぎ」「タマネギ」「玉葱」はどれも「玉ねぎ」）
+- 単位: NFKC → 空白を除く → 英字は小文字 にしてから、UNIT_CONVERSIONS で基準の単位と倍率にする
+  （「1kg」は基準の単位 g で 1000、「500g」は 500 なので、同じ行にまとめて合計できる）
+
+別名の表は起動時に1回だけ作り、1件ごとの処理は辞書を1回引くだけにする。
+"""
+
+import unicodedata
+
+from food_dictionary import FOOD_ALIASES, UNIT_CONVERSIONS
+
+# カタカナ（ァ〜ヶ）をひらがなに
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def _fold(text):
+    """表記の揺れ（全角半角・空白・大文字小文字）をそろえる"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return ''.join(text.split()).lower()
+
+
+class IngredientNormalizer:
+    """食材名のキーと単位の換算"""
+    
+    def __init__(self, aliases=None, unit_conversions=None):
+        aliases = FOOD_ALIASES if aliases is None else aliases
+        unit_conversions = UNIT_CONVERSIONS if unit_conversions is None else unit_conversions
+        
+        # 別名（かなをそろえたもの）→ 代表の名前のキー
+        self._aliases = {}
+        for canonical, variants in aliases.items():
+            key = self._fold_name(canonical)
+            for variant in (canonical, *variants):
+                self._aliases[self._fold_name(variant)] = key
+        
+        self._units = {_fold(unit): (base, float(factor)) for unit, (base, factor) in unit_conversions.items()}
+    
+    @staticmethod
+    def _fold_name(name):
+        return _fold(name).translate(_KATAKANA_TO_HIRAGANA)
+    
+    def name_key(self, name):
+        """食材名のキー（同じ食材なら同じ文字列）"""
+        folded = self._fold_name(name)
+        return self._aliases.get(folded, folded)
+    
+    def unit_key(self, unit):
+        """(基準の単位, 倍率)。1 unit = 倍率 × 基準の単位"""
+        folded = _fold(unit)
+        return self._units.get(folded, (folded, 1.0))
+    
+    def normalize(self, name, unit):
+        """(食材名のキー, 基準の単位, 倍率)"""
+        return (self.name_key(name), *self.unit_key(unit))
+
+
+# 起動時に辞書から1回だけ作成
+default_normalizer = IngredientNormalizer()
+
+
+def normalize(name, unit):
+    """食材名と単位を正規化（IngredientNormalizer.normalize）"""
+    return default_normalizer.normalize(name, unit)
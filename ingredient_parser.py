@@ -0,0 +1,114 @@
+"""
+音声入力テキストの食材解析
+「鶏肉2枚、トマト3個」や「卵みっつ」のような発話から食材名・数量・単位を取り出す
+
+正規表現は読み込み時に1回だけコンパイルし、1件ごとの処理では
+print などの出力をしない（デバッグ情報は debug=True のときだけ返す）。
+"""
+
+import re
+
+from category_classifier import guess_category
+from dictionary_bundle import DICTIONARY_BUNDLE
+
+# 辞書ファイルから文法を読み込む（static/ingredient-parser.js も同じ辞書ファイルを使う）
+UNITS = DICTIONARY_BUNDLE['units']
+NUMBER_WORDS = DICTIONARY_BUNDLE['number_words']
+KANJI_DIGITS = DICTIONARY_BUNDLE['kanji_digits']
+KANJI_UNITS = DICTIONARY_BUNDLE['kanji_units']
+NUMBER_WORD_UNITS = DICTIONARY_BUNDLE['number_word_units']
+DEFAULT_UNIT = DICTIONARY_BUNDLE['default_unit']
+
+# 全角数字・小数点を半角に
+_FULLWIDTH = str.maketrans('０１２３４５６７８９．', '0123456789.')
+
+# 発話を食材ごとに分ける区切り
+SPLIT_PATTERN = re.compile(DICTIONARY_BUNDLE['split_pattern'])
+
+# 「食材名 + 数字 + 単位」（例: 鶏肉2枚）
+DIGIT_PATTERN = re.compile(
+    r'(?P<name>.+?)\s*(?P<number>[0-9]+(?:\.[0-9]+)?)\s*(?P<unit>' + '|'.join(map(re.escape, UNITS)) + ')'
+)
+
+# 「食材名 + 日本語の数量 (+ 単位)」（例: 卵みっつ、大根二本）。数量は末尾にあるものだけ
+WORD_PATTERN = re.compile(
+    r'(?P<name>.+?)\s*(?P<number>'
+    + '|'.join(map(re.escape, sorted(NUMBER_WORDS, key=len, reverse=True)))
+    + '|[' + ''.join(KANJI_DIGITS) + ''.join(KANJI_UNITS) + ']+)'
+    r'(?P<unit>' + '|'.join(map(re.escape, NUMBER_WORD_UNITS)) + r')?$'
+)
+
+
+def kanji_to_number(text):
+    """漢数字（一〜九百九十九）を数値に変換"""
+    total = 0
+    current = 0
+    for char in text:
+        if char in KANJI_DIGITS:
+            current = KANJI_DIGITS[char]
+        else:
+            total += (current or 1) * KANJI_UNITS[char]
+            current = 0
+    return total + current
+
+
+def parse_item(item):
+    """1つの食材表現を解析（解析できなければ None）"""
+    item = item.strip().translate(_FULLWIDTH)
+    if not item:
+        return None
+    
+    match = DIGIT_PATTERN.match(item)
+    if match:
+        quantity = float(match.group('number'))
+        unit = match.group('unit')
+    else:
+        match = WORD_PATTERN.match(item)
+        if not match:
+            return None
+        number = match.group('number')
+        quantity = float(NUMBER_WORDS[number] if number in NUMBER_WORDS else kanji_to_number(number))
+        unit = match.group('unit') or DEFAULT_UNIT
+    
+    name = match.group('name').strip()
+    if not name:
+        return None
+    
+    return {
+        'name': name,
+        'quantity': quantity,
+        'unit': unit,
+        'category': guess_category(name)
+    }
+
+
+def parse_text(text, debug=False):
+    """発話1つを解析して {'ingredients': [...]} を返す
+
+    debug=True のときは分割結果などを 'debug' に入れて返す。
+    """
+    items = SPLIT_PATTERN.split(text)
+    ingredients = []
+    failed = [] if debug else None
+    
+    for item in items:
+        parsed = parse_item(item)
+        if parsed is not None:
+            ingredients.append(parsed)
+        elif debug and item.strip():
+            failed.append(item.strip())
+    
+    result = {'ingredients': ingredients}
+    if debug:
+        result['debug'] = {
+            'original_text': text,
+            'parsed_items': items,
+            'failed_items': failed,
+            'success_count': len(ingredients)
+        }
+    return result
+
+
+def parse_many(texts, debug=False):
+    """複数の発話をまとめて解析（parse_text の結果のリスト）"""
+    return [parse_text(text, debug=debug) for text in texts]
@@ -3,26 +3,584 @@
 おしゃべり冷蔵庫用の食材管理機能
 """
 
+import os
 import sqlite3
-import json
-from datetime import datetime, date, timedelta
-from pathlib import Path
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+import metrics
+from metrics import (SQL_QUERY_DURATION, SQL_FETCH_DURATION, SQL_LOCK_WAITS,
+                     SQL_LOCK_WAIT_DURATION, SQL_LOCK_TIMEOUTS)
+from app_logging import get_logger
+from ingredient_normalizer import default_normalizer, normalize
+
+logger = get_logger('db')
+
+# ロック待ちのタイムアウト（ミリ秒）。環境変数 SQLITE_BUSY_TIMEOUT_MS で変更可能
+DEFAULT_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+# BEGIN IMMEDIATE にこれ以上かかったら、書き込みロックを待ったとみなす（秒）
+LOCK_WAIT_THRESHOLD = 0.001
+
+
+# クライアントに返す食材の列（name_key・unit_key・unit_factor は内部用なので含めない）
+INGREDIENT_COLUMNS = 'id, name, quantity, unit, category, expiry_date, notes, created_at, updated_at'
+
+
+# 食材の追加（正規化した食材名と基準の単位が同じ行があれば、その行の単位に換算して数量を加算）
+# 値は upsert_params で作る
+UPSERT_INGREDIENT_SQL = '''
+    INSERT INTO ingredients
+    (name, quantity, unit, category, expiry_date, notes, name_key, unit_key, unit_factor)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (name_key, unit_key) DO UPDATE SET
+        quantity = quantity + excluded.quantity * excluded.unit_factor / unit_factor,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+
+class MutationConflictError(Exception):
+    """apply_mutations の index 番目の変更が他の食材と衝突した（全体はロールバック済み）"""
+    
+    def __init__(self, index, message):
+        super().__init__(message)
+        self.index = index
+
+
+def upsert_params(name, quantity, unit, category=None, expiry_date=None, notes=None):
+    """UPSERT_INGREDIENT_SQL に渡す値（食材名のキーと単位の換算を付ける）"""
+    name_key, unit_key, unit_factor = normalize(name, unit)
+    return (name, quantity, unit, category, expiry_date, notes, name_key, unit_key, unit_factor)
+
+
+def _migration_001_indexes(cursor):
+    """(name, unit) の重複をまとめてから、ユニークインデックスと検索用インデックスを作成"""
+    # 重複行の履歴を、残す行（一番小さいID）に付け替える
+    cursor.execute('''
+        UPDATE usage_history
+        SET ingredient_id = (
+            SELECT MIN(keep.id) FROM ingredients AS dup
+            JOIN ingredients AS keep ON keep.name = dup.name AND keep.unit = dup.unit
+            WHERE dup.id = usage_history.ingredient_id
+        )
+        WHERE ingredient_id IN (
+            SELECT dup.id FROM ingredients AS dup
+            JOIN ingredients AS keep ON keep.name = dup.name AND keep.unit = dup.unit
+            WHERE keep.id < dup.id
+        )
+    ''')
+    # 数量を合算して、重複行を削除
+    cursor.execute('''
+        UPDATE ingredients
+        SET quantity = (
+            SELECT SUM(other.quantity) FROM ingredients AS other
+            WHERE other.name = ingredients.name AND other.unit = ingredients.unit
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM ingredients
+            GROUP BY name, unit HAVING COUNT(*) > 1
+        )
+    ''')
+    cursor.execute('''
+        DELETE FROM ingredients
+        WHERE id NOT IN (SELECT MIN(id) FROM ingredients GROUP BY name, unit)
+    ''')
+    
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_ingredients_name_unit ON ingredients (name, unit)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ingredients_expiry ON ingredients (expiry_date, name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ingredients_category ON ingredients (category)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_usage_history_ingredient ON usage_history (ingredient_id, timestamp)')
+
+
+def _migration_002_recipe_cache(cursor):
+    """レシピ提案キャッシュ用のテーブルを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_cache (
+            cache_key TEXT PRIMARY KEY,
+            ingredients_used TEXT,
+            recipe_content TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipe_cache_last_used ON recipe_cache (last_used_at)')
+
+
+def _migration_003_change_version(cursor):
+    """食材テーブルの変更回数（ETag 用）を数えるテーブルとトリガーを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO change_version (id, version) VALUES (1, 0)')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_ingredients_version_{event.lower()}
+            AFTER {event} ON ingredients
+            BEGIN
+                UPDATE change_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _migration_004_change_log(cursor):
+    """差分同期用の変更ログ（食材ごとの追加・更新・削除）をトリガーで記録"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingredient_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ingredient_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for event, op, row in (('INSERT', 'upsert', 'NEW'), ('UPDATE', 'upsert', 'NEW'), ('DELETE', 'delete', 'OLD')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_ingredients_changes_{event.lower()}
+            AFTER {event} ON ingredients
+            BEGIN
+                INSERT INTO ingredient_changes (ingredient_id, op) VALUES ({row}.id, '{op}');
+            END
+        ''')
+
+
+def _migration_005_category_counts(cursor):
+    """カテゴリ別の食材数をトリガーで数え続ける集計テーブル（統計を全件集計せずに返す）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_counts (
+            category TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_category_counts_insert
+        AFTER INSERT ON ingredients
+        BEGIN
+            UPDATE category_counts SET count = count + 1 WHERE category IS NEW.category;
+            INSERT INTO category_counts (category, count)
+            SELECT NEW.category, 1
+            WHERE NOT EXISTS (SELECT 1 FROM category_counts WHERE category IS NEW.category);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_category_counts_delete
+        AFTER DELETE ON ingredients
+        BEGIN
+            UPDATE category_counts SET count = count - 1 WHERE category IS OLD.category;
+            DELETE FROM category_counts WHERE category IS OLD.category AND count <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_category_counts_update
+        AFTER UPDATE OF category ON ingredients
+        WHEN OLD.category IS NOT NEW.category
+        BEGIN
+            UPDATE category_counts SET count = count - 1 WHERE category IS OLD.category;
+            DELETE FROM category_counts WHERE category IS OLD.category AND count <= 0;
+            UPDATE category_counts SET count = count + 1 WHERE category IS NEW.category;
+            INSERT INTO category_counts (category, count)
+            SELECT NEW.category, 1
+            WHERE NOT EXISTS (SELECT 1 FROM category_counts WHERE category IS NEW.category);
+        END
+    ''')
+    _rebuild_category_counts(cursor)
+
+
+def _rebuild_category_counts(cursor):
+    """集計テーブルを ingredients から作り直す"""
+    cursor.execute('DELETE FROM category_counts')
+    cursor.execute('''
+        INSERT INTO category_counts (category, count)
+        SELECT category, COUNT(*) FROM ingredients GROUP BY category
+    ''')
+
+
+def _statistics_match(cursor):
+    """category_counts が ingredients のカテゴリ別の件数と一致しているか"""
+    expected = dict(cursor.execute('SELECT category, COUNT(*) FROM ingredients GROUP BY category').fetchall())
+    actual = dict(cursor.execute('SELECT category, count FROM category_counts').fetchall())
+    return expected == actual
+
+
+def _migration_006_api_usage(cursor):
+    """Gemini API の使用回数（期間ごとの合計だけを持つ。1回ごとの記録はしない）"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_usage (
+            period TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _migration_007_usage_rollup(cursor):
+    """使用履歴の日別集計テーブルと、集約処理の進み具合を保存するテーブルを作成"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            day TEXT NOT NULL,
+            ingredient_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            quantity REAL NOT NULL,
+            PRIMARY KEY (day, ingredient_id, action)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+
+
+def _migration_008_canonical_keys(cursor):
+    """正規化した食材名と基準の単位の列を足し、同じ食材になる行をまとめてユニークインデックスを張り替える"""
+    cursor.execute('ALTER TABLE ingredients ADD COLUMN name_key TEXT')
+    cursor.execute('ALTER TABLE ingredients ADD COLUMN unit_key TEXT')
+    cursor.execute('ALTER TABLE ingredients ADD COLUMN unit_factor REAL NOT NULL DEFAULT 1')
+    
+    rows = cursor.execute('SELECT id, name, unit FROM ingredients').fetchall()
+    cursor.executemany('UPDATE ingredients SET name_key = ?, unit_key = ?, unit_factor = ? WHERE id = ?',
+                       [(*normalize(name, unit), ingredient_id) for ingredient_id, name, unit in rows])
+    # まとめる間だけ使う（ユニークインデックスは重複を消してから作る）
+    cursor.execute('CREATE INDEX idx_ingredients_key_merge ON ingredients (name_key, unit_key, id)')
+    
+    # まとめる行 → 残す行（一番小さいID）と、数量を残す行の単位に換算する倍率
+    cursor.execute('''
+        CREATE TEMP TABLE ingredient_merge AS
+        SELECT dup.id AS dup_id, keep.id AS keep_id, dup.unit_factor / keep.unit_factor AS ratio
+        FROM ingredients AS dup
+        JOIN ingredients AS keep ON keep.id = (
+            SELECT MIN(id) FROM ingredients
+            WHERE name_key = dup.name_key AND unit_key = dup.unit_key
+        )
+        WHERE keep.id < dup.id
+    ''')
+    
+    # 履歴と日別集計を残す行に付け替える（数量は残す行の単位に換算）
+    cursor.execute('''
+        UPDATE usage_history
+        SET ingredient_id = m.keep_id, quantity = usage_history.quantity * m.ratio
+        FROM temp.ingredient_merge AS m
+        WHERE usage_history.ingredient_id = m.dup_id
+    ''')
+    cursor.execute('''
+        INSERT INTO usage_daily (day, ingredient_id, action, events, quantity)
+        SELECT d.day, m.keep_id, d.action, SUM(d.events), SUM(d.quantity * m.ratio)
+        FROM usage_daily AS d JOIN temp.ingredient_merge AS m ON d.ingredient_id = m.dup_id
+        GROUP BY d.day, m.keep_id, d.action
+        ON CONFLICT (day, ingredient_id, action) DO UPDATE SET
+            events = events + excluded.events,
+            quantity = quantity + excluded.quantity
+    ''')
+    cursor.execute('DELETE FROM usage_daily WHERE ingredient_id IN (SELECT dup_id FROM temp.ingredient_merge)')
+    
+    # 数量を合算（期限は一番早いもの）して、まとめた行を削除
+    cursor.execute('''
+        UPDATE ingredients
+        SET quantity = (
+                SELECT SUM(other.quantity * other.unit_factor) FROM ingredients AS other
+                WHERE other.name_key = ingredients.name_key AND other.unit_key = ingredients.unit_key
+            ) / unit_factor,
+            expiry_date = (
+                SELECT MIN(other.expiry_date) FROM ingredients AS other
+                WHERE other.name_key = ingredients.name_key AND other.unit_key = ingredients.unit_key
+            ),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT keep_id FROM temp.ingredient_merge)
+    ''')
+    cursor.execute('DELETE FROM ingredients WHERE id IN (SELECT dup_id FROM temp.ingredient_merge)')
+    cursor.execute('DROP TABLE temp.ingredient_merge')
+    
+    cursor.execute('DROP INDEX idx_ingredients_key_merge')
+    cursor.execute('DROP INDEX IF EXISTS idx_ingredients_name_unit')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_ingredients_key ON ingredients (name_key, unit_key)')
+
+
+def _migration_009_drop_base_quantity(cursor):
+    """以前の 8 で足していた生成列 base_quantity を削除（どのクエリも使っていなかった）"""
+    columns = [row[1] for row in cursor.execute('PRAGMA table_xinfo(ingredients)')]
+    if 'base_quantity' in columns:
+        cursor.execute('ALTER TABLE ingredients DROP COLUMN base_quantity')
+
+
+# スキーママイグレーション（PRAGMA user_version で適用済みバージョンを管理）
+# 追加するときは (バージョン, 説明, 関数) を末尾に足す
+SCHEMA_MIGRATIONS = [
+    (1, 'インデックスの追加と (name, unit) の重複統合', _migration_001_indexes),
+    (2, 'レシピ提案キャッシュ', _migration_002_recipe_cache),
+    (3, '食材テーブルの変更カウンタ', _migration_003_change_version),
+    (4, '差分同期用の変更ログ', _migration_004_change_log),
+    (5, 'カテゴリ別の食材数の集計テーブル', _migration_005_category_counts),
+    (6, 'Gemini API の使用回数', _migration_006_api_usage),
+    (7, '使用履歴の日別集計', _migration_007_usage_rollup),
+    (8, '食材名と単位の正規化（表記の揺れと単位違いの重複統合）', _migration_008_canonical_keys),
+    (9, '使われていない base_quantity 列の削除', _migration_009_drop_base_quantity),
+]
+
+
+class TimedCursor(sqlite3.Cursor):
+    """execute と fetchall にかかった時間を metrics に記録するカーソル
+
+    fetchone は1行しか読まない（ほぼ execute の時点で終わっている）ので計測しない。
+    """
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            _count_lock_timeout(e)
+            raise
+        finally:
+            SQL_QUERY_DURATION.observe(time.perf_counter() - start, _statement_label(sql))
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.OperationalError as e:
+            _count_lock_timeout(e)
+            raise
+        finally:
+            SQL_QUERY_DURATION.observe(time.perf_counter() - start, _statement_label(sql))
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        SQL_FETCH_DURATION.observe(time.perf_counter() - start)
+        return rows
+
+
+class TimedConnection(sqlite3.Connection):
+    """カーソルを TimedCursor にする接続（conn.execute も含めて計測される）"""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return super().cursor(TimedCursor).execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return super().cursor(TimedCursor).executemany(sql, seq_of_parameters)
+
+
+_statement_labels = {}
+
+
+def _statement_label(sql):
+    """SQL の先頭のキーワード（SELECT / INSERT など）をラベルにする"""
+    label = _statement_labels.get(sql)
+    if label is None:
+        words = sql.split(None, 1)
+        label = (words[0].upper() if words else '',)
+        if len(_statement_labels) < 1000:
+            _statement_labels[sql] = label
+    return label
+
+
+def _count_lock_timeout(error):
+    if 'locked' in str(error):
+        SQL_LOCK_TIMEOUTS.inc()
+
+
+class _ThreadConnection:
+    """threading.local に置く接続の入れ物
+
+    スレッドが終了して threading.local から外れると回収され、
+    finalizer が接続を閉じる。
+    """
+    __slots__ = ('conn', 'finalizer', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.finalizer = weakref.finalize(self, _close_connection, conn)
+
+
+def _close_connection(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class ConnectionManager:
+    """スレッドごとにSQLite接続を1本だけ保持する接続マネージャ
+
+    gunicorn のスレッドワーカーでも接続を使い回せるように、接続は
+    threading.local に保存する。WALモードにより読み込みと書き込みが
+    互いをブロックしない。Werkzeug の開発サーバーのようにリクエストごとに
+    スレッドを作る場合でも、スレッドの終了時に接続を閉じるので
+    ファイルディスクリプタは溜まらない。
+    """
+    
+    def __init__(self, db_path, busy_timeout_ms=None):
+        self.db_path = db_path
+        self.busy_timeout_ms = DEFAULT_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # close_all 用。スレッドが終了した分は自動的に消える
+        self._holders = weakref.WeakSet()
+        self.closed = False
+    
+    def _connect(self):
+        # 自動トランザクションは使わず、transaction() で明示的に BEGIN する
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=TimedConnection if metrics.ENABLED else sqlite3.Connection,
+        )
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        # 新しく作るDBでは、削除した分の領域を incremental_vacuum で少しずつ返せるようにする
+        # （既存のDBでは VACUUM するまで変わらないうえ、設定するだけで書き込みが発生するので空のときだけ）
+        if conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('PRAGMA journal_mode = WAL')
+        # WALではNORMALでもコミット済みデータは壊れない（電源断時に直近のコミットが失われるだけ）
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute('PRAGMA cache_size = -8000')
+        return conn
+    
+    def get(self):
+        """現在のスレッド用の接続を取得（なければ作成）"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            # close_all の後に接続を作り直すと、誰も閉じない接続が残る
+            if self.closed:
+                raise sqlite3.ProgrammingError(f'Cannot operate on a closed database: {self.db_path}')
+            holder = _ThreadConnection(self._connect())
+            with self._lock:
+                self._holders.add(holder)
+            self._local.holder = holder
+        return holder.conn
+    
+    @contextmanager
+    def transaction(self):
+        """書き込みトランザクション
+
+        BEGIN IMMEDIATE で最初に書き込みロックを取るので、途中でロックの
+        昇格に失敗して "database is locked" になることがない。
+        既にトランザクション中なら、外側のトランザクションにそのまま参加する。
+        """
+        conn = self.get()
+        if conn.in_transaction:
+            yield conn
+            return
+        start = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        waited = time.perf_counter() - start
+        SQL_LOCK_WAIT_DURATION.observe(waited)
+        if waited > LOCK_WAIT_THRESHOLD:
+            SQL_LOCK_WAITS.inc()
+        self._local.after_commit = []
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            self._local.after_commit = []
+            raise
+        else:
+            conn.commit()
+            callbacks, self._local.after_commit = self._local.after_commit, []
+            for callback in callbacks:
+                callback()
+    
+    def after_commit(self, callback):
+        """現在のトランザクションがコミットされたら callback() を呼ぶ
+
+        ロールバックされた場合は呼ばない。トランザクション外ならすぐに呼ぶ。
+        """
+        if self.get().in_transaction:
+            self._local.after_commit.append(callback)
+        else:
+            callback()
+    
+    @contextmanager
+    def snapshot(self):
+        """読み込みトランザクション（複数のSELECTで同じ時点のデータを見る）"""
+        conn = self.get()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.commit()
+    
+    def close_all(self):
+        """全スレッドの接続を閉じる（以後は接続を作らない）"""
+        with self._lock:
+            self.closed = True
+            holders = list(self._holders)
+            self._holders.clear()
+        for holder in holders:
+            holder.finalizer()
+        self._local = threading.local()
+
 
 class IngredientsDatabase:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, busy_timeout_ms=None):
         # Renderなどの本番環境では、書き込み可能なディレクトリを使用
         if db_path is None:
-            import os
             # 環境変数で指定されていない場合は、カレントディレクトリまたは一時ディレクトリを使用
             data_dir = os.environ.get('DATA_DIR', os.getcwd())
             os.makedirs(data_dir, exist_ok=True)
             db_path = os.path.join(data_dir, "oshaberi_reizoko.db")
         self.db_path = db_path
+        self.connections = ConnectionManager(db_path, busy_timeout_ms)
+        self.listeners = []
         self.init_database()
     
+    def _conn(self):
+        """読み込み用の接続（スレッドごとに使い回す）"""
+        return self.connections.get()
+    
+    def close(self):
+        """保持している接続をすべて閉じる（閉じた後は使えない）"""
+        self.connections.close_all()
+    
+    @property
+    def closed(self):
+        return self.connections.closed
+    
+    def add_listener(self, listener):
+        """食材の変更を受け取る関数を登録
+
+        listener(event) はコミット後に呼ばれる。event は
+        {'op': 'add' | 'use' | 'update' | 'delete', 'ids': [...], 'cursor': 変更ログの位置}
+        """
+        self.listeners.append(listener)
+    
+    def _notify(self, cursor, op, ingredient_ids):
+        """コミット後にリスナーへ変更を通知"""
+        if not self.listeners:
+            return
+        row = cursor.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'ingredient_changes'"
+        ).fetchone()
+        event = {'op': op, 'ids': list(ingredient_ids), 'cursor': row[0] if row else 0}
+        
+        def notify():
+            for listener in self.listeners:
+                listener(event)
+        
+        self.connections.after_commit(notify)
+    
     def init_database(self):
         """データベースとテーブルを初期化"""
-        with sqlite3.connect(self.db_path) as conn:
+        # スキーマが最新なら書き込みロックを取らない（世帯ごとのDBは開き直すたびにここを通る）
+        # 集計テーブルの全件確認もしない（定期メンテナンスで行う）
+        if self._conn().execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_MIGRATIONS[-1][0]:
+            return
+        
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             
             # 食材テーブル
@@ -64,78 +622,133 @@ class IngredientsDatabase:
                     liked INTEGER DEFAULT 0
                 )
             ''')
-            
-            conn.commit()
+        
+        # マイグレーションで食材の行をまとめた場合は、集計テーブルがずれていないか確認
+        if self._migrate():
+            self.check_statistics()
+    
+    def _migrate(self):
+        """未適用のスキーママイグレーションを順番に適用し、適用した数を返す"""
+        applied = 0
+        for version, description, migrate in SCHEMA_MIGRATIONS:
+            with self.connections.transaction() as conn:
+                # 別プロセスが先に適用している場合があるのでトランザクション内で確認
+                current = conn.execute('PRAGMA user_version').fetchone()[0]
+                if current >= version:
+                    continue
+                migrate(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                applied += 1
+        return applied
     
     def add_ingredient(self, name, quantity, unit, category=None, expiry_date=None, notes=None):
         """食材を追加"""
-        with sqlite3.connect(self.db_path) as conn:
+        # 食材の更新と履歴の記録を同じトランザクションで行う
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             
-            # 同じ食材が既にあるか確認
-            cursor.execute('''
-                SELECT id, quantity FROM ingredients 
-                WHERE name = ? AND unit = ?
-            ''', (name, unit))
+            # 同じ食材（表記の揺れ・単位の換算を含む）が既にあれば数量を加算、なければ新規追加
+            name_key, unit_key, unit_factor = normalize(name, unit)
+            cursor.execute(UPSERT_INGREDIENT_SQL + ' RETURNING id, unit_factor',
+                           (name, quantity, unit, category, expiry_date, notes, name_key, unit_key, unit_factor))
+            ingredient_id, row_factor = cursor.fetchone()
             
-            existing = cursor.fetchone()
+            # 履歴に記録（数量はその行の単位で）
+            self._add_history(cursor, ingredient_id, 'add', quantity * unit_factor / row_factor)
+            self._notify(cursor, 'add', [ingredient_id])
             
-            if existing:
-                # 既存の食材に数量を追加
-                ingredient_id, current_quantity = existing
-                new_quantity = current_quantity + quantity
-                
-                cursor.execute('''
-                    UPDATE ingredients 
-                    SET quantity = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (new_quantity, ingredient_id))
-                
-                # 履歴に記録
-                self._add_history(ingredient_id, 'add', quantity)
-                
-                return ingredient_id
-            else:
-                # 新規食材を追加
-                cursor.execute('''
-                    INSERT INTO ingredients 
-                    (name, quantity, unit, category, expiry_date, notes)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (name, quantity, unit, category, expiry_date, notes))
-                
-                ingredient_id = cursor.lastrowid
-                conn.commit()
-                
-                # 履歴に記録
-                self._add_history(ingredient_id, 'add', quantity)
-                
-                return ingredient_id
+            return ingredient_id
     
-    def get_ingredients(self, category=None, expiry_soon=None):
-        """食材リストを取得"""
-        with sqlite3.connect(self.db_path) as conn:
+    def add_ingredients_bulk(self, items):
+        """複数の食材をまとめて追加（1トランザクション）
+
+        items は add_ingredient と同じキーを持つ辞書のリスト。
+        同じ食材（正規化した食材名と基準の単位が同じもの）はバッチ内で数量を合算してから書き込む。
+        戻り値は items と同じ順番の食材IDのリスト。
+        """
+        # バッチ内の重複をまとめる（名前・単位・カテゴリなどは最初に出てきたものを使い、数量はその単位に換算）
+        merged = {}
+        item_keys = []
+        for item in items:
+            name_key, unit_key, unit_factor = normalize(item['name'], item['unit'])
+            key = (name_key, unit_key)
+            item_keys.append(key)
+            if key in merged:
+                merged[key]['quantity'] += float(item['quantity']) * unit_factor / merged[key]['unit_factor']
+            else:
+                merged[key] = {
+                    'name': item['name'],
+                    'quantity': float(item['quantity']),
+                    'unit': item['unit'],
+                    'unit_factor': unit_factor,
+                    'category': item.get('category'),
+                    'expiry_date': item.get('expiry_date'),
+                    'notes': item.get('notes'),
+                }
+        
+        if not merged:
+            return []
+        
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             
-            query = "SELECT * FROM ingredients WHERE 1=1"
-            params = []
+            cursor.executemany(UPSERT_INGREDIENT_SQL, [
+                (entry['name'], entry['quantity'], entry['unit'], entry['category'],
+                 entry['expiry_date'], entry['notes'], name_key, unit_key, entry['unit_factor'])
+                for (name_key, unit_key), entry in merged.items()
+            ])
             
-            if category:
-                query += " AND category = ?"
-                params.append(category)
+            rows = self._find_ids(cursor, list(merged))
             
-            if expiry_soon:
-                # 3日以内に賞味期限が来る食材
-                query += " AND expiry_date <= DATE('now', '+3 days') AND expiry_date >= DATE('now')"
-            
-            query += " ORDER BY expiry_date ASC, name ASC"
-            
-            cursor.execute(query, params)
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            # 履歴に記録（数量はその行の単位で）
+            cursor.executemany('''
+                INSERT INTO usage_history (ingredient_id, action, quantity)
+                VALUES (?, 'add', ?)
+            ''', [(rows[key][0], entry['quantity'] * entry['unit_factor'] / rows[key][1])
+                  for key, entry in merged.items()])
+            self._notify(cursor, 'add', [rows[key][0] for key in merged])
+        
+        return [rows[key][0] for key in item_keys]
+    
+    def _find_ids(self, cursor, keys, chunk_size=400):
+        """(name_key, unit_key) のリストから (食材ID, unit_factor) を引く"""
+        found = {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            placeholders = ', '.join(['(?, ?)'] * len(chunk))
+            params = [value for key in chunk for value in key]
+            cursor.execute(f'''
+                SELECT name_key, unit_key, id, unit_factor FROM ingredients
+                WHERE (name_key, unit_key) IN (VALUES {placeholders})
+            ''', params)
+            for name_key, unit_key, ingredient_id, unit_factor in cursor.fetchall():
+                found[(name_key, unit_key)] = (ingredient_id, unit_factor)
+        return found
+    
+    def get_ingredients(self, category=None, expiry_soon=None):
+        """食材リストを取得"""
+        cursor = self._conn().cursor()
+        
+        query = f"SELECT {INGREDIENT_COLUMNS} FROM ingredients WHERE 1=1"
+        params = []
+        
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        
+        if expiry_soon:
+            # 3日以内に賞味期限が来る食材
+            query += " AND expiry_date <= DATE('now', '+3 days') AND expiry_date >= DATE('now')"
+        
+        query += " ORDER BY expiry_date ASC, name ASC"
+        
+        cursor.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
     def use_ingredient(self, ingredient_id, quantity):
         """食材を使用（数量を減らす）"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             
             # 現在の数量を取得
@@ -149,6 +762,7 @@ class IngredientsDatabase:
                 if new_quantity == 0:
                     # 数量が0になったら削除
                     cursor.execute('DELETE FROM ingredients WHERE id = ?', (ingredient_id,))
+                    self._notify(cursor, 'delete', [ingredient_id])
                 else:
                     # 数量を更新
                     cursor.execute('''
@@ -156,11 +770,10 @@ class IngredientsDatabase:
                         SET quantity = ?, updated_at = CURRENT_TIMESTAMP
                         WHERE id = ?
                     ''', (new_quantity, ingredient_id))
-                
-                conn.commit()
+                    self._notify(cursor, 'use', [ingredient_id])
                 
                 # 履歴に記録
-                self._add_history(ingredient_id, 'use', quantity)
+                self._add_history(cursor, ingredient_id, 'use', quantity)
                 
                 return True
             
@@ -168,128 +781,498 @@ class IngredientsDatabase:
     
     def delete_ingredient(self, ingredient_id):
         """食材を削除"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM ingredients WHERE id = ?', (ingredient_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            if cursor.rowcount == 0:
+                return False
+            self._notify(cursor, 'delete', [ingredient_id])
+            return True
     
     def update_ingredient(self, ingredient_id, name=None, quantity=None, unit=None, 
                          category=None, expiry_date=None, notes=None):
         """食材情報を更新"""
-        with sqlite3.connect(self.db_path) as conn:
+        updates = []
+        params = []
+        
+        # 名前や単位を変えたらキーも付け直す（別の行と同じ食材になる場合は IntegrityError）
+        if name is not None:
+            updates.append("name = ?, name_key = ?")
+            params.extend((name, default_normalizer.name_key(name)))
+        
+        if quantity is not None:
+            updates.append("quantity = ?")
+            params.append(quantity)
+        
+        if unit is not None:
+            updates.append("unit = ?, unit_key = ?, unit_factor = ?")
+            params.extend((unit, *default_normalizer.unit_key(unit)))
+        
+        if category is not None:
+            updates.append("category = ?")
+            params.append(category)
+        
+        if expiry_date is not None:
+            updates.append("expiry_date = ?")
+            params.append(expiry_date)
+        
+        if notes is not None:
+            updates.append("notes = ?")
+            params.append(notes)
+        
+        if not updates:
+            return False
+        
+        updates.append("updated_at = CURRENT_TIMESTAMP")
+        params.append(ingredient_id)
+        query = f"UPDATE ingredients SET {', '.join(updates)} WHERE id = ?"
+        
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            if cursor.rowcount == 0:
+                return False
+            self._notify(cursor, 'update', [ingredient_id])
+            return True
+    
+    def get_expiring_soon(self, days=3):
+        """今日から days 日後までに賞味期限が来る食材を取得（idx_ingredients_expiry の範囲検索）"""
+        cursor = self._conn().cursor()
+        cursor.execute(f'''
+            SELECT {INGREDIENT_COLUMNS} FROM ingredients
+            WHERE expiry_date BETWEEN DATE('now') AND DATE('now', ?)
+            ORDER BY expiry_date ASC, name ASC
+        ''', (f'+{int(days)} days',))
+        
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_expiry_window(self, until):
+        """賞味期限が until（'YYYY-MM-DD'）以前の食材（期限切れを含む）と、そのときの変更カウンタ
+
+        idx_ingredients_expiry を期限の早い順に1回なめるだけで、期限の遠い食材は読まない。
+        期限が空の食材は含めない。
+        """
+        with self.connections.snapshot() as conn:
+            version = conn.execute('SELECT version FROM change_version WHERE id = 1').fetchone()[0]
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {INGREDIENT_COLUMNS} FROM ingredients
+                WHERE expiry_date > '' AND expiry_date <= ?
+                ORDER BY expiry_date ASC, name ASC
+            ''', (until,))
+            columns = [description[0] for description in cursor.description]
+            return version, [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_change_version(self):
+        """食材テーブルの変更カウンタ（書き込みのたびにトリガーで1ずつ増える）
+
+        1行だけのテーブルを読むので、食材の件数に関係なく一定時間で返る。
+        """
+        return self._conn().execute('SELECT version FROM change_version WHERE id = 1').fetchone()[0]
+    
+    def get_changes(self, since=None, limit=500):
+        """since（カーソル）より後に変更された食材を返す（差分同期用）
+
+        戻り値:
+            cursor   - 次回の since に渡す値
+            has_more - まだ続きがあれば True（cursor を使ってもう一度呼ぶ）
+            full     - True なら upserts は全件（クライアントは手元のデータを置き換える）
+            upserts  - 追加・更新された食材の現在の内容
+            deletes  - 削除された食材のID（tombstone）
+
+        変更ログだけを読むので、処理量は在庫の件数ではなく変更の件数に比例する。
+        since が無い場合や、古くて変更ログが既に削除されている場合は全件を返す。
+        """
+        with self.connections.snapshot() as conn:
             cursor = conn.cursor()
             
-            updates = []
-            params = []
-            
-            if name is not None:
-                updates.append("name = ?")
-                params.append(name)
-            
-            if quantity is not None:
-                updates.append("quantity = ?")
-                params.append(quantity)
-            
-            if unit is not None:
-                updates.append("unit = ?")
-                params.append(unit)
-            
-            if category is not None:
-                updates.append("category = ?")
-                params.append(category)
+            row = cursor.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'ingredient_changes'"
+            ).fetchone()
+            latest = row[0] if row else 0
+            oldest = cursor.execute('SELECT MIN(seq) FROM ingredient_changes').fetchone()[0]
+            floor = oldest if oldest is not None else latest + 1
             
-            if expiry_date is not None:
-                updates.append("expiry_date = ?")
-                params.append(expiry_date)
+            if not since or since < floor - 1:
+                cursor.execute(f'SELECT {INGREDIENT_COLUMNS} FROM ingredients ORDER BY id')
+                columns = [description[0] for description in cursor.description]
+                return {
+                    'cursor': latest,
+                    'has_more': False,
+                    'full': True,
+                    'upserts': [dict(zip(columns, r)) for r in cursor.fetchall()],
+                    'deletes': []
+                }
             
-            if notes is not None:
-                updates.append("notes = ?")
-                params.append(notes)
+            cursor.execute('''
+                SELECT seq, ingredient_id FROM ingredient_changes
+                WHERE seq > ? ORDER BY seq LIMIT ?
+            ''', (since, limit + 1))
+            changes = cursor.fetchall()
+            has_more = len(changes) > limit
+            changes = changes[:limit]
             
-            if updates:
-                updates.append("updated_at = CURRENT_TIMESTAMP")
-                params.append(ingredient_id)
-                query = f"UPDATE ingredients SET {', '.join(updates)} WHERE id = ?"
-                cursor.execute(query, params)
-                conn.commit()
-                return cursor.rowcount > 0
+            # 同じ食材が何度変更されていても、現在の内容を1回だけ返す
+            changed_ids = list(dict.fromkeys(ingredient_id for _, ingredient_id in changes))
+            rows = {}
+            for start in range(0, len(changed_ids), 500):
+                chunk = changed_ids[start:start + 500]
+                cursor.execute(
+                    f"SELECT {INGREDIENT_COLUMNS} FROM ingredients WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                columns = [description[0] for description in cursor.description]
+                for r in cursor.fetchall():
+                    item = dict(zip(columns, r))
+                    rows[item['id']] = item
             
-            return False
+            return {
+                'cursor': changes[-1][0] if changes else since,
+                'has_more': has_more,
+                'full': False,
+                'upserts': [rows[i] for i in changed_ids if i in rows],
+                'deletes': [i for i in changed_ids if i not in rows]
+            }
     
-    def get_expiring_soon(self, days=3):
-        """賞味期限が近い食材を取得"""
-        with sqlite3.connect(self.db_path) as conn:
+    def apply_mutations(self, mutations):
+        """クライアントでの変更をまとめて1トランザクションで反映
+
+        mutations は {'op': 'add' | 'use' | 'update' | 'delete', ...} のリスト。
+        途中で失敗した場合はすべて取り消して例外を送出する。
+        名前や単位の変更で別の食材と同じ (name_key, unit_key) になる場合は
+        MutationConflictError（index は失敗した変更の位置）。
+        """
+        results = []
+        with self.connections.transaction():
+            for index, mutation in enumerate(mutations):
+                try:
+                    results.append(self._apply_mutation(mutation))
+                except sqlite3.IntegrityError as e:
+                    raise MutationConflictError(index, str(e)) from e
+        return results
+    
+    def _apply_mutation(self, mutation):
+        """apply_mutations の1件分（トランザクションの中で呼ぶ）"""
+        op = mutation.get('op')
+        if op == 'add':
+            return self.add_ingredient(
+                name=mutation['name'],
+                quantity=mutation['quantity'],
+                unit=mutation['unit'],
+                category=mutation.get('category'),
+                expiry_date=mutation.get('expiry_date'),
+                notes=mutation.get('notes')
+            )
+        if op == 'use':
+            return self.use_ingredient(mutation['ingredient_id'], mutation.get('quantity', 1))
+        if op == 'update':
+            fields = {key: mutation.get(key) for key in
+                      ('name', 'quantity', 'unit', 'category', 'expiry_date', 'notes')}
+            return self.update_ingredient(mutation['ingredient_id'], **fields)
+        if op == 'delete':
+            return self.delete_ingredient(mutation['ingredient_id'])
+        raise ValueError(f'unknown op: {op}')
+    
+    def prune_change_log(self, keep_days=30):
+        """古い変更ログを削除（それより前のカーソルを持つクライアントは全件同期になる）"""
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM ingredient_changes WHERE changed_at < DATETIME('now', ?)",
+                (f'-{int(keep_days)} days',)
+            )
+            return cursor.rowcount
+    
+    def rollup_usage_history(self, batch_size=1000):
+        """まだ集計していない使用履歴を最大 batch_size 件、日別集計（usage_daily）に加える
+
+        集計した位置は maintenance_state に同じトランザクションで保存するので、途中で
+        止まっても次回はその続きから（同じ行を二重に数えない）。集計した件数を返す。
+        日付は履歴の timestamp（UTC）の日付。
+        """
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
+            last_id = self._get_maintenance_state(cursor, 'usage_rollup_last_id')
+            upper_id = cursor.execute('''
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM usage_history WHERE id > ? ORDER BY id LIMIT ?
+                )
+            ''', (last_id, batch_size)).fetchone()
+            if not upper_id[1]:
+                return 0
             cursor.execute('''
-                SELECT * FROM ingredients 
-                WHERE expiry_date <= DATE('now', '+? days') 
-                AND expiry_date >= DATE('now')
-                ORDER BY expiry_date ASC
-            ''', (days,))
-            
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                INSERT INTO usage_daily (day, ingredient_id, action, events, quantity)
+                SELECT DATE(timestamp), ingredient_id, action, COUNT(*), SUM(quantity)
+                FROM usage_history
+                WHERE id > ? AND id <= ?
+                GROUP BY DATE(timestamp), ingredient_id, action
+                ON CONFLICT (day, ingredient_id, action) DO UPDATE SET
+                    events = events + excluded.events,
+                    quantity = quantity + excluded.quantity
+            ''', (last_id, upper_id[0]))
+            self._set_maintenance_state(cursor, 'usage_rollup_last_id', upper_id[0])
+            return upper_id[1]
+    
+    def delete_old_usage_history(self, keep_days, batch_size=1000, now=None):
+        """集計済みで keep_days 日より古い使用履歴を、id の小さい順に最大 batch_size 件削除
+
+        1回に消すのは batch_size 件までなので、書き込みロックは短い。
+        削除した件数を返す（batch_size 未満ならもう消すものはない）。
+        """
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
+            last_id = self._get_maintenance_state(cursor, 'usage_rollup_last_id')
+            cursor.execute('''
+                DELETE FROM usage_history
+                WHERE id IN (
+                    SELECT id FROM usage_history
+                    WHERE id <= ? AND timestamp < DATETIME(COALESCE(?, 'now'), ?)
+                    ORDER BY id LIMIT ?
+                )
+            ''', (last_id, now, f'-{int(keep_days)} days', batch_size))
+            return cursor.rowcount
+    
+    def incremental_vacuum(self, pages=256):
+        """空きページを最大 pages ページ、ファイルから返す（返したページ数）
+
+        auto_vacuum = INCREMENTAL のDBでだけ効く（それ以外では 0 を返す）。
+        """
+        if self.get_auto_vacuum() != 'incremental':
+            return 0
+        conn = self._conn()
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not before:
+            return 0
+        # 1ステップで1ページずつ解放される。execute は列のない文を1ステップしか進めないので
+        # executescript で最後まで実行する
+        conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+        return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    
+    def get_auto_vacuum(self):
+        """auto_vacuum の設定（'none' / 'full' / 'incremental'）"""
+        return {0: 'none', 1: 'full', 2: 'incremental'}[self._conn().execute('PRAGMA auto_vacuum').fetchone()[0]]
+    
+    def enable_incremental_vacuum(self):
+        """既存のDBを auto_vacuum = INCREMENTAL に切り替える（VACUUM でファイルを作り直す）
+
+        VACUUM の間は書き込みが止まるので、アプリを止めてから1回だけ実行する。
+        """
+        conn = self._conn()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    
+    def get_storage_stats(self):
+        """DBファイルのページ数・空きページ数と、使用履歴の件数"""
+        conn = self._conn()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        return {
+            'auto_vacuum': self.get_auto_vacuum(),
+            'size_bytes': page_size * page_count,
+            'free_bytes': page_size * conn.execute('PRAGMA freelist_count').fetchone()[0],
+            'usage_history_rows': conn.execute('SELECT COUNT(*) FROM usage_history').fetchone()[0],
+            'usage_daily_rows': conn.execute('SELECT COUNT(*) FROM usage_daily').fetchone()[0],
+        }
+    
+    def get_consumption(self, since, after_id=None):
+        """消費（action = 'use'）の (食材ID, 日, 数量) のリストと、読んだ使用履歴の最後の id
+
+        since（'YYYY-MM-DD'）以降の分を返す。日は 1970-01-01 からの日数（UTC）。
+        after_id を省略すると日別集計（usage_daily）とまだ集計していない使用履歴から読み、
+        指定するとその id より後の使用履歴だけを読む（前回の続きだけを読み足すとき）。
+        """
+        with self.connections.snapshot() as conn:
+            cursor = conn.cursor()
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM usage_history').fetchone()[0]
+            rows = []
+            if after_id is None:
+                after_id = self._get_maintenance_state(cursor, 'usage_rollup_last_id')
+                rows += cursor.execute('''
+                    SELECT ingredient_id, CAST(julianday(day) - 2440587.5 AS INTEGER), quantity
+                    FROM usage_daily
+                    WHERE action = 'use' AND day >= ?
+                ''', (since,)).fetchall()
+            rows += cursor.execute('''
+                SELECT ingredient_id, CAST(julianday(timestamp) - 2440587.5 AS INTEGER), quantity
+                FROM usage_history
+                WHERE id > ? AND id <= ? AND action = 'use' AND timestamp >= ?
+            ''', (after_id, last_id, since)).fetchall()
+        return rows, last_id
+    
+    def _get_maintenance_state(self, cursor, name):
+        row = cursor.execute('SELECT value FROM maintenance_state WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+    
+    def _set_maintenance_state(self, cursor, name, value):
+        cursor.execute('''
+            INSERT INTO maintenance_state (name, value) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET value = excluded.value
+        ''', (name, value))
     
     def get_statistics(self):
-        """統計情報を取得"""
-        with sqlite3.connect(self.db_path) as conn:
+        """統計情報を取得
+
+        食材数はトリガーで更新される category_counts から読むので、
+        食材の件数が増えても集計し直さない。
+        """
+        with self.connections.snapshot() as conn:
             cursor = conn.cursor()
             
-            # 総食材数
-            cursor.execute('SELECT COUNT(*) FROM ingredients')
-            total_count = cursor.fetchone()[0]
-            
-            # カテゴリ別の食材数
-            cursor.execute('''
-                SELECT category, COUNT(*) as count 
-                FROM ingredients 
-                GROUP BY category
-            ''')
+            # カテゴリ別の食材数（総数はその合計）
+            cursor.execute('SELECT category, count FROM category_counts')
             category_stats = dict(cursor.fetchall())
+            total_count = sum(category_stats.values())
             
-            # 賞味期限切れ間近
+            # 賞味期限切れ間近（idx_ingredients_expiry の範囲検索）
             cursor.execute('''
                 SELECT COUNT(*) 
                 FROM ingredients 
-                WHERE expiry_date <= DATE('now', '+3 days') 
-                AND expiry_date >= DATE('now')
+                WHERE expiry_date BETWEEN DATE('now') AND DATE('now', '+3 days')
             ''')
             expiring_soon = cursor.fetchone()[0]
-            
-            return {
-                'total_count': total_count,
-                'category_stats': category_stats,
-                'expiring_soon': expiring_soon
-            }
+        
+        return {
+            'total_count': total_count,
+            'category_stats': category_stats,
+            'expiring_soon': expiring_soon
+        }
     
-    def _add_history(self, ingredient_id, action, quantity):
-        """使用履歴を追加"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO usage_history (ingredient_id, action, quantity)
-                VALUES (?, ?, ?)
-            ''', (ingredient_id, action, quantity))
-            conn.commit()
+    def check_statistics(self, repair=True):
+        """集計テーブルが ingredients と一致しているか確認
+
+        ずれていれば（repair=True なら）全件から作り直す。一致していれば True。
+        確認は読み込みトランザクションで行い、書き込みロックは作り直すときだけ取る。
+        """
+        with self.connections.snapshot() as conn:
+            if _statistics_match(conn.cursor()):
+                return True
+        if repair:
+            with self.connections.transaction() as conn:
+                cursor = conn.cursor()
+                # 確認した後に別の接続が作り直していれば何もしない
+                if not _statistics_match(cursor):
+                    _rebuild_category_counts(cursor)
+                    logger.warning("⚠️ 統計の集計テーブルが食材と一致しなかったため作り直しました")
+        return False
+    
+    def _add_history(self, cursor, ingredient_id, action, quantity):
+        """使用履歴を追加（呼び出し元のトランザクション内で実行する）"""
+        cursor.execute('''
+            INSERT INTO usage_history (ingredient_id, action, quantity)
+            VALUES (?, ?, ?)
+        ''', (ingredient_id, action, quantity))
     
     def add_recipe_history(self, recipe_name, ingredients_used, recipe_content):
         """レシピ履歴を追加"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO recipe_history (recipe_name, ingredients_used, recipe_content)
                 VALUES (?, ?, ?)
             ''', (recipe_name, ingredients_used, recipe_content))
-            conn.commit()
             return cursor.lastrowid
     
-    def backup_database(self, backup_path=None):
-        """データベースをバックアップ"""
+    def get_cached_recipe(self, cache_key, min_created_at):
+        """キャッシュ済みのレシピを (recipe_content, created_at) で取得
+
+        min_created_at より古いものは期限切れとして無視する。
+        """
+        return self._conn().execute('''
+            SELECT recipe_content, created_at FROM recipe_cache
+            WHERE cache_key = ? AND created_at >= ?
+        ''', (cache_key, min_created_at)).fetchone()
+    
+    def touch_cached_recipe(self, cache_key, used_at):
+        """キャッシュの最終利用時刻を更新（LRU の追い出し順に使う）"""
+        with self.connections.transaction() as conn:
+            conn.execute('UPDATE recipe_cache SET last_used_at = ? WHERE cache_key = ?',
+                         (used_at, cache_key))
+    
+    def put_cached_recipe(self, cache_key, ingredients_used, recipe_content, created_at,
+                          max_entries, min_created_at):
+        """レシピをキャッシュに保存し、期限切れと上限超過分を削除"""
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO recipe_cache
+                (cache_key, ingredients_used, recipe_content, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cache_key, ingredients_used, recipe_content, created_at, created_at))
+            cursor.execute('DELETE FROM recipe_cache WHERE created_at < ?', (min_created_at,))
+            cursor.execute('''
+                DELETE FROM recipe_cache WHERE cache_key IN (
+                    SELECT cache_key FROM recipe_cache
+                    ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (max_entries,))
+    
+    def get_api_usage(self, periods):
+        """期間（'day:2025-01-01' など）ごとの使用回数を取得"""
+        placeholders = ', '.join('?' * len(periods))
+        rows = self._conn().execute(
+            f'SELECT period, count FROM api_usage WHERE period IN ({placeholders})', list(periods)
+        ).fetchall()
+        counts = dict.fromkeys(periods, 0)
+        counts.update(rows)
+        return counts
+    
+    def add_api_usage(self, increments):
+        """期間ごとの使用回数を加算し（負の値で戻す）、加算後の値（他のプロセスの分も含む）を返す"""
+        with self.connections.transaction():
+            self._add_api_usage(self._conn().cursor(), increments)
+            return self.get_api_usage(list(increments))
+    
+    def reserve_api_usage(self, limits, amount=1):
+        """上限を超えない範囲で最大 amount 回分を加算する（1つのトランザクションで確認と加算を行う）
+
+        limits は {期間: 上限}。戻り値は (加算できた回数, 加算後の期間ごとの使用回数)。
+        """
+        with self.connections.transaction():
+            counts = self.get_api_usage(list(limits))
+            granted = min([amount] + [limit - counts[period] for period, limit in limits.items()])
+            if granted <= 0:
+                return 0, counts
+            self._add_api_usage(self._conn().cursor(), dict.fromkeys(limits, granted))
+            return granted, {period: count + granted for period, count in counts.items()}
+    
+    def _add_api_usage(self, cursor, increments):
+        cursor.executemany('''
+            INSERT INTO api_usage (period, count) VALUES (?, ?)
+            ON CONFLICT (period) DO UPDATE SET
+                count = count + excluded.count,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [(period, amount) for period, amount in increments.items() if amount])
+        # 2か月以上更新されていない期間は不要
+        cursor.execute("DELETE FROM api_usage WHERE updated_at < DATETIME('now', '-62 days')")
+    
+    def backup_database(self, backup_path=None, pages=-1, step_sleep=0):
+        """データベースをバックアップ（SQLite のバックアップ API で動作中でも一貫したコピーを作る）
+
+        pages ページずつコピーし、各ステップの間に step_sleep 秒休む（-1 なら一度に全部）。
+        コピー中は専用の接続で読み込みトランザクションを開いたままにするので、
+        途中で他の接続が書き込んでも最初からやり直しにならず、開始時点の内容がそのまま残る。
+        WALモードなので、その間も書き込みは止まらない。
+        """
         if backup_path is None:
             backup_path = f"oshaberi_reizoko_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        if os.path.exists(backup_path):
+            os.remove(backup_path)
         
-        import shutil
-        shutil.copy2(self.db_path, backup_path)
+        source = sqlite3.connect(self.db_path, timeout=self.connections.busy_timeout_ms / 1000,
+                                 isolation_level=None)
+        target = sqlite3.connect(backup_path)
+        try:
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            
+            def progress(status, remaining, total):
+                if step_sleep and remaining:
+                    time.sleep(step_sleep)
+            
+            source.backup(target, pages=pages, progress=progress)
+            source.execute('COMMIT')
+            # バックアップは -wal / -shm のない1つのファイルにする
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
         return backup_path
-
@@ -0,0 +1,112 @@
+"""
+データベースの定期メンテナンス
+使用履歴（usage_history）は追加・使用のたびに増え続けるので、定期的に
+
+1. 日別・食材別の集計（usage_daily）にまとめる
+2. 集計済みで USAGE_HISTORY_RETENTION_DAYS 日より古い行を削除する
+3. 古い差分同期の変更ログ（ingredient_changes）を削除する
+4. 空いた領域を incremental_vacuum でファイルから返す
+5. カテゴリ別の集計テーブル（category_counts）が食材と一致しているか確認し、ずれていれば作り直す
+
+どの処理も batch_size 件（ページ）ずつの短いトランザクションに分け、間に少し休むので、
+書き込みロックを長く持たない。集計の進み具合はDBに保存され、途中で止まっても続きから再開する。
+
+アプリからは start_maintenance_scheduler() で MAINTENANCE_INTERVAL_HOURS 時間ごとに
+裏のスレッド（scheduled_jobs.py）で実行する。
+
+使い方:
+    python maintenance.py run       # 今すぐ実行
+    python maintenance.py status    # DBの大きさと履歴の件数
+    python maintenance.py enable-incremental-vacuum   # 既存のDBを切り替える（アプリを止めてから）
+"""
+
+import os
+import sys
+import time
+
+from app_logging import get_logger
+from scheduled_jobs import every_hours
+
+logger = get_logger('maintenance')
+
+DEFAULT_INTERVAL_HOURS = float(os.environ.get('MAINTENANCE_INTERVAL_HOURS', 6))
+DEFAULT_RETENTION_DAYS = int(os.environ.get('USAGE_HISTORY_RETENTION_DAYS', 90))
+DEFAULT_CHANGE_LOG_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+DEFAULT_BATCH_SIZE = int(os.environ.get('MAINTENANCE_BATCH_SIZE', 1000))
+DEFAULT_PAUSE = float(os.environ.get('MAINTENANCE_PAUSE_SECONDS', 0.01))
+VACUUM_PAGES_PER_STEP = 256
+
+
+def run_maintenance(db, retention_days=None, change_log_days=None, batch_size=None, pause=None, now=None):
+    """メンテナンスを1回行い、処理した件数を返す（now は日時の文字列。計測用）"""
+    retention_days = DEFAULT_RETENTION_DAYS if retention_days is None else retention_days
+    change_log_days = DEFAULT_CHANGE_LOG_DAYS if change_log_days is None else change_log_days
+    batch_size = DEFAULT_BATCH_SIZE if batch_size is None else batch_size
+    pause = DEFAULT_PAUSE if pause is None else pause
+    start = time.perf_counter()
+    
+    def repeat(step, full):
+        """step() が full 件未満を返すまで繰り返し、合計を返す"""
+        total = 0
+        while True:
+            count = step()
+            total += count
+            if count < full:
+                return total
+            if pause:
+                time.sleep(pause)
+    
+    result = {
+        'rolled_up': repeat(lambda: db.rollup_usage_history(batch_size), batch_size),
+        'deleted': repeat(lambda: db.delete_old_usage_history(retention_days, batch_size, now), batch_size),
+        'change_log_deleted': db.prune_change_log(change_log_days),
+        'vacuumed_pages': repeat(lambda: db.incremental_vacuum(VACUUM_PAGES_PER_STEP), VACUUM_PAGES_PER_STEP),
+        # 全件を GROUP BY するので、DBを開くたびではなくここで確認する
+        'statistics_repaired': not db.check_statistics(),
+    }
+    if any(result.values()):
+        logger.info(f"🧹 メンテナンス: 履歴 {result['rolled_up']} 件を集計、{result['deleted']} 件を削除、"
+                    f"変更ログ {result['change_log_deleted']} 件を削除、{result['vacuumed_pages']} ページを解放、"
+                    f"集計テーブル{'を作り直し' if result['statistics_repaired'] else 'は一致'}"
+                    f"（{time.perf_counter() - start:.2f} 秒）")
+    return result
+
+
+def start_maintenance_scheduler(db, interval_hours=None, households=None):
+    """interval_hours 時間ごとに裏のスレッドでメンテナンスする（0 以下なら何もしない）
+
+    households（HouseholdRouter）を渡すと、世帯ごとのDBも続けてメンテナンスする。
+    """
+    interval_hours = DEFAULT_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if db.get_auto_vacuum() != 'incremental':
+        logger.info("ℹ️ このDBは incremental_vacuum が無効です（python maintenance.py enable-incremental-vacuum で切り替え）")
+    
+    def job():
+        run_maintenance(db)
+        if households is not None:
+            households.for_each(lambda key, household_db: run_maintenance(household_db))
+    
+    return every_hours(interval_hours, job, 'メンテナンス')
+
+
+def main(argv):
+    from ingredients_database import IngredientsDatabase
+    
+    if not argv or argv[0] not in ('run', 'status', 'enable-incremental-vacuum'):
+        print(__doc__.split('使い方:')[1])
+        return 2
+    db = IngredientsDatabase()
+    
+    if argv[0] == 'run':
+        print(run_maintenance(db))
+    elif argv[0] == 'enable-incremental-vacuum':
+        db.enable_incremental_vacuum()
+    stats = db.get_storage_stats()
+    print(f"DB {stats['size_bytes'] / 1024:.0f} KB（空き {stats['free_bytes'] / 1024:.0f} KB、"
+          f"auto_vacuum={stats['auto_vacuum']}）、使用履歴 {stats['usage_history_rows']} 件、"
+          f"日別集計 {stats['usage_daily_rows']} 件")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,192 @@
+"""
+処理時間などの計測値を集めて Prometheus のテキスト形式で出力する
+（/metrics で公開。prometheus_client を使わない最小限の実装）
+
+- Counter   : 増えるだけの回数（ラベルごと）
+- Histogram : 処理時間の分布（ラベルごと、累積バケット）
+- Gauge     : 出力するときに関数を呼んで現在の値を取る
+
+環境変数 METRICS_ENABLED=0 で計測自体を止められる（オーバーヘッドの確認用）。
+"""
+
+import os
+import threading
+from bisect import bisect_left
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+# 処理時間のバケット（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [バケットごとの回数..., +Inf の回数, 合計, 件数]
+        self._lock = threading.Lock()
+    
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def count(self, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            return series[-1] if series else 0
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = sorted(((labels, list(series)) for labels, series in self._series.items()),
+                              key=lambda item: tuple(map(str, item[0])))
+        labelnames = self.labelnames + ('le',)
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(labelnames, labels + (_format_value(bound),))} '
+                             f'{cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{label_text} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+    
+    def render(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge',
+                f'{self.name} {_format_value(self.func())}']
+
+
+class Registry:
+    """計測値の一覧（名前の重複は許さない）"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'metric already registered: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def gauge(self, name, documentation, func):
+        return self._register(Gauge(name, documentation, func))
+    
+    def render(self):
+        """Prometheus のテキスト形式（version 0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# HTTP リクエスト
+HTTP_REQUESTS = REGISTRY.counter(
+    'talkfridge_http_requests_total', 'HTTP requests by route, method and status.',
+    ('route', 'method', 'status'))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'talkfridge_http_request_duration_seconds',
+    'Time until the response object is returned (stream bodies are not included).',
+    ('route', 'method'))
+
+# SQLite
+SQL_QUERY_DURATION = REGISTRY.histogram(
+    'talkfridge_sqlite_query_duration_seconds', 'Time spent in execute/executemany by statement type.',
+    ('statement',))
+SQL_FETCH_DURATION = REGISTRY.histogram(
+    'talkfridge_sqlite_fetch_duration_seconds', 'Time spent in fetchall.')
+SQL_LOCK_WAITS = REGISTRY.counter(
+    'talkfridge_sqlite_lock_waits_total', 'Write transactions that had to wait for the database lock.')
+SQL_LOCK_WAIT_DURATION = REGISTRY.histogram(
+    'talkfridge_sqlite_lock_wait_seconds', 'Time spent acquiring the write lock (BEGIN IMMEDIATE).')
+SQL_LOCK_TIMEOUTS = REGISTRY.counter(
+    'talkfridge_sqlite_lock_timeouts_total', 'Statements that failed with "database is locked".')
+
+# Gemini API
+GEMINI_REQUESTS = REGISTRY.counter(
+    'talkfridge_gemini_requests_total', 'Gemini generate_content calls by mode and outcome.',
+    ('mode', 'outcome'))
+GEMINI_DURATION = REGISTRY.histogram(
+    'talkfridge_gemini_duration_seconds', 'Time until the whole Gemini response was received.',
+    ('mode',), buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0))
+GEMINI_FIRST_CHUNK = REGISTRY.histogram(
+    'talkfridge_gemini_first_chunk_seconds', 'Time until the first streamed chunk arrived.',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0))
+GEMINI_PROMPT_TOKENS = REGISTRY.histogram(
+    'talkfridge_gemini_prompt_tokens', 'Estimated prompt size (recipe_prompt.estimate_tokens) per Gemini call.',
+    ('mode',), buckets=(50, 100, 200, 300, 400, 800, 1600, 3200, 6400))
+GEMINI_QUOTA_REJECTIONS = REGISTRY.counter(
+    'talkfridge_gemini_quota_rejections_total', 'Recipe requests refused locally because a Gemini quota was used up.',
+    ('scope',))
@@ -4,72 +4,235 @@ Gemini API と連携して食材管理とレシピ提案を行う
 """
 
 import os
-import re
-from flask import Flask, render_template, request, jsonify
-from datetime import datetime, date
-import google.generativeai as genai
-from ingredients_database import IngredientsDatabase
+import json
+import atexit
+import threading
+import time
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, url_for, g
+from flask.sessions import SecureCookieSessionInterface
+from datetime import datetime, timezone
+from ingredients_database import IngredientsDatabase, MutationConflictError
+from recipe_cache import RecipeCache, make_cache_key
+from recipe_jobs import RecipeJobQueue, QueueFullError
+from gemini_quota import GeminiQuota, QuotaExceededError
+from recipe_prompt import build_prompt, estimate_tokens
+from db_backup import DatabaseBackup, start_backup_scheduler
+from maintenance import start_maintenance_scheduler
+from expiry_buckets import expiry_buckets, get_expiring, start_expiry_sweeper
+from households import HouseholdRouter, InvalidHouseholdError, check_key
+from scheduled_jobs import every_hours
+from event_broker import EventBroker, TooManySubscribersError
+from ingredient_parser import parse_text, parse_many
+from dictionary_bundle import DICTIONARY_VERSION, DICTIONARY_JSON
+import metrics
+from metrics import (REGISTRY, HTTP_REQUESTS, HTTP_REQUEST_DURATION,
+                     GEMINI_REQUESTS, GEMINI_DURATION, GEMINI_FIRST_CHUNK, GEMINI_PROMPT_TOKENS,
+                     GEMINI_QUOTA_REJECTIONS)
+from app_logging import setup_logging, get_logger
+import hashlib
 from dotenv import load_dotenv
 
 # .envファイルを読み込む
 load_dotenv()
 
+# ログはキュー経由で書き出す（リクエスト処理中に標準出力を待たない）
+setup_logging()
+logger = get_logger('app')
+
+
+
+class CookieOnlySessionInterface(SecureCookieSessionInterface):
+    """セッション Cookie が付いていないリクエストでは署名の準備をしない
+
+    標準の実装はリクエストのたびに署名用のシリアライザを作るが、セッションを
+    使うルートはないので、/api/parse-ingredients のような軽いルートではその分が
+    処理時間の大半を占めていた。
+    """
+    
+    def open_session(self, app, request):
+        if self.get_cookie_name(app) not in request.cookies:
+            return self.session_class()
+        return super().open_session(app, request)
+
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'oshaberi-reizoko-secret-key')
+app.session_interface = CookieOnlySessionInterface()
 
 # Gemini API の初期化
+# google.generativeai の import に時間がかかるので、起動時には行わず
+# 最初のレシピ提案（または起動から GEMINI_WARMUP_DELAY 秒後の先読み）で1回だけ行う
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-if GEMINI_API_KEY:
+GEMINI_WARMUP_DELAY = float(os.environ.get('GEMINI_WARMUP_DELAY', 5))
+gemini_model = None
+_gemini_initialized = False
+_gemini_lock = threading.Lock()
+
+def _create_gemini_model():
+    """Gemini のモデルを作成（失敗したら None）"""
+    start = time.perf_counter()
     try:
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
         # 利用可能な最新のモデルを使用
         try:
-            gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+            model = genai.GenerativeModel('gemini-2.0-flash-exp')
         except:
             try:
-                gemini_model = genai.GenerativeModel('gemini-pro')
+                model = genai.GenerativeModel('gemini-pro')
             except:
-                gemini_model = genai.GenerativeModel('models/gemini-pro')
+                model = genai.GenerativeModel('models/gemini-pro')
     except Exception as e:
-        print(f"⚠️ Gemini API初期化エラー: {e}")
-        gemini_model = None
+        logger.warning(f"⚠️ Gemini API初期化エラー: {e}")
+        return None
+    logger.info(f"🤖 Gemini API を初期化しました（{time.perf_counter() - start:.2f}秒）")
+    return model
+
+def get_gemini_model():
+    """Gemini のモデルを返す（未設定なら None）。初回だけ作成し、同時に呼ばれても1回しか作らない"""
+    global gemini_model, _gemini_initialized
+    if gemini_model is not None or _gemini_initialized:
+        return gemini_model
+    with _gemini_lock:
+        if not _gemini_initialized:
+            if gemini_model is None and GEMINI_API_KEY:
+                gemini_model = _create_gemini_model()
+            _gemini_initialized = True
+    return gemini_model
+
+if GEMINI_API_KEY:
+    if GEMINI_WARMUP_DELAY >= 0:
+        # 最初のリクエストの邪魔をしないよう、少し待ってから裏で初期化しておく
+        warmup = threading.Timer(GEMINI_WARMUP_DELAY, get_gemini_model)
+        warmup.daemon = True
+        warmup.start()
 else:
-    gemini_model = None
-    print("ℹ️ GEMINI_API_KEYが設定されていません。レシピ提案機能は使用できません。")
+    logger.info("ℹ️ GEMINI_API_KEYが設定されていません。レシピ提案機能は使用できません。")
 
 # データベース初期化（エラーハンドリング付き）
 try:
     db = IngredientsDatabase()
-    print(f"✅ データベース初期化成功: {db.db_path}")
+    logger.info(f"✅ データベース初期化成功: {db.db_path}")
 except Exception as e:
-    print(f"⚠️ データベース初期化エラー: {e}")
-    import traceback
-    traceback.print_exc()
+    logger.exception(f"⚠️ データベース初期化エラー: {e}")
     # エラーが発生してもアプリは起動させる（データベース機能は使えないが）
     db = None
 
-# カテゴリ推測のキーワード
-CATEGORY_KEYWORDS = {
-    '肉': ['鶏', '肉', '豚', '牛', '魚', 'ハム', 'ベーコン', 'ソーセージ'],
-    '野菜': ['トマト', 'ニンジン', 'キャベツ', '玉ねぎ', 'きゅうり', 'ピーマン', '白菜', '大根'],
-    '乳製品': ['牛乳', 'チーズ', 'ヨーグルト', 'バター', '生クリーム'],
-    '穀物': ['米', 'パン', '麺', 'うどん', 'そば', 'スパゲッティ'],
-    '調味料': ['醤油', '味噌', '塩', '砂糖', '胡椒', '油'],
-    'その他': []
-}
-
-def guess_category(name):
-    """食材名からカテゴリを推測"""
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in name:
-                return category
-    return 'その他'
+# レシピ提案のキャッシュ（食材が変わっていなければ Gemini を呼ばない）
+recipe_cache = RecipeCache(db)
+
+# レシピ生成のバックグラウンドジョブ（リクエスト用のスレッドを Gemini 待ちで埋めない）
+recipe_jobs = RecipeJobQueue()
+
+# Gemini API の使用回数の上限（上限なら Gemini を呼ばずにすぐ断る）
+gemini_quota = GeminiQuota(db)
+atexit.register(gemini_quota.flush)
+
+# 在庫の変更を開いているタブ・端末に配信（/api/events）。世帯ごとに別々に配る
+inventory_events = EventBroker()
+
+def publish_changes(household, household_db):
+    """household の在庫の変更を、同じ世帯の購読者に配信する"""
+    household_db.add_listener(lambda event: inventory_events.publish(event, household))
+
+def prepare_household_db(household, household_db):
+    """世帯のDBを開いたとき: 変更の配信と、賞味期限の区分の裏での更新を始める"""
+    publish_changes(household, household_db)
+    expiry_buckets(household_db)
+
+if db is not None:
+    publish_changes(None, db)
+
+# 世帯ごとのDB（X-Household ヘッダーで選ぶ。なければ上の db を使う）
+households = HouseholdRouter(db, on_open=prepare_household_db)
+every_hours(1 / 60, households.close_idle, '使われていない世帯のDBの整理')
+
+# データベースの定期バックアップと、使用履歴の集約などのメンテナンス（裏のスレッドで実行）
+if db is not None:
+    start_backup_scheduler(DatabaseBackup(db), households=households)
+    start_maintenance_scheduler(db, households=households)
+    start_expiry_sweeper(db)
+
+# 実行中の状態も /metrics で見られるようにする
+REGISTRY.gauge('talkfridge_recipe_jobs_running', 'Recipe jobs currently running.',
+               lambda: recipe_jobs.stats()['running'])
+REGISTRY.gauge('talkfridge_recipe_jobs_queued', 'Recipe jobs waiting for a worker.',
+               lambda: recipe_jobs.stats()['queued'])
+REGISTRY.gauge('talkfridge_event_subscribers', 'Open /api/events streams.',
+               lambda: inventory_events.stats()['subscribers'])
+REGISTRY.gauge('talkfridge_households_open', 'Household databases currently open.',
+               lambda: households.stats()['open'])
+
+@app.before_request
+def start_request_timer():
+    if metrics.ENABLED:
+        g.request_started = time.perf_counter()
+
+@app.before_request
+def select_household():
+    """リクエストの世帯キー（X-Household ヘッダーか ?household=）を確認"""
+    try:
+        g.household = check_key(request.headers.get('X-Household') or request.args.get('household') or None)
+    except InvalidHouseholdError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def get_db():
+    """このリクエストの世帯のDB（最初に使うときに開き、リクエストの終わりに返す）"""
+    if 'db' not in g:
+        g.db = households.acquire(g.household)
+    return g.db
+
+@app.teardown_request
+def release_household_db(exc):
+    if 'db' in g:
+        g.pop('db')
+        households.release(g.household)
+
+@app.after_request
+def record_request_metrics(response):
+    """ルートごとの処理時間とステータスを記録（ラベルは URL ではなくルートの定義）"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, (route, request.method))
+        HTTP_REQUESTS.inc((route, request.method, str(response.status_code)))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """計測値を Prometheus のテキスト形式で返す"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/')
 def index():
     """メインページ"""
-    return render_template('oshaberi.html')
+    return render_template(
+        'oshaberi.html',
+        dictionary_url=dictionary_url(),
+        dictionary_version=DICTIONARY_VERSION
+    )
+
+def dictionary_url():
+    """現在の辞書ファイルの URL（内容のハッシュ入り）"""
+    return url_for('get_dictionary_bundle', version=DICTIONARY_VERSION)
+
+@app.route('/api/dictionary', methods=['GET'])
+def get_dictionary_manifest():
+    """現在の辞書ファイルのバージョンと URL を返す"""
+    response = jsonify({'version': DICTIONARY_VERSION, 'url': dictionary_url()})
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/dictionary/<version>.json', methods=['GET'])
+def get_dictionary_bundle(version):
+    """辞書ファイル（URL にハッシュが入っているので内容は変わらない）"""
+    if version != DICTIONARY_VERSION:
+        return jsonify({'error': 'unknown dictionary version', 'version': DICTIONARY_VERSION}), 404
+    
+    response = Response(DICTIONARY_JSON, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['ETag'] = f'"{DICTIONARY_VERSION}"'
+    return response
 
 @app.route('/api/parse-ingredients', methods=['POST'])
 def parse_ingredients():
@@ -77,53 +240,26 @@ def parse_ingredients():
     data = request.get_json()
     text = data.get('text', '')
     
-    print(f"📝 受信したテキスト: {text}")  # デバッグ用
+    # デバッグ情報は debug=true のときだけ返す
+    result = parse_text(text, debug=bool(data.get('debug')))
+    logger.debug('食材解析: %r → %d件', text, len(result.get('ingredients', [])))
     
-    ingredients = []
+    return jsonify({'success': True, **result})
+
+@app.route('/api/parse-ingredients/batch', methods=['POST'])
+def parse_ingredients_batch():
+    """複数の発話をまとめて解析（1リクエストで texts の件数分）"""
+    data = request.get_json()
+    texts = data.get('texts', [])
     
-    # 「、」や「と」で区切る
-    items = re.split(r'[、，と]', text)
+    if not isinstance(texts, list):
+        return jsonify({'success': False, 'error': 'texts must be a list'}), 400
     
-    print(f"📦 分割したアイテム: {items}")  # デバッグ用
-    
-    for item in items:
-        item = item.strip()
-        if not item:
-            continue
-        
-        # 「食材名 + 数量 + 単位」を抽出
-        # 例: "鶏肉2枚" → name="鶏肉", quantity=2, unit="枚"
-        match = re.match(r'(.+?)(\d+\.?\d*)(枚|個|本|ml|g|kg|l|リットル|片|パック|入り|つ|ヶ)', item)
-        
-        if match:
-            name = match.group(1).strip()
-            quantity = float(match.group(2))
-            unit = match.group(3)
-            
-            print(f"✅ 抽出成功: {name} {quantity}{unit}")  # デバッグ用
-            
-            # カテゴリを推測
-            category = guess_category(name)
-            
-            ingredients.append({
-                'name': name,
-                'quantity': quantity,
-                'unit': unit,
-                'category': category
-            })
-        else:
-            print(f"❌ 抽出失敗: {item}")  # デバッグ用
-    
-    print(f"🍽️ 抽出された食材数: {len(ingredients)}")  # デバッグ用
+    results = parse_many([str(text) for text in texts], debug=bool(data.get('debug')))
     
     return jsonify({
         'success': True,
-        'ingredients': ingredients,
-        'debug': {
-            'original_text': text,
-            'parsed_items': items,
-            'success_count': len(ingredients)
-        }
+        'results': results
     })
 
 @app.route('/api/add-ingredients', methods=['POST'])
@@ -132,24 +268,28 @@ def add_ingredients():
     data = request.get_json()
     ingredients = data.get('ingredients', [])
     
-    added_items = []
+    # まとめて1トランザクションで登録
+    ingredient_ids = get_db().add_ingredients_bulk([
+        {
+            'name': item['name'],
+            'quantity': item['quantity'],
+            'unit': item['unit'],
+            'category': item.get('category', 'その他'),
+            'expiry_date': item.get('expiry_date'),
+            'notes': item.get('notes')
+        }
+        for item in ingredients
+    ])
     
-    for item in ingredients:
-        ingredient_id = db.add_ingredient(
-            name=item['name'],
-            quantity=item['quantity'],
-            unit=item['unit'],
-            category=item.get('category', 'その他'),
-            expiry_date=item.get('expiry_date'),
-            notes=item.get('notes')
-        )
-        
-        added_items.append({
+    added_items = [
+        {
             'id': ingredient_id,
             'name': item['name'],
             'quantity': item['quantity'],
             'unit': item['unit']
-        })
+        }
+        for item, ingredient_id in zip(ingredients, ingredient_ids)
+    ]
     
     return jsonify({
         'success': True,
@@ -157,21 +297,52 @@ def add_ingredients():
         'items': added_items
     })
 
+def inventory_etag():
+    """在庫の ETag（世帯キー + 変更カウンタ + 日付）
+
+    賞味期限の判定は SQLite の DATE('now')（UTC）を使うので、
+    何も変更がなくても日付が変われば ETag も変わるようにしておく。
+    変更カウンタは世帯ごとに数えるので、別の世帯の ETag と一致しないよう世帯キーも入れる。
+    """
+    today = datetime.now(timezone.utc).date().isoformat()
+    etag = f"{get_db().get_change_version()}-{today}"
+    return f"{g.household}-{etag}" if g.household else etag
+
+def conditional_json(build):
+    """If-None-Match が現在の ETag と一致すれば 304 を返し、テーブルは読まない"""
+    etag = inventory_etag()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # キャッシュしてよいが、使う前に必ず ETag で確認してもらう
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/get-ingredients', methods=['GET'])
 def get_ingredients():
     """食材リストを取得"""
     category = request.args.get('category')
     expiry_soon = request.args.get('expiry_soon') == 'true'
     
-    ingredients = db.get_ingredients(category=category, expiry_soon=expiry_soon)
-    
-    # 数量が0より大きい食材のみ返す（在庫があるものだけ）
-    ingredients = [ing for ing in ingredients if ing.get('quantity', 0) > 0]
+    def build():
+        if expiry_soon:
+            # 3日以内の賞味期限の区分から（カテゴリの指定があれば絞り込む）
+            ingredients = [ing for ing in get_expiring(get_db(), 3)['ingredients']
+                           if not category or ing.get('category') == category]
+        else:
+            ingredients = get_db().get_ingredients(category=category)
+        
+        # 数量が0より大きい食材のみ返す（在庫があるものだけ）
+        ingredients = [ing for ing in ingredients if ing.get('quantity', 0) > 0]
+        
+        return {
+            'success': True,
+            'ingredients': ingredients
+        }
     
-    return jsonify({
-        'success': True,
-        'ingredients': ingredients
-    })
+    return conditional_json(build)
 
 @app.route('/api/use-ingredient', methods=['POST'])
 def use_ingredient():
@@ -183,27 +354,173 @@ def use_ingredient():
     if not ingredient_id:
         return jsonify({'error': 'ingredient_id is required'})
     
-    success = db.use_ingredient(ingredient_id, quantity)
+    success = get_db().use_ingredient(ingredient_id, quantity)
     
     return jsonify({
         'success': success,
         'message': '食材を使用しました' if success else 'エラーが発生しました'
     })
 
-@app.route('/api/suggest-recipe', methods=['POST'])
-def suggest_recipe():
-    """Gemini API を使ってレシピ提案"""
-    if not gemini_model:
-        return jsonify({
-            'success': False,
-            'error': 'Gemini API が設定されていません。.env ファイルに GEMINI_API_KEY を設定してください。',
-            'recipe': '''⚠️ Gemini API が未設定です。
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """前回の同期以降の変更だけを返す（差分同期）"""
+    since = request.args.get('since', type=int)
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 2000)
+    return jsonify(get_db().get_changes(since=since, limit=limit))
+
+@app.route('/api/changes', methods=['POST'])
+def push_changes():
+    """クライアントでの変更をまとめて反映（反映後の内容は GET /api/changes で取得）"""
+    data = request.get_json() or {}
+    mutations = data.get('mutations', [])
+    
+    if not isinstance(mutations, list):
+        return jsonify({'error': 'mutations must be a list'}), 400
+    
+    try:
+        results = get_db().apply_mutations(mutations)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'invalid mutation: {e}'}), 400
+    except MutationConflictError as e:
+        # 変更はすべて取り消されているので、クライアントは最新の状態に合わせて送り直せる
+        return jsonify({'error': f'conflicting mutation: {e}', 'index': e.index}), 409
+    
+    return jsonify({
+        'success': True,
+        'results': results
+    })
+
+@app.route('/api/events', methods=['GET'])
+def inventory_event_stream():
+    """在庫の変更を Server-Sent Events で配信
+
+    変更があるたびに `event: change` で {"op", "ids", "cursor"} を送る。
+    変更がない間は一定間隔でコメント行（ハートビート）を送る。
+    """
+    try:
+        subscription = inventory_events.subscribe(g.household)
+    except TooManySubscribersError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    def generate():
+        # 最初の行の直後に切断されると stream() に入らないので、ここでも購読をやめる
+        try:
+            # 切断されたら EventSource が3秒後に再接続する
+            yield "retry: 3000\n\n"
+            for event in inventory_events.stream(subscription):
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield sse_event(event, 'change')
+        finally:
+            subscription.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+# Gemini API 未設定時に表示するメッセージ
+GEMINI_SETUP_MESSAGE = '''⚠️ Gemini API が未設定です。
             
 以下の手順で設定してください：
 1. https://ai.google.dev/ で API キーを取得
 2. .env ファイルに GEMINI_API_KEY=あなたのキー を追加
 
 それまでは、食材を確認して好きなレシピを検索してみてください！'''
+
+def build_recipe_prompt(ingredients):
+    """食材リストからレシピ提案のプロンプトを作成（食材テキストとプロンプトを返す）
+
+    期限の近い食材から順に、トークン数の予算に収まるだけ入れる（recipe_prompt.py）
+    """
+    recipe_prompt = build_prompt(ingredients)
+    if recipe_prompt.omitted or recipe_prompt.staples:
+        logger.debug(f"📝 プロンプトに {len(recipe_prompt.included)} 品（予算超過で省略 "
+                     f"{len(recipe_prompt.omitted)} 品、常備品 {len(recipe_prompt.staples)} 品）")
+    return recipe_prompt.ingredient_text, recipe_prompt.text
+
+def use_gemini_quota():
+    """Gemini を1回呼ぶ分の使用回数を数える（上限なら QuotaExceededError）"""
+    try:
+        gemini_quota.acquire()
+    except QuotaExceededError as e:
+        GEMINI_QUOTA_REJECTIONS.inc((e.scope,))
+        raise
+
+def quota_error(e):
+    """上限に達したときのレスポンス内容"""
+    return {
+        'success': False,
+        'error': str(e),
+        'quota_scope': e.scope,
+        'retry_after': int(e.retry_after) + 1
+    }
+
+def generate_recipe_text(prompt):
+    """Gemini でレシピを一括生成（処理時間を metrics に記録）"""
+    use_gemini_quota()
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        text = get_gemini_model().generate_content(prompt).text
+        outcome = 'ok'
+        return text
+    finally:
+        record_gemini_call('blocking', prompt, outcome, time.perf_counter() - start)
+
+def stream_recipe_chunks(prompt):
+    """Gemini のストリーミング生成で届いた文字列を順に返す（処理時間を metrics に記録）"""
+    use_gemini_quota()
+    start = time.perf_counter()
+    outcome = 'error'
+    first = True
+    try:
+        for chunk in get_gemini_model().generate_content(prompt, stream=True):
+            if first:
+                GEMINI_FIRST_CHUNK.observe(time.perf_counter() - start)
+                first = False
+            if chunk.text:
+                yield chunk.text
+        outcome = 'ok'
+    except GeneratorExit:
+        # 利用者が途中で切断した・ジョブが取り消された
+        outcome = 'cancelled'
+        raise
+    finally:
+        record_gemini_call('stream', prompt, outcome, time.perf_counter() - start)
+        if outcome == 'error':
+            logger.warning('⚠️ Gemini のストリーミング生成に失敗しました')
+
+def record_gemini_call(mode, prompt, outcome, elapsed):
+    """Gemini の呼び出し1回分のプロンプトのトークン数と処理時間を記録"""
+    tokens = estimate_tokens(prompt)
+    GEMINI_PROMPT_TOKENS.observe(tokens, (mode,))
+    GEMINI_DURATION.observe(elapsed, (mode,))
+    GEMINI_REQUESTS.inc((mode, outcome))
+    logger.info(f"🤖 Gemini（{mode}）: プロンプト約 {tokens} トークン、{elapsed:.2f} 秒、{outcome}")
+
+def save_recipe(household_db, cache_key, ingredient_text, recipe_text):
+    """提案されたレシピを世帯の履歴と（全世帯で共有の）キャッシュに保存"""
+    household_db.add_recipe_history(
+        recipe_name="提案レシピ",
+        ingredients_used=ingredient_text,
+        recipe_content=recipe_text
+    )
+    recipe_cache.put(cache_key, recipe_text, ingredients_used=ingredient_text)
+
+@app.route('/api/suggest-recipe', methods=['POST'])
+def suggest_recipe():
+    """Gemini API を使ってレシピ提案"""
+    if not get_gemini_model():
+        return jsonify({
+            'success': False,
+            'error': 'Gemini API が設定されていません。.env ファイルに GEMINI_API_KEY を設定してください。',
+            'recipe': GEMINI_SETUP_MESSAGE
         })
     
     data = request.get_json()
@@ -212,60 +529,212 @@ def suggest_recipe():
     if not ingredients:
         return jsonify({'error': 'No ingredients provided'})
     
-    # 食材リストをテキストに変換
-    ingredient_text = ", ".join([
-        f"{item.get('name', '')} {item.get('quantity', 0)}{item.get('unit', '')}" 
-        for item in ingredients
-    ])
+    ingredient_text, prompt = build_recipe_prompt(ingredients)
     
-    # Gemini にプロンプトを送信
-    prompt = f"""
-以下の食材を使って作れる料理を3つ提案してください。
-また、各料理に必要な追加材料も教えてください。
-
-食材: {ingredient_text}
-
-以下の形式で回答してください：
-1. 【料理名】
-   - 必要な追加材料: ○○
-   - 作り方の概要: ○○
-   - 難易度: ★☆☆☆☆
-"""
+    # 同じ食材での提案がキャッシュにあればそれを返す（refresh=true で作り直し）
+    cache_key = make_cache_key(ingredients)
+    if not data.get('refresh'):
+        cached_recipe = recipe_cache.get(cache_key)
+        if cached_recipe is not None:
+            return jsonify({
+                'success': True,
+                'recipe': cached_recipe,
+                'cached': True
+            })
     
     try:
-        response = gemini_model.generate_content(prompt)
-        recipe_text = response.text
+        # Gemini にプロンプトを送信
+        recipe_text = generate_recipe_text(prompt)
         
-        # レシピ履歴を保存
-        db.add_recipe_history(
-            recipe_name="提案レシピ",
-            ingredients_used=ingredient_text,
-            recipe_content=recipe_text
-        )
+        # レシピ履歴とキャッシュに保存
+        save_recipe(get_db(), cache_key, ingredient_text, recipe_text)
         
         return jsonify({
             'success': True,
-            'recipe': recipe_text
+            'recipe': recipe_text,
+            'cached': False
         })
     
+    except QuotaExceededError as e:
+        return jsonify(quota_error(e)), 429, {'Retry-After': str(int(e.retry_after) + 1)}
+    
     except Exception as e:
+        logger.warning(f"⚠️ レシピ提案に失敗しました: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+def sse_event(data, event=None):
+    """Server-Sent Events の1イベント分の文字列を作成"""
+    message = f"event: {event}\n" if event else ""
+    message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return message
+
+@app.route('/api/suggest-recipe/stream', methods=['POST'])
+def suggest_recipe_stream():
+    """Gemini API のストリーミング生成でレシピを少しずつ返す（Server-Sent Events）
+
+    生成された文字列を届いた順に `data: {"text": ...}` で送り、
+    最後に `event: done`（全文）、失敗時は `event: error` を送る。
+    """
+    data = request.get_json()
+    ingredients = data.get('ingredients', [])
+    
+    if not get_gemini_model():
+        events = [sse_event({'error': 'Gemini API が設定されていません。', 'recipe': GEMINI_SETUP_MESSAGE}, 'error')]
+        return Response(events, mimetype='text/event-stream')
+    
+    if not ingredients:
+        return Response([sse_event({'error': 'No ingredients provided'}, 'error')], mimetype='text/event-stream')
+    
+    ingredient_text, prompt = build_recipe_prompt(ingredients)
+    cache_key = make_cache_key(ingredients)
+    cached_recipe = None if data.get('refresh') else recipe_cache.get(cache_key)
+    
+    if cached_recipe is None:
+        try:
+            gemini_quota.check()
+        except QuotaExceededError as e:
+            GEMINI_QUOTA_REJECTIONS.inc((e.scope,))
+            return Response([sse_event(quota_error(e), 'error')], status=429, mimetype='text/event-stream',
+                            headers={'Retry-After': str(int(e.retry_after) + 1)})
+    
+    def generate():
+        if cached_recipe is not None:
+            yield sse_event({'text': cached_recipe})
+            yield sse_event({'recipe': cached_recipe, 'cached': True}, 'done')
+            return
+        
+        chunks = []
+        try:
+            for text in stream_recipe_chunks(prompt):
+                chunks.append(text)
+                yield sse_event({'text': text})
+            
+            recipe_text = ''.join(chunks)
+            save_recipe(get_db(), cache_key, ingredient_text, recipe_text)
+            yield sse_event({'recipe': recipe_text, 'cached': False}, 'done')
+        
+        except Exception as e:
+            yield sse_event({'error': str(e)}, 'error')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # プロキシ（Nginxなど）でバッファリングされないようにする
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def run_recipe_job(job, household, cache_key, ingredient_text, prompt):
+    """ワーカースレッドでレシピを生成（途中経過は job に追記する）
+
+    リクエストはもう終わっているので、保存するときに世帯のDBを取り直す。
+    """
+    chunks = stream_recipe_chunks(prompt)
+    for text in chunks:
+        if job.cancelled:
+            chunks.close()
+            return None
+        job.append(text)
+    
+    recipe_text = job.text
+    with households.use(household) as household_db:
+        save_recipe(household_db, cache_key, ingredient_text, recipe_text)
+    return recipe_text
+
+@app.route('/api/recipe-jobs', methods=['POST'])
+def submit_recipe_job():
+    """レシピ生成ジョブを登録してジョブIDをすぐに返す"""
+    if not get_gemini_model():
+        return jsonify({
+            'success': False,
+            'error': 'Gemini API が設定されていません。.env ファイルに GEMINI_API_KEY を設定してください。',
+            'recipe': GEMINI_SETUP_MESSAGE
+        })
+    
+    data = request.get_json()
+    ingredients = data.get('ingredients', [])
+    
+    if not ingredients:
+        return jsonify({'error': 'No ingredients provided'})
+    
+    ingredient_text, prompt = build_recipe_prompt(ingredients)
+    cache_key = make_cache_key(ingredients)
+    
+    # キャッシュにあればジョブを作らずに返す
+    if not data.get('refresh'):
+        cached_recipe = recipe_cache.get(cache_key)
+        if cached_recipe is not None:
+            return jsonify({
+                'success': True,
+                'status': 'done',
+                'recipe': cached_recipe,
+                'cached': True
+            })
+    
+    # 同じ世帯の同じプロンプトが実行中なら同じジョブにまとめる（履歴は世帯ごとに保存する）
+    prompt_key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    if g.household:
+        prompt_key = f"{g.household}:{prompt_key}"
+    household = g.household
+    try:
+        # 上限ならジョブを作らずにすぐ断る（実際に数えるのはジョブが Gemini を呼ぶとき）
+        gemini_quota.check()
+        job = recipe_jobs.submit(
+            prompt_key,
+            lambda job: run_recipe_job(job, household, cache_key, ingredient_text, prompt)
+        )
+    except QuotaExceededError as e:
+        GEMINI_QUOTA_REJECTIONS.inc((e.scope,))
+        return jsonify(quota_error(e)), 429, {'Retry-After': str(int(e.retry_after) + 1)}
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    
+    return jsonify({'success': True, 'cached': False, **job.to_dict()}), 202
+
+@app.route('/api/recipe-jobs/<job_id>', methods=['GET'])
+def get_recipe_job(job_id):
+    """レシピ生成ジョブの状態と結果（生成途中の文字列も含む）を取得"""
+    job = recipe_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'job not found'}), 404
+    
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/api/recipe-jobs/<job_id>', methods=['DELETE'])
+def cancel_recipe_job(job_id):
+    """レシピ生成ジョブを取り消す"""
+    if recipe_jobs.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'job not found'}), 404
+    
+    return jsonify({'success': recipe_jobs.cancel(job_id)})
+
+@app.route('/api/get-quota', methods=['GET'])
+def get_quota():
+    """Gemini API の残り使用回数（今日・今月・この1分）"""
+    return jsonify({'success': True, **gemini_quota.status()})
+
 @app.route('/api/get-statistics', methods=['GET'])
 def get_statistics():
     """統計情報を取得"""
-    stats = db.get_statistics()
-    return jsonify(stats)
+    return conditional_json(lambda: get_db().get_statistics())
+
+@app.route('/api/forecast', methods=['GET'])
+def get_forecast():
+    """食材ごとの1日あたりの消費量と、なくなる日の予測（使用履歴から）"""
+    # numpy の import に時間がかかるので、起動時ではなく最初に使うときに読み込む
+    from forecast import forecast_inventory
+    return conditional_json(lambda: {'success': True, 'forecasts': forecast_inventory(get_db())})
 
 @app.route('/api/get-expiring-soon', methods=['GET'])
 def get_expiring_soon():
-    """賞味期限が近い食材を取得"""
+    """賞味期限が近い食材を取得（期限切れの食材と、今日・3日以内・7日以内・期限切れの件数も返す）"""
     days = int(request.args.get('days', 3))
-    ingredients = db.get_expiring_soon(days)
-    return jsonify({'ingredients': ingredients})
+    return conditional_json(lambda: get_expiring(get_db(), days))
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
@@ -273,7 +742,7 @@ if __name__ == '__main__':
     
     print("📱 おしゃべり冷蔵庫アプリを開始します...")
     print(f"📱 アクセス: http://localhost:{port}")
-    print(f"🤖 Gemini API: {'有効' if gemini_model else '無効'}")
+    print(f"🤖 Gemini API: {'有効' if GEMINI_API_KEY else '無効'}")
     
     app.run(host='0.0.0.0', port=port, debug=debug)
 
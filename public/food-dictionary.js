@@ -0,0 +1,7 @@
+// 自動生成（python dictionary_bundle.py public/）。直接編集しないこと
+(function (root) {
+    root.FOOD_DICTIONARY = {"format":1,"units":["リットル","パック","入り","ml","kg","枚","個","本","片","つ","ヶ","g","l"],"number_words":{"ひとつ":1,"ふたつ":2,"みっつ":3,"よっつ":4,"いつつ":5,"むっつ":6,"ななつ":7,"やっつ":8,"ここのつ":9,"とお":10},"kanji_digits":{"一":1,"二":2,"三":3,"四":4,"五":5,"六":6,"七":7,"八":8,"九":9},"kanji_units":{"十":10,"百":100},"number_word_units":["つ","個","枚","本","片","パック"],"default_unit":"個","default_category":"その他","split_pattern":"とか|[、，,]|(?<!ひ)と(?!お(?:つ|個|枚|本|片|パック)?(?:[、，,と]|$))|(?<=ひ)と(?!つ|お(?:つ|個|枚|本|片|パック)?(?:[、，,と]|$))","category_keywords":{"肉":["鶏","肉","豚","牛","魚","ハム","ベーコン","ソーセージ","鶏肉","牛肉","豚肉","ウインナー","チキン","もも","むね","ささみ","ひき肉","ミンチ","ステーキ","ロース","バラ","サーロイン"],"野菜":["トマト","ニンジン","キャベツ","玉ねぎ","きゅうり","ピーマン","白菜","大根","にんじん","人参","たまねぎ","レタス","ほうれん草","ほうれんそう","かぼちゃ","なす","ナス","ブロッコリー","もやし","じゃがいも","ジャガイモ","ゴボウ","ごぼう","レンコン","れんこん","さつまいも","サツマイモ"],"乳製品":["牛乳","チーズ","ヨーグルト","バター","生クリーム","ぎゅうにゅう","ミルク","クリーム","マーガリン","アイス","アイスクリーム"],"きのこ":["しいたけ","まいたけ","えのき","しめじ","きのこ","マッシュルーム"],"穀物":["米","パン","麺","うどん","そば","スパゲッティ","ご飯","パスタ","ラーメン","小麦粉","お好み焼き粉","トースト","食パン"],"調味料":["醤油","味噌","塩","砂糖","胡椒","油","こしょう","サラダ油","オリーブオイル","酢","みりん"],"加工食品":["豆腐","納豆","こんにゃく","しらたき","わかめ","のり","海苔","かつお節","だし","インスタント","カップ麺","レトルト"],"その他":[]},"common_foods":{"玉ねぎ":"野菜","たまねぎ":"野菜","ねぎ":"野菜","にんじん":"野菜","人参":"野菜","じゃがいも":"野菜","ジャガイモ":"野菜","キャベツ":"野菜","トマト":"野菜","きゅうり":"野菜","ピーマン":"野菜","なす":"野菜","ナス":"野菜","白菜":"野菜","大根":"野菜","かぼちゃ":"野菜","ブロッコリー":"野菜","ほうれん草":"野菜","ほうれんそう":"野菜","レタス":"野菜","もやし":"野菜","ゴボウ":"野菜","ごぼう":"野菜","レンコン":"野菜","れんこん":"野菜","さつまいも":"野菜","サツマイモ":"野菜","里芋":"野菜","さといも":"野菜","長ねぎ":"野菜","長ネギ":"野菜","わけぎ":"野菜","しいたけ":"きのこ","まいたけ":"きのこ","えのき":"きのこ","しめじ":"きのこ","エリンギ":"きのこ","マッシュルーム":"きのこ","プチッと鍋":"加工食品","プチっと鍋":"加工食品","プチッと":"加工食品","プチっと":"加工食品","Puchitto Nabe":"加工食品","チキンラーメン":"加工食品","カップヌードル":"加工食品","インスタントラーメン":"加工食品","鶏肉":"肉","牛肉":"肉","豚肉":"肉","ハム":"肉","ベーコン":"肉","ソーセージ":"肉","ウインナー":"肉","チキン":"肉","車海老":"その他","えび":"その他","エビ":"その他","イカ":"その他","いか":"その他","マグロ":"その他","まぐろ":"その他","サーモン":"その他","さけ":"その他","鮭":"その他","さば":"その他","鯖":"その他","あじ":"その他","鯵":"その他","刺身":"その他","お刺身":"その他","さしみ":"その他","サシミ":"その他","卵":"その他","たまご":"その他","タマゴ":"その他","牛乳":"乳製品","ぎゅうにゅう":"乳製品","ミルク":"乳製品","バター":"乳製品","チーズ":"乳製品","ヨーグルト":"乳製品","生クリーム":"乳製品","クリーム":"乳製品","トースト":"穀物","食パン":"穀物","パン":"穀物","豆腐":"加工食品","納豆":"加工食品","こんにゃく":"加工食品","わかめ":"加工食品","のり":"加工食品","海苔":"加工食品"},"version":"870125fd534a2609"};
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = root.FOOD_DICTIONARY;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -340,6 +340,66 @@ async function importData(data) {
     }
 }
 
+// サーバーとの差分同期（前回の同期以降に変わった食材だけを受け取る）
+const SYNC_CURSOR_KEY = 'talkfridge-sync-cursor';
+
+async function syncWithServer(serverUrl = '') {
+    if (!db) await initDB();
+    
+    let since = Number(localStorage.getItem(SYNC_CURSOR_KEY)) || 0;
+    let received = 0;
+    
+    while (true) {
+        const response = await fetch(`${serverUrl}/api/changes?since=${since}`);
+        if (!response.ok) {
+            throw new Error(`同期に失敗しました (${response.status})`);
+        }
+        const changes = await response.json();
+        
+        await applyServerChanges(changes);
+        received += changes.upserts.length + changes.deletes.length;
+        since = changes.cursor;
+        localStorage.setItem(SYNC_CURSOR_KEY, String(since));
+        
+        if (!changes.has_more) break;
+    }
+    
+    return { success: true, cursor: since, received: received };
+}
+
+// 受け取った変更を IndexedDB に反映（full のときは手元のデータを置き換える）
+function applyServerChanges(changes) {
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction([STORE_INGREDIENTS], 'readwrite');
+        const store = transaction.objectStore(STORE_INGREDIENTS);
+        
+        if (changes.full) {
+            store.clear();
+        }
+        changes.upserts.forEach(ingredient => store.put(ingredient));
+        changes.deletes.forEach(id => store.delete(id));
+        
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+// 手元での変更をサーバーに送って反映し、続けて差分を受け取る
+async function pushMutations(mutations, serverUrl = '') {
+    const response = await fetch(`${serverUrl}/api/changes`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ mutations: mutations })
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error || `送信に失敗しました (${response.status})`);
+    }
+    
+    await syncWithServer(serverUrl);
+    return result;
+}
+
 // 初期化
 initDB().catch(err => console.error('IndexedDB初期化エラー:', err));
 
@@ -0,0 +1,98 @@
+"""
+レシピ提案のキャッシュ
+冷蔵庫の中身が変わっていなければ Gemini を呼ばずに前回の提案を返す
+
+1段目: プロセス内の LRU（OrderedDict）
+2段目: SQLite の recipe_cache テーブル（再起動や別ワーカーでも共有される）
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# キャッシュの有効期限（秒）と保持件数
+DEFAULT_TTL_SECONDS = int(os.environ.get('RECIPE_CACHE_TTL', 24 * 60 * 60))
+DEFAULT_MEMORY_SIZE = int(os.environ.get('RECIPE_CACHE_MEMORY_SIZE', 128))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RECIPE_CACHE_MAX_ENTRIES', 1000))
+
+
+def make_cache_key(ingredients):
+    """食材リストから正規化したキャッシュキーを作る
+
+    (name, quantity, unit) をソートしてから JSON にし、SHA-256 を取る。
+    並び順や数量の書き方（2 と 2.0）が違っても同じキーになる。
+    """
+    canonical = sorted(
+        (
+            str(item.get('name', '')).strip(),
+            float(item.get('quantity', 0) or 0),
+            str(item.get('unit', '')).strip(),
+        )
+        for item in ingredients
+    )
+    payload = json.dumps(canonical, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RecipeCache:
+    """プロセス内 LRU + SQLite の2段キャッシュ"""
+    
+    def __init__(self, db, ttl_seconds=None, memory_size=None, max_entries=None):
+        self.db = db
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.memory_size = DEFAULT_MEMORY_SIZE if memory_size is None else memory_size
+        self.max_entries = DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self._memory = OrderedDict()  # key -> (created_at, recipe)
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """キャッシュされたレシピを返す（なければ None）"""
+        now = time.time()
+        min_created_at = now - self.ttl_seconds
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, recipe = entry
+                if created_at >= min_created_at:
+                    self._memory.move_to_end(key)
+                    return recipe
+                del self._memory[key]
+        
+        if self.db is None:
+            return None
+        
+        row = self.db.get_cached_recipe(key, min_created_at)
+        if row is None:
+            return None
+        
+        recipe, created_at = row
+        self.db.touch_cached_recipe(key, now)
+        self._remember(key, created_at, recipe)
+        return recipe
+    
+    def put(self, key, recipe, ingredients_used=None):
+        """レシピをキャッシュに保存"""
+        now = time.time()
+        self._remember(key, now, recipe)
+        if self.db is not None:
+            self.db.put_cached_recipe(
+                key, ingredients_used, recipe, now,
+                max_entries=self.max_entries,
+                min_created_at=now - self.ttl_seconds,
+            )
+    
+    def clear(self):
+        """プロセス内のキャッシュを空にする"""
+        with self._lock:
+            self._memory.clear()
+    
+    def _remember(self, key, created_at, recipe):
+        with self._lock:
+            self._memory[key] = (created_at, recipe)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
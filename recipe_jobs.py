@@ -0,0 +1,172 @@
+"""
+レシピ生成のバックグラウンドジョブ
+Gemini の呼び出しをリクエスト処理用のスレッドから切り離し、
+ジョブIDで状態と結果を問い合わせられるようにする
+
+- 同時実行数とキューの深さに上限がある（超えたら QueueFullError）
+- 同じプロンプトのジョブが実行中なら、新しく呼び出さずに同じジョブを返す
+- 終わったジョブは ttl_seconds 経過後に削除する
+
+ジョブはプロセス内に保存されるので、gunicorn は --workers 1 で動かすこと
+（スレッド数は増やしてよい）。
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = int(os.environ.get('RECIPE_JOB_WORKERS', 2))
+DEFAULT_MAX_PENDING = int(os.environ.get('RECIPE_JOB_QUEUE_SIZE', 16))
+DEFAULT_TTL_SECONDS = int(os.environ.get('RECIPE_JOB_TTL', 10 * 60))
+
+# ジョブの状態
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (DONE, ERROR, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """待ちジョブが上限に達している"""
+
+
+class RecipeJob:
+    """1回分のレシピ生成"""
+    
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.text = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self):
+        return self.status == CANCELLED
+    
+    def append(self, text):
+        """生成途中の文字列を追加（ポーリングで途中経過を返すため）"""
+        with self._lock:
+            self.text += text
+    
+    def to_dict(self):
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'status': self.status,
+                'text': self.text,
+            }
+        if self.status == DONE:
+            data['recipe'] = self.result
+        if self.status == ERROR:
+            data['error'] = self.error
+        return data
+
+
+class RecipeJobQueue:
+    """上限付きのスレッドプールでジョブを実行する"""
+    
+    def __init__(self, max_workers=None, max_pending=None, ttl_seconds=None):
+        self.max_workers = DEFAULT_MAX_WORKERS if max_workers is None else max_workers
+        self.max_pending = DEFAULT_MAX_PENDING if max_pending is None else max_pending
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='recipe-job')
+        self._jobs = {}
+        self._inflight = {}  # key -> 実行待ち・実行中のジョブ
+        self._lock = threading.Lock()
+    
+    def submit(self, key, func):
+        """ジョブを登録してすぐに返す
+
+        func(job) はワーカースレッドで呼ばれ、戻り値がジョブの結果になる。
+        同じ key のジョブが終わっていなければ、そのジョブを返す。
+        """
+        with self._lock:
+            self._prune()
+            
+            job = self._inflight.get(key)
+            if job is not None:
+                return job
+            
+            if len(self._inflight) >= self.max_pending:
+                raise QueueFullError(f'レシピ生成の待ちが上限（{self.max_pending}件）に達しています')
+            
+            job = RecipeJob(key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+            job.future = self._executor.submit(self._run, job, func)
+            return job
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """ジョブを取り消す
+
+        待ち状態ならそのまま取り消す。実行中の場合は Gemini の呼び出し自体は
+        止められないので、結果を捨てるように印を付ける。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._inflight.pop(job.key, None)
+        if job.future is not None:
+            job.future.cancel()
+        return True
+    
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._inflight.values() if job.status == RUNNING)
+            return {
+                'running': running,
+                'queued': len(self._inflight) - running,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+            }
+    
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+    
+    def _run(self, job, func):
+        with self._lock:
+            if job.cancelled:
+                return
+            job.status = RUNNING
+        
+        try:
+            result = func(job)
+        except Exception as e:
+            status, result, error = ERROR, None, str(e)
+        else:
+            status, error = DONE, None
+        
+        with self._lock:
+            if not job.cancelled:
+                job.status = status
+                job.result = result
+                job.error = error
+                job.finished_at = time.time()
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+    
+    def _prune(self):
+        """終わってから ttl_seconds 経ったジョブを削除（ロックを持った状態で呼ぶ）"""
+        expired_before = time.time() - self.ttl_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < expired_before]:
+            del self._jobs[job_id]
@@ -0,0 +1,150 @@
+"""
+レシピ提案のプロンプト作成
+冷蔵庫の食材を全部並べるとプロンプトが長くなり、生成が遅く料金も増えるので、
+使ってほしい食材から順にトークン数の予算に収まるだけ入れる
+
+- 期限の近い順（期限切れは今日と同じ扱い、期限なしは最後）、同じなら数量の多い順
+- 調味料などの常備品（STAPLE_CATEGORIES）は入れない（追加材料として Gemini が補う）
+- トークン数は estimate_tokens で見積もる（API を呼ばない決定的な近似なので、
+  オフラインでも同じ結果になる）
+
+予算は環境変数 RECIPE_PROMPT_TOKEN_BUDGET（既定 300）で変更できる。
+"""
+
+import math
+import os
+import re
+from datetime import date
+
+from category_classifier import guess_category
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('RECIPE_PROMPT_TOKEN_BUDGET', 300))
+
+# プロンプトに入れない常備品のカテゴリ（food_dictionary.CATEGORY_KEYWORDS のカテゴリ名）
+STAPLE_CATEGORIES = ('調味料',)
+
+# 期限まで何日以内なら食材名に * を付けるか
+EXPIRY_SOON_DAYS = 3
+
+PROMPT_TEMPLATE = """
+以下の食材を使って作れる料理を3つ提案してください。
+また、各料理に必要な追加材料も教えてください。
+{notes}
+食材: {ingredients}
+
+以下の形式で回答してください：
+1. 【料理名】
+   - 必要な追加材料: ○○
+   - 作り方の概要: ○○
+   - 難易度: ★☆☆☆☆
+"""
+
+EXPIRY_NOTE = '* の付いた食材は期限が近いので優先して使ってください。\n'
+STAPLE_NOTE = '調味料は一般的な家庭にあるものを使ってかまいません。\n'
+
+_TOKEN_PATTERN = re.compile(r'[\x00-\x7f]+|[^\x00-\x7f]')
+
+
+def estimate_tokens(text):
+    """トークン数の見積もり（ASCII は単語ごとに4文字で1トークン、それ以外は1文字1トークン）"""
+    count = 0
+    for chunk in _TOKEN_PATTERN.findall(text):
+        if chunk.isascii():
+            count += sum(math.ceil(len(word) / 4) for word in chunk.split())
+        else:
+            count += 1
+    return count
+
+
+def _days_until_expiry(item, today):
+    try:
+        return (date.fromisoformat(str(item.get('expiry_date'))[:10]) - today).days
+    except ValueError:
+        return None
+
+
+def _quantity(item):
+    try:
+        return float(item.get('quantity') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def is_staple(item):
+    """常備品（調味料など）か（カテゴリがなければ食材名から推測）"""
+    category = item.get('category') or guess_category(str(item.get('name', '')))
+    return category in STAPLE_CATEGORIES
+
+
+def rank_ingredients(ingredients, today=None):
+    """使ってほしい順に並べ替えた (食材, 期限までの日数) のリスト"""
+    today = today or date.today()
+    ranked = [(item, _days_until_expiry(item, today)) for item in ingredients]
+    
+    def sort_key(pair):
+        item, days = pair
+        if days is None:
+            return (1, 0, -_quantity(item))
+        return (0, max(days, 0), -_quantity(item))
+    
+    ranked.sort(key=sort_key)
+    return ranked
+
+
+def format_ingredient(item, days=None):
+    """「にんじん* 2本」の形（期限が近ければ食材名に * を付ける）"""
+    mark = '*' if days is not None and days <= EXPIRY_SOON_DAYS else ''
+    return f"{item.get('name', '')}{mark} {item.get('quantity', 0)}{item.get('unit', '')}"
+
+
+class RecipePrompt:
+    """作成したプロンプトと、その中身の内訳"""
+    
+    def __init__(self, text, ingredient_text, included, omitted, staples, tokens):
+        self.text = text
+        self.ingredient_text = ingredient_text
+        self.included = included      # プロンプトに入れた食材
+        self.omitted = omitted        # 予算に収まらず省いた食材
+        self.staples = staples        # 常備品として省いた食材
+        self.tokens = tokens
+
+
+def build_prompt(ingredients, token_budget=None, today=None, estimator=estimate_tokens):
+    """予算内に収めたレシピ提案のプロンプトを作る（最低1つは食材を入れる）"""
+    token_budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    
+    ranked = rank_ingredients(ingredients, today)
+    staples, candidates = [], []
+    for item, days in ranked:
+        if is_staple(item):
+            staples.append(item)
+        else:
+            candidates.append((item, days))
+    if not candidates:
+        # 調味料しかないならそれで考えてもらう
+        candidates, staples = ranked, []
+    
+    # 注記は食材を選ぶ前に決める（入れる食材によって予算の計算が変わらないように）
+    notes = ''
+    if any(days is not None and days <= EXPIRY_SOON_DAYS for _, days in candidates):
+        notes += EXPIRY_NOTE
+    if staples:
+        notes += STAPLE_NOTE
+    
+    base_tokens = estimator(PROMPT_TEMPLATE.format(notes=notes, ingredients=''))
+    separator_tokens = estimator(', ')
+    
+    included, parts, tokens = [], [], base_tokens
+    for item, days in candidates:
+        part = format_ingredient(item, days)
+        cost = estimator(part) + (separator_tokens if parts else 0)
+        if parts and tokens + cost > token_budget:
+            break
+        included.append(item)
+        parts.append(part)
+        tokens += cost
+    omitted = [item for item, _ in candidates[len(included):]]
+    
+    ingredient_text = ', '.join(parts)
+    text = PROMPT_TEMPLATE.format(notes=notes, ingredients=ingredient_text)
+    return RecipePrompt(text, ingredient_text, included, omitted, staples, estimator(text))
@@ -0,0 +1,65 @@
+"""
+裏で定期的に行う処理（バックアップ・使用履歴の集約など）の実行
+schedule パッケージの Scheduler を1つだけ持ち、優先度を下げた1本のスレッドで順番に実行する。
+重い処理どうしが同時に走らないので、CPU やDBのロックを取り合わない。
+"""
+
+import os
+import sys
+import threading
+import time
+
+import schedule
+
+from app_logging import get_logger
+
+logger = get_logger('jobs')
+
+# 裏の処理のスレッドの nice 値（CPU が少ないときにリクエストの処理を優先させる）
+JOB_NICE = 19
+
+_scheduler = schedule.Scheduler()
+_thread = None
+_lock = threading.Lock()
+
+
+def lower_thread_priority():
+    """現在のスレッドの nice 値を上げる（Linux ではスレッドごとに nice 値を持てる）"""
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), JOB_NICE)
+    except OSError:
+        pass
+
+
+def every_hours(hours, job, description):
+    """hours 時間ごとに job() を裏のスレッドで実行する（0 以下なら何もしない）"""
+    if hours <= 0:
+        return None
+    
+    def run():
+        try:
+            job()
+        except Exception as e:
+            logger.warning(f"⚠️ {description}に失敗しました: {e}")
+    
+    scheduled = _scheduler.every(max(1, round(hours * 60))).minutes.do(run)
+    _start_thread()
+    return scheduled
+
+
+def _start_thread():
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name='scheduled-jobs', daemon=True)
+        _thread.start()
+
+
+def _loop():
+    lower_thread_priority()
+    while True:
+        _scheduler.run_pending()
+        time.sleep(min(60, max(1, _scheduler.idle_seconds or 60)))
@@ -9,5 +9,5 @@ ls -la
 echo "---"
 
 # gunicornで起動
-exec gunicorn oshaberi_web_app:app --bind 0.0.0.0:$PORT --timeout 120 --workers 1 --threads 2 --access-logfile - --error-logfile - --log-level debug
+exec gunicorn oshaberi_web_app:app --bind 0.0.0.0:$PORT --timeout 120 --workers 1 --threads 64 --access-logfile - --error-logfile - --log-level debug
 
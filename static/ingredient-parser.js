@@ -0,0 +1,163 @@
+/**
+ * 食材解析（ブラウザ版）
+ * サーバーの ingredient_parser.py / category_classifier.py と同じ規則で解析する。
+ * 辞書は /api/dictionary/<バージョン>.json（サーバーと共通の辞書ファイル）から読み込む。
+ *
+ * 使い方:
+ *   const parser = await IngredientParser.load(dictionaryUrl);
+ *   const result = parser.parseText('鶏肉2枚、トマト3個');
+ */
+(function (root) {
+    'use strict';
+
+    const PRIORITY_KEYWORD = 0;
+    const PRIORITY_COMMON_FOOD = 1;
+
+    function escapeRegExp(text) {
+        return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    }
+
+    // (長さ, 優先度) で比較（Python 版のタプル比較と同じ）
+    function isBetter(candidate, current) {
+        if (!current) return true;
+        if (candidate[0] !== current[0]) return candidate[0] > current[0];
+        return candidate[1] > current[1];
+    }
+
+    class IngredientParser {
+        constructor(bundle) {
+            this.version = bundle.version;
+            this.numberWords = bundle.number_words;
+            this.kanjiDigits = bundle.kanji_digits;
+            this.kanjiUnits = bundle.kanji_units;
+            this.defaultUnit = bundle.default_unit;
+            this.defaultCategory = bundle.default_category;
+
+            this.splitPattern = new RegExp(bundle.split_pattern);
+            this.digitPattern = new RegExp(
+                '^(?<name>.+?)\\s*(?<number>[0-9]+(?:\\.[0-9]+)?)\\s*(?<unit>'
+                + bundle.units.map(escapeRegExp).join('|') + ')'
+            );
+            const words = Object.keys(bundle.number_words).sort((a, b) => b.length - a.length);
+            this.wordPattern = new RegExp(
+                '^(?<name>.+?)\\s*(?<number>'
+                + words.map(escapeRegExp).join('|')
+                + '|[' + Object.keys(bundle.kanji_digits).join('') + Object.keys(bundle.kanji_units).join('') + ']+)'
+                + '(?<unit>' + bundle.number_word_units.map(escapeRegExp).join('|') + ')?$'
+            );
+
+            // カテゴリ分類用の辞書（キーワード → [長さ, 優先度, カテゴリ]）
+            this.exact = new Map();
+            for (const [name, category] of Object.entries(bundle.common_foods)) {
+                this.exact.set(name.toLowerCase(), category);
+            }
+            this.keywords = new Map();
+            this.maxKeywordLength = 0;
+            for (const [category, keywords] of Object.entries(bundle.category_keywords)) {
+                for (const keyword of keywords) {
+                    this._addKeyword(keyword, PRIORITY_KEYWORD, category);
+                }
+            }
+            for (const [name, category] of Object.entries(bundle.common_foods)) {
+                this._addKeyword(name, PRIORITY_COMMON_FOOD, category);
+            }
+        }
+
+        static async load(url) {
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error(`辞書ファイルを読み込めませんでした: ${response.status}`);
+            }
+            return new IngredientParser(await response.json());
+        }
+
+        _addKeyword(keyword, priority, category) {
+            keyword = keyword.toLowerCase();
+            if (!keyword) return;
+            const output = [keyword.length, priority, category];
+            if (isBetter(output, this.keywords.get(keyword))) {
+                this.keywords.set(keyword, output);
+            }
+            this.maxKeywordLength = Math.max(this.maxKeywordLength, keyword.length);
+        }
+
+        // 食材名からカテゴリを判定（最長一致、同じ長さなら辞書の食材名を優先、それでも同じなら先に出てきたもの）
+        classify(name) {
+            if (!name) return this.defaultCategory;
+            const lowered = name.toLowerCase();
+
+            const exact = this.exact.get(lowered);
+            if (exact !== undefined) return exact;
+
+            let best = null;
+            for (let end = 1; end <= lowered.length; end++) {
+                for (let length = Math.min(this.maxKeywordLength, end); length >= 1; length--) {
+                    const found = this.keywords.get(lowered.slice(end - length, end));
+                    if (found) {
+                        if (isBetter(found, best)) best = found;
+                        break;
+                    }
+                }
+            }
+            return best ? best[2] : this.defaultCategory;
+        }
+
+        kanjiToNumber(text) {
+            let total = 0;
+            let current = 0;
+            for (const char of text) {
+                if (char in this.kanjiDigits) {
+                    current = this.kanjiDigits[char];
+                } else {
+                    total += (current || 1) * this.kanjiUnits[char];
+                    current = 0;
+                }
+            }
+            return total + current;
+        }
+
+        // 1つの食材表現を解析（解析できなければ null）
+        parseItem(item) {
+            item = item.trim().replace(/[０-９．]/g, (char) => String.fromCharCode(char.charCodeAt(0) - 0xFEE0));
+            if (!item) return null;
+
+            let quantity;
+            let unit;
+            let match = item.match(this.digitPattern);
+            if (match) {
+                quantity = parseFloat(match.groups.number);
+                unit = match.groups.unit;
+            } else {
+                match = item.match(this.wordPattern);
+                if (!match) return null;
+                const number = match.groups.number;
+                quantity = number in this.numberWords ? this.numberWords[number] : this.kanjiToNumber(number);
+                unit = match.groups.unit || this.defaultUnit;
+            }
+
+            const name = match.groups.name.trim();
+            if (!name) return null;
+
+            return {name: name, quantity: quantity, unit: unit, category: this.classify(name)};
+        }
+
+        // 発話1つを解析して {ingredients: [...]} を返す
+        parseText(text) {
+            const ingredients = [];
+            for (const item of text.split(this.splitPattern)) {
+                const parsed = this.parseItem(item);
+                if (parsed) ingredients.push(parsed);
+            }
+            return {ingredients: ingredients};
+        }
+
+        parseMany(texts) {
+            return texts.map((text) => this.parseText(text));
+        }
+    }
+
+    root.IngredientParser = IngredientParser;
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = IngredientParser;
+    }
+})(typeof window !== 'undefined' ? window : globalThis);